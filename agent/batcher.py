@@ -0,0 +1,123 @@
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+_registry: Dict[str, "MicroBatcher"] = {}
+
+
+class MicroBatcher:
+    """
+    Collects items submitted from concurrent requests for up to `max_wait_ms` (or until
+    `max_batch_size` items are waiting) and hands them to `process_batch` as one list.
+    process_batch must return one result per item, in order.
+    """
+
+    def __init__(self, name: str, process_batch: Callable[[List[Any]], List[Any]], max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        self.name = name
+        self.process_batch = process_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self._queue: queue.Queue = queue.Queue()
+        self._worker = None
+        self._start_lock = threading.Lock()
+
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._queue_delay_total = 0.0
+        self._queue_delay_max = 0.0
+
+        _registry[name] = self
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._start_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name=f"batcher-{self.name}", daemon=True)
+                self._worker.start()
+
+    def submit(self, item: Any) -> Future:
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def map(self, items: List[Any]) -> List[Any]:
+        """Submit several items and wait for all of them (they may share batches with other callers)."""
+        futures = [self.submit(item) for item in items]
+        return [future.result() for future in futures]
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = batch[0][2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            dispatched = time.perf_counter()
+            delays = [dispatched - enqueued for _, _, enqueued in batch]
+
+            with self._stats_lock:
+                self._batches += 1
+                self._items += len(batch)
+                self._queue_delay_total += sum(delays)
+                self._queue_delay_max = max(self._queue_delay_max, max(delays))
+
+            try:
+                results = self.process_batch([item for item, _, _ in batch])
+                if len(results) != len(batch):
+                    raise ValueError(f"{self.name}: batch of {len(batch)} produced {len(results)} results")
+                for (_, future, _), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                logger.error(f"Batch {self.name} failed: {e}")
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            batches, items = self._batches, self._items
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+                "batches": batches,
+                "items": items,
+                "avg_batch_size": round(items / batches, 2) if batches else 0.0,
+                "avg_fill": round(items / (batches * self.max_batch_size), 4) if batches else 0.0,
+                "avg_queue_delay_ms": round(self._queue_delay_total / items * 1000, 3) if items else 0.0,
+                "max_queue_delay_ms": round(self._queue_delay_max * 1000, 3),
+                "pending": self._queue.qsize(),
+            }
+
+
+class BatchedEmbeddings(Embeddings):
+    """Embeddings wrapper that funnels single-text calls from concurrent requests into shared embed_documents batches."""
+
+    def __init__(self, base: Embeddings, max_batch_size: int = 32, max_wait_ms: float = 5.0, name: str = "embeddings"):
+        self.base = base
+        self.batcher = MicroBatcher(name, base.embed_documents, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.batcher.map(list(texts))
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.batcher.submit(text).result()
+
+
+def batcher_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: batcher.stats() for name, batcher in _registry.items()}
@@ -1,6 +1,6 @@
-import requests
 import json
 import subprocess
+from agent.llmBackend import generate
 
 def process_message(message):
     decision = get_llm_function_call(message)
@@ -70,11 +70,7 @@ User: {message}
 
 
     try:
-        res = requests.post(
-            "http://localhost:11434/api/generate",
-            json={"model": "gemma3:1b", "prompt": prompt, "stream": False}
-        )
-        raw = res.json().get("response", "").strip()
+        raw = generate(prompt, label="brain", model="gemma3:1b").text
         print ("Raw: ",raw)
 
         # Cleaning any stray text before/after JSON
@@ -1,56 +1,76 @@
 import os
+import json
+import time
 import uuid
+import hashlib
+import threading
 import logging
 import chromadb
 import requests
-from agent.llm import llm
 from chromadb import Client
 from datetime import datetime, timedelta
 from chromadb.config import Settings
 from langchain.vectorstores import Chroma
 from chromadb.utils import embedding_functions
-from langchain.embeddings import HuggingFaceEmbeddings
-from agent.llm import build_rag_prompt, generate_context_summary
+from agent.llm import build_rag_prompt, generate_context_summary, invoke_llm, stream_llm, summarize_session
+from agent.memo import memoized
+from agent.memoryWriter import WriteBehindQueue
+from agent.summaryCache import extract_keywords
+from agent.scheduler import PeriodicJob
+from agent.reranker import rerank
+from agent.dedup import RecentDuplicates, bump_metadata
+from agent.memoryFilter import is_worth_storing
+from agent.memoryService import memory_service, MEMORY_DIR
 from langchain.text_splitter import RecursiveCharacterTextSplitter
+from watchfiles import watch
 
 
 logger = logging.getLogger(__name__)
 
-try:
-    embedding_func = HuggingFaceEmbeddings(
-        model_name="/home/ayush/Documents/bitbud/models/paraphrase-MiniLM-L3-v2/"
-    )
-    logger.info("Embedding function initialized successfully")
-except Exception as e:
-    logger.error(f"Failed to initialize embedding function: {e}")
-    embedding_func = None
-
-vectorstore = None
-about_store = None
-
-try:
-    vectorstore = Chroma(
-        collection_name="bitbud",
-        embedding_function=embedding_func,
-        persist_directory="./bitbud_memory"
-    )
-    logger.info("Main vectorstore initialized successfully")
-except Exception as e:
-    logger.error(f"Failed to initialize main vectorstore: {e}")
-
-try:
-    about_store = Chroma(
-        collection_name="about_user",
-        embedding_function=embedding_func,
-        persist_directory="./chroma_about"
-    )
-    logger.info("About vectorstore initialized successfully")
-except Exception as e:
-    logger.error(f"Failed to initialize about vectorstore: {e}")
+# Memory writes (summary + embed + upsert) happen on a background thread after the reply is returned
+MEMORY_WRITE_BEHIND = os.getenv("BITBUD_MEMORY_WRITE_BEHIND", "1") == "1"
+MEMORY_QUEUE_SIZE = int(os.getenv("BITBUD_MEMORY_QUEUE_SIZE", "256"))
+MEMORY_WRITE_BATCH = int(os.getenv("BITBUD_MEMORY_WRITE_BATCH", "16"))
+MEMORY_WRITE_WAIT_MS = float(os.getenv("BITBUD_MEMORY_WRITE_WAIT_MS", "50"))
+MEMORY_SPOOL_DIR = os.getenv("BITBUD_MEMORY_SPOOL_DIR", os.path.join(MEMORY_DIR, "spool"))
+
+# Retention runs on a background schedule (at most once per interval across all workers), never on the request path
+MEMORY_RETENTION_DAYS = float(os.getenv("BITBUD_MEMORY_RETENTION_DAYS", "45"))
+RETENTION_INTERVAL_HOURS = float(os.getenv("BITBUD_RETENTION_INTERVAL_HOURS", "24"))
+RETENTION_STATE_PATH = os.getenv("BITBUD_RETENTION_STATE_PATH", os.path.join(MEMORY_DIR, "retention.json"))
+TIMESTAMP_BACKFILL_MARKER = os.path.join(MEMORY_DIR, ".ts_backfilled")
+RETENTION_PAGE_SIZE = 1000
+
+# Tiered memory: raw turns (hot) are compacted into a few summary vectors (cold) once their session has been
+# idle for SESSION_GAP_S; retrieval searches the hot turns not yet compacted plus the cold summaries
+SESSION_COMPACTION = os.getenv("BITBUD_SESSION_COMPACTION", "1") == "1"
+SESSION_GAP_S = 3600
+COMPACTION_INTERVAL_MIN = float(os.getenv("BITBUD_COMPACTION_INTERVAL_MIN", "10"))
+COMPACTION_TURNS_PER_SUMMARY = int(os.getenv("BITBUD_COMPACTION_TURNS_PER_SUMMARY", "20"))
+COMPACTION_MAX_SESSIONS = int(os.getenv("BITBUD_COMPACTION_MAX_SESSIONS", "20"))
+COMPACTION_STATE_PATH = os.path.join(MEMORY_DIR, "compaction.json")
+
+# Terms for the retrieval context boost: "summary" (LLM context summary of the query) or "keywords" (no LLM call)
+RETRIEVAL_BOOST = os.getenv("BITBUD_RETRIEVAL_BOOST", "summary")
+# Candidate pool for reranking, the cosine similarity a memory needs to be used, and MMR trade-off (1 = relevance only)
+RETRIEVAL_FETCH_K = int(os.getenv("BITBUD_RETRIEVAL_FETCH_K", "20"))
+RETRIEVAL_MIN_SIMILARITY = float(os.getenv("BITBUD_RETRIEVAL_MIN_SIMILARITY", "0.35"))
+RETRIEVAL_MMR_LAMBDA = float(os.getenv("BITBUD_RETRIEVAL_MMR_LAMBDA", "1.0"))
+
+# Repeats of a recent memory (same normalized text, or SimHash within DEDUP_MAX_DISTANCE bits) bump the
+# existing memory's seen_count/last_seen instead of being summarized and stored again
+MEMORY_DEDUP = os.getenv("BITBUD_MEMORY_DEDUP", "1") == "1"
+DEDUP_WINDOW = int(os.getenv("BITBUD_DEDUP_WINDOW", "2000"))
+DEDUP_MAX_DISTANCE = int(os.getenv("BITBUD_DEDUP_MAX_DISTANCE", "3"))
+DEDUP_SEED_DAYS = 7
 
 
 ABOUT_FILE = "ABOUT.md"
-_about_last_modified = None
+# Chunk ids are content hashes; the manifest records which chunks the about_user collection holds
+ABOUT_MANIFEST_PATH = os.path.join(MEMORY_DIR, "about_manifest.json")
+# Reindex ABOUT.md from a file watcher thread instead of checking its mtime on every request
+ABOUT_WATCH = os.getenv("BITBUD_ABOUT_WATCH", "1") == "1"
+_about_lock = threading.Lock()
 _current_session_id = None
 _last_interaction_time = None
 
@@ -61,7 +81,7 @@ def _get_current_session_id():
     now = datetime.now()
 
     if (_last_interaction_time is None or
-        (now - _last_interaction_time).total_seconds() > 3600):
+        (now - _last_interaction_time).total_seconds() > SESSION_GAP_S):
         # New session if no last interaction or more than 1 hour gap
         _current_session_id = str(uuid.uuid4())[:8] # Shorten UUID for session ID
         print(f"[Memory] New session started: {_current_session_id}")
@@ -69,182 +89,452 @@ def _get_current_session_id():
     _last_interaction_time = now
     return _current_session_id
 
-def _load_about_if_changed():
-    """Load the ABOUT.md file if it has changed since last load."""
-    global _about_last_modified, about_store
+def _chunk_id(chunk: str) -> str:
+    return hashlib.sha1(chunk.encode("utf-8")).hexdigest()
 
-    if not os.path.exists(ABOUT_FILE):
-        print(f"[Memory] About file '{ABOUT_FILE}' not found.")
+def _load_about_manifest():
+    try:
+        with open(ABOUT_MANIFEST_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _save_about_manifest(manifest: dict):
+    tmp_path = ABOUT_MANIFEST_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, ABOUT_MANIFEST_PATH)
+
+def reindex_about() -> dict:
+    """Sync the about_user collection with ABOUT.md: embed only new chunks and delete chunks that are gone."""
+    with _about_lock:
+        started = time.perf_counter()
+        if os.path.exists(ABOUT_FILE):
+            with open(ABOUT_FILE, "r") as f:
+                about_text = f.read().strip()
+        else:
+            # A deleted ABOUT.md indexes as empty, so its chunks are removed rather than left searchable
+            print(f"[Memory] About file '{ABOUT_FILE}' not found.")
+            about_text = ""
+
+        file_hash = hashlib.sha1(about_text.encode("utf-8")).hexdigest()
+        manifest = _load_about_manifest()
+        if manifest and manifest.get("file_hash") == file_hash:
+            return {"unchanged": True}
+
+        splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
+        chunks = splitter.split_text(about_text) if about_text else []
+        current = {_chunk_id(chunk): chunk for chunk in chunks}
+
+        if manifest is not None:
+            previous = set(manifest.get("chunks", []))
+        else:
+            # No manifest yet (first run, or a collection built with random ids): diff against what's stored
+            previous = set(memory_service.about_store._collection.get(include=[])["ids"])
+
+        added = [chunk_id for chunk_id in current if chunk_id not in previous]
+        removed = [chunk_id for chunk_id in previous if chunk_id not in current]
+
+        backend = memory_service.backend("about_user")
+        if removed:
+            backend.delete(removed)
+        if added:
+            texts = [current[chunk_id] for chunk_id in added]
+            backend.upsert(
+                added,
+                memory_service.embeddings.embed_documents(texts),
+                texts,
+                [{"source": ABOUT_FILE} for _ in added]
+            )
+        _save_about_manifest({"file_hash": file_hash, "chunks": list(current)})
+
+        result = {
+            "added": len(added),
+            "removed": len(removed),
+            "kept": len(current) - len(added),
+            "reindex_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+        print(f"[Memory] Reindexed ABOUT.md: {result}")
+        return result
+
+def _watch_about():
+    try:
+        reindex_about()
+    except Exception as e:
+        logger.error(f"ABOUT.md indexing failed: {e}")
+
+    about_path = os.path.abspath(ABOUT_FILE)
+    # Watch the directory so editors that save by replacing the file are picked up too; not recursively, since
+    # it is the working directory and holds the Chroma files, spool and caches
+    for _ in watch(os.path.dirname(about_path), watch_filter=lambda _, path: os.path.abspath(path) == about_path,
+                   recursive=False):
+        try:
+            reindex_about()
+        except Exception as e:
+            logger.error(f"ABOUT.md reindex failed: {e}")
+
+def _start_about_indexer():
+    if memory_service.about_store is None:
         return
-
-    _current_mod_time = os.path.getmtime(ABOUT_FILE)
-
-    # Reloading if the file was modified
-    if _about_last_modified != _current_mod_time:
-        print(f"[Memory] About file '{ABOUT_FILE}' was modified, reloading...")
-        _about_last_modified = _current_mod_time
-
-        with open(ABOUT_FILE, "r") as f:
-            about_text = f.read().strip()
-            if about_text:
-                splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
-                chunks = splitter.split_text(about_text)
-                about_store.add_texts(chunks)
-                print(f"[Memory] Loaded {len(chunks)} chunks from ABOUT.md")
-            else:
-                chunks = []
-                print("[Memory] About file was found empty, no chunks added.")
-
-        about_store.delete_collection()
-        about_store = Chroma(
-            collection_name="about_user",
-            embedding_function=embedding_func,
-            persist_directory="./chroma_about"
+    # Without the watcher ABOUT.md is still synced once the stores are loaded (off the request path)
+    threading.Thread(target=_watch_about if ABOUT_WATCH else reindex_about, name="about-indexer", daemon=True).start()
+
+memory_service.when_ready(_start_about_indexer)
+
+def embed_text(text: str, memo=None) -> list[float]:
+    """Embed a string once per request; store and both searches reuse the same vector."""
+    return memoized(memo, "embedding", text, lambda: memory_service.embeddings.embed_query(text))
+
+def backfill_timestamps(page_size: int = RETENTION_PAGE_SIZE) -> int:
+    """
+    One-time migration: give memories stored before numeric timestamps a `ts` (epoch seconds)
+    derived from their ISO `timestamp`, so the retention filter can see them. Returns rows updated.
+    """
+    collection = memory_service.memory_store._collection
+    updated = 0
+    offset = 0
+    while True:
+        page = collection.get(include=["metadatas"], limit=page_size, offset=offset)
+        if not page["ids"]:
+            break
+        ids, metadatas = [], []
+        for doc_id, metadata in zip(page["ids"], page["metadatas"]):
+            if not metadata or "ts" in metadata or "timestamp" not in metadata:
+                continue
+            try:
+                ts = datetime.fromisoformat(metadata["timestamp"]).timestamp()
+            except ValueError:
+                continue
+            ids.append(doc_id)
+            metadatas.append({**metadata, "ts": ts})
+        if ids:
+            collection.update(ids=ids, metadatas=metadatas)
+            updated += len(ids)
+        offset += page_size
+    return updated
+
+
+def cleanup_old_memories(days_to_keep=MEMORY_RETENTION_DAYS) -> dict:
+    """Delete memories older than `days_to_keep` with a `where` filter on the numeric `ts` metadata."""
+    started = time.perf_counter()
+
+    if not os.path.exists(TIMESTAMP_BACKFILL_MARKER):
+        backfilled = backfill_timestamps()
+        open(TIMESTAMP_BACKFILL_MARKER, "w").close()
+        backend = memory_service.backend("bitbud")
+        if backfilled and hasattr(backend, "reload"):
+            # Metadata-only update went straight to Chroma; pick it up in the in-process index
+            backend.reload()
+        print(f"[Memory] Backfilled numeric timestamps on {backfilled} memories")
+
+    cutoff = time.time() - days_to_keep * 86400
+    deleted = 0
+    for name, store in (("bitbud", memory_service.memory_store), ("bitbud_sessions", memory_service.session_store)):
+        if store is None:
+            continue
+        collection = store._collection
+        backend = memory_service.backend(name)
+        while True:
+            # Ids only (no documents or embeddings), one page at a time
+            old_ids = collection.get(where={"ts": {"$lt": cutoff}}, include=[], limit=RETENTION_PAGE_SIZE)["ids"]
+            if not old_ids:
+                break
+            backend.delete(old_ids)
+            deleted += len(old_ids)
+
+    duration_ms = round((time.perf_counter() - started) * 1000, 1)
+    print(f"[Memory] Retention removed {deleted} memories older than {days_to_keep:g} days in {duration_ms} ms")
+    return {"deleted": deleted, "cutoff": cutoff}
+
+
+retention_job = PeriodicJob(
+    "memory_retention", cleanup_old_memories, RETENTION_INTERVAL_HOURS * 3600, RETENTION_STATE_PATH
+) if MEMORY_RETENTION_DAYS > 0 else None
+
+def _start_retention():
+    if retention_job is not None and memory_service.memory_store is not None:
+        retention_job.start()
+
+memory_service.when_ready(_start_retention)
+
+
+def _closed_sessions(cutoff: float, limit: int) -> list[str]:
+    """Session ids that have hot turns older than `cutoff`, oldest pages first."""
+    hot = memory_service.memory_store._collection
+    sessions = []
+    offset = 0
+    while len(sessions) < limit:
+        page = hot.get(where={"ts": {"$lt": cutoff}}, include=["metadatas"], limit=RETENTION_PAGE_SIZE, offset=offset)
+        if not page["ids"]:
+            break
+        for metadata in page["metadatas"]:
+            session_id = (metadata or {}).get("session_id")
+            if session_id and session_id != _current_session_id and session_id not in sessions:
+                sessions.append(session_id)
+        offset += RETENTION_PAGE_SIZE
+    return sessions[:limit]
+
+
+def compact_closed_sessions(max_sessions: int = COMPACTION_MAX_SESSIONS) -> dict:
+    """
+    Replace the raw turns of every session idle for more than SESSION_GAP_S with one summary per
+    COMPACTION_TURNS_PER_SUMMARY turns in the cold tier. Summary ids are derived from the session,
+    so a run interrupted between writing summaries and deleting turns is simply redone.
+    """
+    hot = memory_service.memory_store._collection
+    hot_backend = memory_service.backend("bitbud")
+    cold_backend = memory_service.backend("bitbud_sessions")
+    cutoff = time.time() - SESSION_GAP_S
+    compacted_sessions = compacted_turns = summaries = 0
+
+    for session_id in _closed_sessions(cutoff, max_sessions):
+        turns = hot.get(where={"session_id": session_id}, include=["documents", "metadatas"])
+        stamps = [(metadata or {}).get("ts", 0.0) for metadata in turns["metadatas"]]
+        if not turns["ids"] or max(stamps) >= cutoff:
+            # The session picked up again since it was listed
+            continue
+
+        order = sorted(range(len(turns["ids"])), key=lambda i: stamps[i])
+        texts, metadatas, ids = [], [], []
+        for start in range(0, len(order), COMPACTION_TURNS_PER_SUMMARY):
+            group = order[start:start + COMPACTION_TURNS_PER_SUMMARY]
+            group_turns = [turns["documents"][i] for i in group]
+            summary = summarize_session(group_turns) or " ".join(group_turns)
+            texts.append(summary)
+            metadatas.append({
+                "session_id": session_id,
+                "ts": stamps[group[0]],
+                "ts_end": stamps[group[-1]],
+                "turns": len(group),
+                "context": summary,
+                "tier": "cold",
+            })
+            ids.append(f"{session_id}-{start // COMPACTION_TURNS_PER_SUMMARY}")
+
+        cold_backend.upsert(ids, memory_service.embeddings.embed_documents(texts), texts, metadatas)
+        hot_backend.delete(turns["ids"])
+        compacted_sessions += 1
+        compacted_turns += len(turns["ids"])
+        summaries += len(ids)
+
+    if compacted_sessions:
+        print(f"[Memory] Compacted {compacted_turns} turns from {compacted_sessions} sessions into {summaries} summaries")
+    return {"sessions": compacted_sessions, "turns": compacted_turns, "summaries": summaries}
+
+
+compaction_job = PeriodicJob(
+    "session_compaction", compact_closed_sessions, COMPACTION_INTERVAL_MIN * 60, COMPACTION_STATE_PATH
+) if SESSION_COMPACTION else None
+
+def _start_compaction():
+    if compaction_job is not None and memory_service.session_store is not None:
+        compaction_job.start()
+
+memory_service.when_ready(_start_compaction)
+
+
+memory_dedup = RecentDuplicates(DEDUP_WINDOW, DEDUP_MAX_DISTANCE) if MEMORY_DEDUP else None
+
+def _seed_dedup():
+    """Load the last few days of memories into the duplicate index, so repeats are caught across restarts."""
+    if memory_dedup is None or memory_service.memory_store is None:
+        return
+    recent = memory_service.memory_store._collection.get(
+        where={"ts": {"$gte": time.time() - DEDUP_SEED_DAYS * 86400}}, include=["documents", "metadatas"]
+    )
+    rows = sorted(
+        zip(recent["ids"], recent["documents"], recent["metadatas"]),
+        key=lambda row: (row[2] or {}).get("ts", 0.0)
+    )[-DEDUP_WINDOW:]
+    seeded = memory_dedup.seed((memory_id, document) for memory_id, document, _ in rows)
+    print(f"[Memory] Duplicate index seeded with {seeded} recent memories")
+
+memory_service.when_ready(_seed_dedup)
+
+
+def dedup_stats() -> dict:
+    return memory_dedup.stats() if memory_dedup else {"enabled": False}
+
+
+def _bump_memories(batch: list) -> list:
+    """Count repeats against the memories they duplicate; returns the records whose memory no longer exists."""
+    seen = {}
+    for record, memo in batch:
+        times, last_seen, first = seen.get(record["duplicate_of"], (0, 0.0, (record, memo)))
+        seen[record["duplicate_of"]] = (times + 1, max(last_seen, record["metadata"]["ts"]), first)
+
+    collection = memory_service.memory_store._collection
+    existing = collection.get(ids=list(seen), include=["metadatas"])
+    if existing["ids"]:
+        # Metadata-only update; seen_count isn't used for ranking, so in-process indexes needn't mirror it
+        collection.update(
+            ids=existing["ids"],
+            metadatas=[
+                bump_metadata(metadata, *seen[memory_id][:2])
+                for memory_id, metadata in zip(existing["ids"], existing["metadatas"])
+            ]
         )
-        about_store.add_texts(chunks)
-
-def is_worth_storing(text: str) -> bool:
-    """Filter out trivial messages that don't need long-term storage"""
-    text_lower = text.lower().strip()
-
-    # Skip common greetings/acknowledgments
-    trivial_patterns = [
-        "hi", "hello", "hey", "thanks", "thank you", "ok", "okay", 
-        "yes", "no", "sure", "good", "great", "nice", "cool",
-        "bye", "goodbye", "see you", "lol", "haha", "hmm", "oh",
-        "got it", "understood", "will do", "sounds good", "alright",
-        "no problem", "you too", "take care", "have a nice day",
-        "i see", "interesting", "right", "exactly", "absolutely",
-        "i agree", "i understand", "that's fine", "that's okay",
-    ]
-    
-    # message is just trivial words >> skip
-    words = text_lower.split()
-    if all(word in trivial_patterns for word in words) or text_lower in trivial_patterns:
-        return False
-    
-    return True
-
-def cleanup_old_memories(days_to_keep=45):
-    """Remove memories older than 45 days"""
-    cutoff_date = datetime.now() - timedelta(days=days_to_keep)
-    cutoff_iso = cutoff_date.isoformat()
-    
+        print(f"[Memory] Bumped {len(existing['ids'])} memories said again")
+    # Deleted since (retention, compaction): store the first repeat as a new memory under its own id
+    found = set(existing["ids"])
+    missing = [seen[memory_id][2] for memory_id in seen if memory_id not in found]
+    if memory_dedup:
+        for record, _ in missing:
+            memory_dedup.remember(record["text"], record["id"])
+    return missing
+
+
+def _write_memories(batch: list) -> None:
+    """Write-behind worker: store new memories, then bump the ones repeated (duplicates queue after their original)."""
+    new = [item for item in batch if not item[0].get("duplicate_of")]
+    repeats = [item for item in batch if item[0].get("duplicate_of")]
+    if new:
+        _insert_memories(new)
+    if repeats:
+        missing = _bump_memories(repeats)
+        if missing:
+            _insert_memories(missing)
+
+
+def _insert_memories(batch: list) -> None:
+    """Summarize each memory, then embed and upsert the batch in one call."""
+    texts, metadatas, ids = [], [], []
+    for record, memo in batch:
+        metadata = dict(record["metadata"])
+        metadata["context"] = generate_context_summary(record["text"], memo)
+        texts.append(record["text"])
+        metadatas.append(metadata)
+        ids.append(record["id"])
+
+    # Fixed ids make replaying a spooled record an overwrite instead of a duplicate
+    memory_service.backend("bitbud").upsert(ids, memory_service.embeddings.embed_documents(texts), texts, metadatas)
+    print(f"[Memory] Stored {len(texts)} memories in background")
+
+
+memory_writer = None
+if MEMORY_WRITE_BEHIND:
     try:
-        all_docs = vectorstore.get()
-        
-        # Find old documents
-        old_doc_ids = []
-        for i, metadata in enumerate(all_docs['metadatas']):
-            if metadata and 'timestamp' in metadata:
-                if metadata['timestamp'] < cutoff_iso:
-                    old_doc_ids.append(all_docs['ids'][i])
-        
-        # Delete old documents
-        if old_doc_ids:
-            vectorstore.delete(old_doc_ids)
-            print(f"[Memory] Cleaned up {len(old_doc_ids)} old memories")
-            
+        memory_writer = WriteBehindQueue(
+            "memory", _write_memories, MEMORY_SPOOL_DIR,
+            max_queue=MEMORY_QUEUE_SIZE, max_batch_size=MEMORY_WRITE_BATCH, max_wait_ms=MEMORY_WRITE_WAIT_MS
+        )
     except Exception as e:
-        print(f"[Memory] Cleanup failed: {e}")
+        logger.error(f"Failed to start memory write-behind queue, writing synchronously: {e}")
+
+
+def flush_memory(timeout: float = None) -> bool:
+    """Wait until queued memory writes are in Chroma (shutdown, tests, scripts that read right after writing)."""
+    return memory_writer.flush(timeout) if memory_writer else True
 
 
-def store_to_memory(text: str, metadata: dict = None):
+def store_to_memory(text: str, metadata: dict = None, memo=None):
 
     # Skip trivial messages
     if not is_worth_storing(text):
         print(f"[Memory] Skipped storing trivial message: {text}")
         return
 
-    context = generate_context_summary(text)
-
     # Prepare metadata with session info
     metadata = metadata or {}
-    metadata["context"] = context
-    metadata["timestamp"] = datetime.now().isoformat()
+    now = datetime.now()
+    metadata["timestamp"] = now.isoformat()
+    metadata["ts"] = now.timestamp()
     metadata["session_id"] = _get_current_session_id()
     metadata["source"] = "conversation"
+    metadata["tier"] = "hot"
+
+    duplicate_of = memory_dedup.find(text) if memory_dedup else None
+    if duplicate_of:
+        # Own id: the queue and spool are keyed by record id, so reusing the original's would replace it while queued
+        record = {"id": str(uuid.uuid4()), "text": text, "metadata": metadata, "duplicate_of": duplicate_of}
+        if not (memory_writer and memory_writer.submit(record, memo)):
+            _write_memories([(record, memo)])
+        print(f"[Memory] Repeat of memory {duplicate_of}, not stored again: {text}")
+        return
 
-    vectorstore.add_texts(
-        texts=[text],
-        metadatas=[metadata]
-    )
+    record = {"id": str(uuid.uuid4()), "text": text, "metadata": metadata}
+    if memory_dedup:
+        memory_dedup.remember(text, record["id"])
+    if memory_writer and memory_writer.submit(record, memo):
+        print(f"[Memory] Queued: {text}")
+        return
+
+    metadata["context"] = generate_context_summary(text, memo)
+
+    # Passing the precomputed vector so Chroma doesn't embed the text a second time
+    memory_service.backend("bitbud").upsert([record["id"]], [embed_text(text, memo)], [text], [metadata])
 
     print(f"[Memory] Stored: {text} with metadata: {metadata}")
 
 
-def retrieve_context(query: str, k=5, score_threshold=0.75) -> list[str]:
-    docs = vectorstore.similarity_search(query, k=k*2)
-    
-    query_context = generate_context_summary(query)
-    current_session = _get_current_session_id()
-
-    scored_docs = []
-    
-    for doc in docs:
-        relevance_score = 1.0  # Base score
-        
-        # Boost recent conversations
-        if doc.metadata.get("session_id") == current_session:
-            relevance_score *= 1.5
-        
-        # Boost by recency (last 24 hours get higher scores)
-        if 'timestamp' in doc.metadata:
-            try:
-                doc_time = datetime.fromisoformat(doc.metadata['timestamp'])
-                hours_ago = (datetime.now() - doc_time).total_seconds() / 3600
-                if hours_ago < 24:
-                    relevance_score *= (1.2 - hours_ago/100)  # Recency boost
-            except:
-                pass
-
-        # Context matching boost
-        if query_context:
-            query_tokens = set(query_context.lower().split())
-            context_meta = doc.metadata.get("context", "").lower()
-            if any(token in context_meta for token in query_tokens):
-                relevance_score *= 1.3
-
-        scored_docs.append((doc, relevance_score))
-
-    # Retrieve top k docs with a score above the threshold
-    scored_docs.sort(key=lambda x: x[1], reverse=True)
-    final_docs = [doc for doc, score in scored_docs[:k]]
-    
-    results = [doc.page_content for doc in final_docs]
+def retrieve_context(query: str, k=5, score_threshold=RETRIEVAL_MIN_SIMILARITY, memo=None, fetch_k=None) -> list[str]:
+    query_vector = embed_text(query, memo)
+
+    # Hot turns (current and not-yet-compacted sessions) plus cold session summaries
+    backends = [memory_service.backend("bitbud")]
+    if SESSION_COMPACTION and memory_service.session_store is not None:
+        backends.append(memory_service.backend("bitbud_sessions"))
+
+    documents, metadatas, vectors = [], [], []
+    for backend in backends:
+        # Candidate vectors come back with the documents, for MMR
+        candidates = backend.query(query_vector, max(k, fetch_k or RETRIEVAL_FETCH_K))
+        documents.extend(candidates.documents)
+        metadatas.extend(candidates.metadatas)
+        vectors.extend(candidates.vectors)
+
+    if not documents:
+        print("[Memory] Retrieved 0 relevant memories")
+        return []
+
+    if RETRIEVAL_BOOST == "keywords":
+        query_tokens = set(extract_keywords(query))
+    else:
+        query_context = generate_context_summary(query, memo)
+        query_tokens = set(query_context.lower().split()) if query_context else set()
+
+    keep = rerank(
+        query_vector,
+        vectors,
+        metadatas,
+        k,
+        query_tokens=query_tokens,
+        session_id=_get_current_session_id(),
+        min_similarity=score_threshold,
+        mmr_lambda=RETRIEVAL_MMR_LAMBDA
+    )
+
+    results = [documents[i] for i in keep]
     print(f"[Memory] Retrieved {len(results)} relevant memories")
     return results
 
-def retrieve_about_context(query: str, k=3) -> list[str]:
-    results = about_store.similarity_search(query, k=k)
-    return [doc.page_content for doc in results]
+def retrieve_about_context(query: str, k=3, memo=None) -> list[str]:
+    return memory_service.backend("about_user").query(embed_text(query, memo), k).documents
 
 
 
 # --- Main handler
-def handle_user_input(user_input: str) -> str:
+def handle_user_input(user_input: str, memo=None, on_token=None) -> str:
 
     try:
-        # Load ABOUT.md if it changed
-        _load_about_if_changed()
-        
-        # Periodic cleanup (every 100 interactions)
-        if _last_interaction_time and datetime.now().hour == 3:  # 3 AM cleanup
-            cleanup_old_memories()
-
-        # Store user input (with filtering)
-        store_to_memory(user_input)
-
         # Retrieve relevant context
-        memory_context = retrieve_context(user_input)
-        about_context = retrieve_about_context(user_input)
+        memory_context = retrieve_context(user_input, memo=memo)
+        about_context = retrieve_about_context(user_input, memo=memo)
+
+        # Store user input (with filtering). Queued after retrieval so the turn doesn't retrieve
+        # itself and the writer reuses the summary retrieve_context already put in the memo
+        store_to_memory(user_input, memo=memo)
 
         prompt = build_rag_prompt(user_input, memory_context, about_context)
 
-        reply = llm.invoke(prompt).strip()
+        if on_token:
+            # Streaming /ask: forward answer tokens as Ollama produces them
+            reply = stream_llm(prompt, on_token, memo, label="rag")
+        else:
+            reply = invoke_llm(prompt, memo, label="rag")
 
         # Store reply (with filtering)
-        store_to_memory(reply, metadata={"source": "BitBud"})
+        store_to_memory(reply, metadata={"source": "BitBud"}, memo=memo)
 
         return reply
 
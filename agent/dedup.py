@@ -0,0 +1,127 @@
+import re
+import hashlib
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+_TOKEN = re.compile(r"[a-z0-9']+")
+
+
+def normalize(text: str) -> str:
+    """Lowercase, punctuation dropped, whitespace collapsed: "Open Spotify!" and "open spotify" are the same memory."""
+    return " ".join(_TOKEN.findall(text.lower()))
+
+
+def _feature_hash(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash over word unigrams and bigrams; near-identical texts differ in only a few bits."""
+    words = normalize(text).split()
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    if not features:
+        return 0
+    hashes = np.array([_feature_hash(feature) for feature in features], dtype=np.uint64)
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    # Each bit is set when most features have it set
+    majority = bits.sum(axis=0, dtype=np.int64) * 2 > len(features)
+    return int(np.packbits(majority, bitorder="little").view(np.uint64)[0])
+
+
+def _exact_key(text: str) -> str:
+    return hashlib.sha1(normalize(text).encode("utf-8")).hexdigest()
+
+
+class RecentDuplicates:
+    """
+    Exact and near-duplicate lookup over the most recently stored memories.
+
+    Exact matches are found by hash of the normalized text; near matches by SimHash Hamming distance
+    (<= max_distance bits of 64) against a ring buffer of the last `window` fingerprints, one vectorized
+    popcount per lookup. Everything is in memory, so a lookup costs well under a millisecond on the
+    request path; seed() preloads memories written before a restart.
+    """
+
+    def __init__(self, window: int = 2000, max_distance: int = 3):
+        self.window = max(1, window)
+        self.max_distance = max_distance
+        self._fingerprints = np.zeros(self.window, dtype=np.uint64)
+        self._ids: List[Optional[str]] = [None] * self.window
+        self._keys: List[Optional[str]] = [None] * self.window
+        self._slots: Dict[str, int] = {}
+        self._next = 0
+        self._filled = 0
+        self._lock = threading.Lock()
+        self.checks = 0
+        self.exact = 0
+        self.near = 0
+
+    def _add(self, key: str, fingerprint: int, memory_id: str):
+        # Caller holds self._lock; overwrites the oldest slot once the window is full
+        slot = self._next
+        evicted = self._keys[slot]
+        if evicted is not None and self._slots.get(evicted) == slot:
+            del self._slots[evicted]
+        self._fingerprints[slot] = fingerprint
+        self._ids[slot] = memory_id
+        self._keys[slot] = key
+        self._slots[key] = slot
+        self._next = (slot + 1) % self.window
+        self._filled = min(self._filled + 1, self.window)
+
+    def find(self, text: str) -> Optional[str]:
+        """Id of a recent memory this text duplicates, or None."""
+        key = _exact_key(text)
+        with self._lock:
+            self.checks += 1
+            slot = self._slots.get(key)
+            if slot is not None:
+                self.exact += 1
+                return self._ids[slot]
+            if self.max_distance <= 0 or self._filled == 0:
+                return None
+
+        fingerprint = np.uint64(simhash(text))
+        with self._lock:
+            distances = np.bitwise_count(self._fingerprints[:self._filled] ^ fingerprint)
+            nearest = int(np.argmin(distances))
+            if distances[nearest] > self.max_distance:
+                return None
+            self.near += 1
+            return self._ids[nearest]
+
+    def remember(self, text: str, memory_id: str):
+        key, fingerprint = _exact_key(text), simhash(text)
+        with self._lock:
+            self._add(key, fingerprint, memory_id)
+
+    def seed(self, rows: Iterable[Tuple[str, str]]) -> int:
+        """Add (memory id, text) pairs, oldest first, skipping texts already remembered."""
+        prepared = [(_exact_key(text), simhash(text), memory_id) for memory_id, text in rows if text]
+        seeded = 0
+        with self._lock:
+            for key, fingerprint, memory_id in prepared:
+                if key not in self._slots:
+                    self._add(key, fingerprint, memory_id)
+                    seeded += 1
+        return seeded
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": self._filled,
+                "window": self.window,
+                "max_distance": self.max_distance,
+                "checks": self.checks,
+                "exact_duplicates": self.exact,
+                "near_duplicates": self.near,
+                "suppression_rate": round((self.exact + self.near) / self.checks, 4) if self.checks else 0.0,
+            }
+
+
+def bump_metadata(metadata: dict, times: int, seen_at: float) -> dict:
+    """Metadata of a memory said `times` more times: its sighting count and when it was last seen (epoch seconds)."""
+    metadata = metadata or {}
+    return {**metadata, "seen_count": int(metadata.get("seen_count", 1)) + times, "last_seen": seen_at}
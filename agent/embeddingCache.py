@@ -0,0 +1,220 @@
+import os
+import time
+import atexit
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+_registry: Dict[str, "CachedEmbeddings"] = {}
+
+
+class EmbeddingStore:
+    """
+    Fixed-size float32 matrix in a memory-mapped file plus a SQLite index of key -> row.
+
+    Rows are reused least-recently-used first once the file is full. The matrix is created on the
+    first insert, when the embedding dimension is known. Inserts run inside an IMMEDIATE transaction,
+    so uvicorn workers sharing the directory don't hand out the same row twice. Vector rows reach disk
+    through the page cache: a process crash keeps them, an OS crash can leave indexed rows unwritten.
+    """
+
+    def __init__(self, directory: str, name: str, max_bytes: int):
+        os.makedirs(directory, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._vectors_path = os.path.join(directory, f"{name}.f32")
+        self._db = sqlite3.connect(
+            os.path.join(directory, f"{name}.sqlite"), check_same_thread=False, isolation_level=None, timeout=10
+        )
+        self._db.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, slot INTEGER UNIQUE, used REAL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_used ON entries (used)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER)")
+
+        self.dim: Optional[int] = None
+        self.capacity = 0
+        self._vectors = None
+        self.evictions = 0
+        self._open_existing()
+
+    def _open_existing(self) -> bool:
+        meta = dict(self._db.execute("SELECT name, value FROM meta").fetchall())
+        if not meta.get("dim") or not os.path.exists(self._vectors_path):
+            return False
+        if meta["capacity"] != max(1, self.max_bytes // (meta["dim"] * 4)):
+            # Size setting changed: the file is recreated (and the cache emptied) on the next insert
+            return False
+        self.dim, self.capacity = meta["dim"], meta["capacity"]
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(self.capacity, self.dim))
+        return True
+
+    def _create(self, dim: int):
+        # Caller holds the write transaction
+        self.dim = dim
+        self.capacity = max(1, self.max_bytes // (dim * 4))
+        self._db.execute("DELETE FROM entries")
+        self._db.execute("INSERT OR REPLACE INTO meta VALUES ('dim', ?)", (dim,))
+        self._db.execute("INSERT OR REPLACE INTO meta VALUES ('capacity', ?)", (self.capacity,))
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="w+", shape=(self.capacity, dim))
+        logger.info(f"Embedding cache file {self._vectors_path}: {self.capacity} x {dim} float32")
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        if self._vectors is None and not self._open_existing():
+            return None
+        row = self._db.execute("SELECT slot FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        self._db.execute("UPDATE entries SET used = ? WHERE key = ?", (time.time(), key))
+        return np.array(self._vectors[row[0]])
+
+    def put_many(self, items: List[tuple]):
+        """Insert (key, vector) pairs in one transaction, evicting the least recently used rows when full."""
+        if not items:
+            return
+        dim = len(items[0][1])
+        now = time.time()
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            if self._vectors is None:
+                self._open_existing()
+            if self._vectors is None or self.dim != dim:
+                self._create(dim)
+
+            used = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            for key, vector in items:
+                existing = self._db.execute("SELECT slot FROM entries WHERE key = ?", (key,)).fetchone()
+                if existing is not None:
+                    slot = existing[0]
+                elif used < self.capacity:
+                    slot = self._db.execute("SELECT COALESCE(MAX(slot) + 1, 0) FROM entries").fetchone()[0]
+                    used += 1
+                else:
+                    oldest_key, slot = self._db.execute("SELECT key, slot FROM entries ORDER BY used LIMIT 1").fetchone()
+                    self._db.execute("DELETE FROM entries WHERE key = ?", (oldest_key,))
+                    self.evictions += 1
+                self._vectors[slot] = vector
+                self._db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?)", (key, slot, now))
+            self._db.execute("COMMIT")
+        except Exception:
+            self._db.execute("ROLLBACK")
+            raise
+
+    def flush(self):
+        if self._vectors is not None:
+            self._vectors.flush()
+
+    def size_bytes(self) -> int:
+        return self.capacity * (self.dim or 0) * 4
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper keyed by (model, text hash): an in-RAM LRU in front of a memory-mapped
+    EmbeddingStore on disk. Only texts missing from both are passed to the wrapped embedder,
+    in one embed_documents call per request.
+    """
+
+    def __init__(self, base: Embeddings, model_name: str, directory: str,
+                 max_disk_mb: float = 64.0, max_ram_entries: int = 4096, name: str = "embeddings"):
+        self.base = base
+        self.model_name = model_name
+        self.max_ram_entries = max(1, max_ram_entries)
+        self._ram: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._store = EmbeddingStore(
+            directory, hashlib.sha1(model_name.encode("utf-8")).hexdigest()[:16], int(max_disk_mb * 1024 * 1024)
+        )
+
+        self.ram_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        _registry[name] = self
+        atexit.register(self.flush)
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha1(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, vector: np.ndarray):
+        # Caller holds self._lock
+        self._ram[key] = vector
+        self._ram.move_to_end(key)
+        while len(self._ram) > self.max_ram_entries:
+            self._ram.popitem(last=False)
+
+    def _lookup(self, key: str) -> Optional[np.ndarray]:
+        # Caller holds self._lock
+        vector = self._ram.get(key)
+        if vector is not None:
+            self._ram.move_to_end(key)
+            self.ram_hits += 1
+            return vector
+        vector = self._store.get(key)
+        if vector is not None:
+            self._remember(key, vector)
+            self.disk_hits += 1
+        return vector
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(text) for text in texts]
+        found: Dict[str, np.ndarray] = {}
+        missing: Dict[str, str] = {}
+        with self._lock:
+            for key, text in zip(keys, texts):
+                if key in found or key in missing:
+                    continue
+                vector = self._lookup(key)
+                if vector is None:
+                    missing[key] = text
+                else:
+                    found[key] = vector
+
+        if missing:
+            # Computed outside the lock so concurrent hits aren't held up by the model
+            computed = self.base.embed_documents(list(missing.values()))
+            fresh = [(key, np.asarray(vector, dtype=np.float32)) for key, vector in zip(missing, computed)]
+            with self._lock:
+                self.misses += len(fresh)
+                for key, vector in fresh:
+                    self._remember(key, vector)
+                self._store.put_many(fresh)
+            found.update(fresh)
+
+        return [found[key].tolist() for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def flush(self):
+        with self._lock:
+            self._store.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.ram_hits + self.disk_hits + self.misses
+            return {
+                "model": self.model_name,
+                "ram_entries": len(self._ram),
+                "max_ram_entries": self.max_ram_entries,
+                "disk_entries": len(self._store),
+                "disk_capacity": self._store.capacity,
+                "disk_bytes": self._store.size_bytes(),
+                "evictions": self._store.evictions,
+                "ram_hits": self.ram_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.ram_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+
+def embedding_cache_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: cache.stats() for name, cache in _registry.items()}
@@ -0,0 +1,132 @@
+import os
+import json
+import time
+import logging
+import numpy as np
+from typing import Any, Dict, Iterable, List, Optional
+from agent.chromaMemory import embed_text
+from agent.memoryService import memory_service
+
+logger = logging.getLogger(__name__)
+
+INTENT_EXAMPLES_PATH = "agent/data/intent_examples.json"
+
+# Cosine similarity the top example must reach, and the gap it must keep over the best
+# example with a different tool call (function + args), before the planner LLM is skipped
+MIN_SIMILARITY = float(os.getenv("BITBUD_EMBED_ROUTER_MIN_SIMILARITY", "0.80"))
+MIN_MARGIN = float(os.getenv("BITBUD_EMBED_ROUTER_MIN_MARGIN", "0.06"))
+
+_index = None
+
+
+class IntentIndex:
+    """In-memory matrix of labelled example utterances, one row per example."""
+
+    def __init__(self, texts: List[str], functions: List[str], args: List[Optional[dict]], vectors: np.ndarray):
+        self.texts = texts
+        self.functions = functions
+        self.args = args
+        # Examples without "args" only vote for a function; they can't be emitted directly
+        self.labels = [
+            f"{func}:{json.dumps(arg, sort_keys=True)}" if arg is not None else f"{func}:?"
+            for func, arg in zip(functions, args)
+        ]
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        self.matrix = vectors / np.maximum(norms, 1e-12)
+
+    def __len__(self):
+        return len(self.texts)
+
+    def scores(self, query_vector: List[float]) -> np.ndarray:
+        query = np.asarray(query_vector, dtype=np.float32)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+        return self.matrix @ query
+
+
+def load_intent_examples(path: str = INTENT_EXAMPLES_PATH) -> Dict[str, List[dict]]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def build_intent_index(valid_functions: Iterable[str], path: str = INTENT_EXAMPLES_PATH) -> Optional[IntentIndex]:
+    """Embed every labelled example once (at startup) and keep them as a normalized matrix."""
+    global _index
+
+    embeddings = memory_service.embeddings
+    if embeddings is None:
+        logger.warning("Embedding function unavailable, embedding router disabled")
+        _index = None
+        return None
+
+    try:
+        examples = load_intent_examples(path)
+    except Exception as e:
+        logger.error(f"Failed to load intent examples from {path}: {e}")
+        _index = None
+        return None
+
+    valid_functions = set(valid_functions)
+    texts, functions, args = [], [], []
+    for func, items in examples.items():
+        if func not in valid_functions:
+            logger.warning(f"Skipping intent examples for unknown function: {func}")
+            continue
+        for item in items:
+            texts.append(item["text"])
+            functions.append(func)
+            args.append(item.get("args"))
+
+    if not texts:
+        _index = None
+        return None
+
+    start = time.perf_counter()
+    vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+    _index = IntentIndex(texts, functions, args, vectors)
+    logger.info(f"Embedding router index built: {len(_index)} examples in {time.perf_counter() - start:.2f}s")
+    return _index
+
+
+def classify_intent(user_input: str, memo=None, index: Optional[IntentIndex] = None) -> Optional[Dict[str, Any]]:
+    """Nearest labelled example for the input, with its similarity and margin over the runner-up label."""
+    index = index or _index
+    if index is None or not user_input.strip():
+        return None
+
+    scores = index.scores(embed_text(user_input, memo))
+    order = np.argsort(-scores)
+    top = int(order[0])
+
+    runner_up = 0.0
+    for i in order[1:]:
+        if index.labels[i] != index.labels[top]:
+            runner_up = float(scores[i])
+            break
+
+    return {
+        "function": index.functions[top],
+        "args": index.args[top],
+        "example": index.texts[top],
+        "score": float(scores[top]),
+        "margin": float(scores[top]) - runner_up,
+    }
+
+
+def route_by_embedding(user_input: str, memo=None) -> Optional[Dict[str, Any]]:
+    """Return a tool chain when the nearest example is confidently ahead, otherwise None."""
+    match = classify_intent(user_input, memo)
+    if match is None:
+        return None
+
+    if match["args"] is None or match["score"] < MIN_SIMILARITY or match["margin"] < MIN_MARGIN:
+        logger.info(
+            f"Embedding router deferred to planner: {match['function']} "
+            f"(score {match['score']:.3f}, margin {match['margin']:.3f})"
+        )
+        return None
+
+    args = dict(match["args"])
+    if match["function"] == "fallback":
+        args["user_input"] = user_input
+
+    return {**match, "tool_chain": [{"function": match["function"], "args": args}]}
@@ -0,0 +1,213 @@
+import re
+import logging
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Apps that open_app knows how to launch; anything else goes through the LLM
+KNOWN_APPS = ["spotify", "vscode", "youtube", "netflix", "chatgpt", "linkedin", "github", "chrome", "terminal"]
+
+_POLITE_PREFIX = re.compile(r"^(hey |hi |ok |okay )?(bitbud[,:]?\s+)?(please |can you |could you )?")
+_POLITE_SUFFIX = re.compile(r"\s*(please|for me|now)$")
+
+_UNIT_SECONDS = {"second": 1, "sec": 1, "minute": 60, "min": 60, "hour": 3600, "hr": 3600}
+
+
+def _normalize(text: str) -> str:
+    text = text.lower().strip()
+    text = re.sub(r"[?!.]+$", "", text).strip()
+    text = re.sub(r"\s+", " ", text)
+    text = _POLITE_PREFIX.sub("", text)
+    text = _POLITE_SUFFIX.sub("", text)
+    return text.strip()
+
+
+def _seconds(amount: str, unit: str) -> int:
+    unit = unit.rstrip("s")
+    return int(amount) * _UNIT_SECONDS[unit]
+
+
+def _alarm(match: re.Match) -> Dict[str, Any]:
+    hour = int(match.group("hour"))
+    minute = int(match.group("minute") or 0)
+    meridiem = match.group("meridiem")
+    if meridiem == "pm" and hour < 12:
+        hour += 12
+    elif meridiem == "am" and hour == 12:
+        hour = 0
+    return {"type": "alarm", "hour": hour, "minute": minute, "objective": match.group("objective") or ""}
+
+
+def _volume_step(match: re.Match) -> Dict[str, Any]:
+    direction = match.group("direction") or match.group("direction2")
+    args = {"type": "volume", "action": "up" if direction in ("up", "increase", "raise") else "down"}
+    if match.group("value"):
+        args["value"] = int(match.group("value"))
+    return args
+
+
+# Each rule fully matches the normalized utterance; partial matches fall through to the LLM
+RULES = [
+    {
+        "name": "clock.get_time",
+        "pattern": r"(what('s| is) the (current )?time|what time is it( now)?|(tell me|show) the time|current time|time)",
+        "function": "clock",
+        "build": lambda m: {"type": "get_time"},
+    },
+    {
+        "name": "clock.get_active_alarms",
+        "pattern": r"((list|show|get)( all| my)? alarms|what alarms do i have)",
+        "function": "clock",
+        "build": lambda m: {"type": "get_active_alarms"},
+    },
+    {
+        "name": "clock.get_active_timers",
+        "pattern": r"((list|show|get)( all| my)? timers|what timers do i have)",
+        "function": "clock",
+        "build": lambda m: {"type": "get_active_timers"},
+    },
+    {
+        "name": "clock.clear_alarms",
+        "pattern": r"(clear|delete|remove)( all| my)? alarms",
+        "function": "clock",
+        "build": lambda m: {"type": "clear_alarms"},
+    },
+    {
+        "name": "clock.clear_timers",
+        "pattern": r"(clear|delete|remove)( all| my)? timers",
+        "function": "clock",
+        "build": lambda m: {"type": "clear_timers"},
+    },
+    {
+        "name": "clock.alarm",
+        "pattern": r"(set|create) (an |a )?alarm (for|at) (?P<hour>\d{1,2})(:(?P<minute>\d{2}))? ?(?P<meridiem>am|pm)?( to (?P<objective>.+))?",
+        "function": "clock",
+        "build": _alarm,
+    },
+    {
+        "name": "clock.timer",
+        "pattern": r"((set|start) (a |an )?timer for (?P<amount>\d+) ?(?P<unit>seconds?|secs?|minutes?|mins?|hours?|hrs?)"
+                   r"|(set|start) (a |an )?(?P<amount2>\d+)[ -]?(?P<unit2>second|sec|minute|min|hour|hr) timer)",
+        "function": "clock",
+        "build": lambda m: {
+            "type": "timer",
+            "seconds": _seconds(m.group("amount") or m.group("amount2"), m.group("unit") or m.group("unit2")),
+            "objective": "",
+        },
+    },
+    {
+        "name": "system_control.volume_mute",
+        "pattern": r"(mute|mute (the )?(volume|sound|audio))",
+        "function": "system_control",
+        "build": lambda m: {"type": "volume", "action": "mute"},
+    },
+    {
+        "name": "system_control.volume_unmute",
+        "pattern": r"(unmute|unmute (the )?(volume|sound|audio))",
+        "function": "system_control",
+        "build": lambda m: {"type": "volume", "action": "unmute"},
+    },
+    {
+        "name": "system_control.volume_step",
+        "pattern": r"((the )?volume (?P<direction>up|down)|(?P<direction2>increase|decrease|raise|lower) (the )?volume)( by (?P<value>\d{1,3}) ?%?)?",
+        "function": "system_control",
+        "build": _volume_step,
+    },
+    {
+        "name": "system_control.volume_set",
+        "pattern": r"(set )?(the )?volume (to|at) (?P<value>\d{1,3}) ?%?",
+        "function": "system_control",
+        "build": lambda m: {"type": "volume", "action": "set", "value": int(m.group("value"))},
+    },
+    {
+        "name": "system_control.volume_get",
+        "pattern": r"(what('s| is) the (current )?volume|current volume|get volume)",
+        "function": "system_control",
+        "build": lambda m: {"type": "volume", "action": "get"},
+    },
+    {
+        "name": "system_control.processes",
+        "pattern": r"((show|list|get)( me)?( all| the)?( running)? processes|running processes|processes)",
+        "function": "system_control",
+        "build": lambda m: {"type": "processes"},
+    },
+    {
+        "name": "system_control.get_system_temperature",
+        "pattern": r"((what('s| is) the |check |show |get )?(system |cpu )?temperature|how hot is (my |the )?(laptop|system|cpu))",
+        "function": "system_control",
+        "build": lambda m: {"type": "get_system_temperature"},
+    },
+    {
+        "name": "system_control.get_system_info",
+        "pattern": r"((show|get)( me)? (the )?system info(rmation)?|system info(rmation)?)",
+        "function": "system_control",
+        "build": lambda m: {"type": "get_system_info"},
+    },
+    {
+        "name": "open_app",
+        "pattern": r"(open|launch|start) (?P<name>" + "|".join(KNOWN_APPS) + r")",
+        "function": "open_app",
+        "build": lambda m: {"name": m.group("name"), "query": ""},
+    },
+]
+
+for _rule in RULES:
+    _rule["regex"] = re.compile(_rule["pattern"])
+
+
+# --- Metrics
+_stats_lock = threading.Lock()
+_rule_hits = defaultdict(int)
+_attempts = 0
+
+
+def match_fast_path(user_input: str) -> Optional[Dict[str, Any]]:
+    """Return {"rule", "tool_chain"} for a high-confidence utterance, or None to fall through to the LLM."""
+    global _attempts
+
+    text = _normalize(user_input)
+    with _stats_lock:
+        _attempts += 1
+
+    if not text:
+        return None
+
+    for rule in RULES:
+        match = rule["regex"].fullmatch(text)
+        if not match:
+            continue
+        try:
+            args = rule["build"](match)
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Fast path rule {rule['name']} matched but failed to parse args: {e}")
+            continue
+
+        with _stats_lock:
+            _rule_hits[rule["name"]] += 1
+        return {
+            "rule": rule["name"],
+            "tool_chain": [{"function": rule["function"], "args": args}],
+        }
+
+    return None
+
+
+def fast_path_stats() -> Dict[str, Any]:
+    """Per-rule hit counts and the overall fast-path hit rate."""
+    with _stats_lock:
+        hits = sum(_rule_hits.values())
+        return {
+            "attempts": _attempts,
+            "hits": hits,
+            "misses": _attempts - hits,
+            "hit_rate": round(hits / _attempts, 4) if _attempts else 0.0,
+            "rules": {
+                rule["name"]: {
+                    "hits": _rule_hits[rule["name"]],
+                    "hit_rate": round(_rule_hits[rule["name"]] / _attempts, 4) if _attempts else 0.0,
+                }
+                for rule in RULES
+            },
+        }
@@ -0,0 +1,202 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import logging
+import threading
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Freshness for responses with Last-Modified but no explicit lifetime: 10% of their age, capped (RFC 9111 4.2.2)
+HEURISTIC_FRACTION = 0.1
+HEURISTIC_MAX_S = 24 * 3600
+
+
+def _http_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+
+def _cache_control(headers) -> Dict[str, Optional[str]]:
+    directives = {}
+    for part in headers.get("Cache-Control", "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"') or None
+    return directives
+
+
+def freshness_lifetime(headers, now: float) -> float:
+    """Seconds a response may be reused without revalidation (0 = revalidate every time)."""
+    directives = _cache_control(headers)
+    if "no-cache" in directives:
+        return 0.0
+    if "max-age" in directives:
+        try:
+            return max(0.0, float(directives["max-age"]))
+        except (TypeError, ValueError):
+            return 0.0
+    date = _http_date(headers.get("Date")) or now
+    expires = _http_date(headers.get("Expires"))
+    if expires is not None:
+        return max(0.0, expires - date)
+    last_modified = _http_date(headers.get("Last-Modified"))
+    if last_modified is not None:
+        return min(HEURISTIC_MAX_S, max(0.0, (date - last_modified) * HEURISTIC_FRACTION))
+    return 0.0
+
+
+@dataclass
+class CachedResponse:
+    url: str
+    status_code: int
+    content: bytes
+    headers: Dict[str, str] = field(default_factory=dict)
+    # "fresh" (served from disk), "revalidated" (304), "miss" (downloaded and stored) or "uncached"
+    source: str = "miss"
+
+
+class HttpCache:
+    """
+    Private HTTP cache for GET requests in a SQLite file, shared by every worker on the machine.
+
+    Fresh entries (Cache-Control max-age, Expires, or a Last-Modified heuristic) are served without a
+    request; stale ones are revalidated with If-None-Match / If-Modified-Since, and a 304 reuses the
+    stored body. no-store responses and Vary: * are never stored. Least recently used entries are
+    dropped once the bodies exceed max_bytes.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.fresh_hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.uncacheable = 0
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses (url TEXT PRIMARY KEY, status INTEGER, headers TEXT, body BLOB,"
+            " size INTEGER, expires REAL, used REAL)"
+        )
+        self._db.commit()
+
+    def _load(self, url: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT status, headers, body, expires FROM responses WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        return {"status": row[0], "headers": json.loads(row[1]), "body": row[2], "expires": row[3]}
+
+    def _save(self, url: str, status: int, headers: Dict[str, str], body: bytes, expires: float):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, status, json.dumps(headers), body, len(body), expires, time.time())
+            )
+            total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total > self.max_bytes:
+                # Drop least recently used responses until the bodies fit again
+                self._db.execute(
+                    "DELETE FROM responses WHERE url IN (SELECT url FROM ("
+                    " SELECT url, SUM(size) OVER (ORDER BY used DESC) AS running FROM responses"
+                    ") WHERE running > ?)",
+                    (self.max_bytes,)
+                )
+            self._db.commit()
+
+    def _touch(self, url: str, headers: Optional[Dict[str, str]] = None, expires: Optional[float] = None):
+        with self._lock:
+            if headers is None:
+                self._db.execute("UPDATE responses SET used = ? WHERE url = ?", (time.time(), url))
+            else:
+                self._db.execute(
+                    "UPDATE responses SET headers = ?, expires = ?, used = ? WHERE url = ?",
+                    (json.dumps(headers), expires, time.time(), url)
+                )
+            self._db.commit()
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get(self, session: requests.Session, url: str, timeout: float = 10) -> CachedResponse:
+        """GET through the cache. Raises like session.get() / raise_for_status() on errors."""
+        now = time.time()
+        entry = self._load(url)
+        if entry is not None and entry["expires"] > now:
+            self._touch(url)
+            self._count("fresh_hits")
+            return CachedResponse(url, entry["status"], entry["body"], entry["headers"], "fresh")
+
+        conditional = {}
+        if entry is not None:
+            if entry["headers"].get("ETag"):
+                conditional["If-None-Match"] = entry["headers"]["ETag"]
+            if entry["headers"].get("Last-Modified"):
+                conditional["If-Modified-Since"] = entry["headers"]["Last-Modified"]
+
+        response = session.get(url, headers=conditional, timeout=timeout)
+        now = time.time()
+        if response.status_code == 304 and entry is not None:
+            # Unchanged: keep the stored body, take the new validators and lifetime
+            headers = {**entry["headers"], **self._kept_headers(response.headers)}
+            self._touch(url, headers, now + freshness_lifetime(headers, now))
+            self._count("revalidated")
+            return CachedResponse(url, entry["status"], entry["body"], headers, "revalidated")
+
+        response.raise_for_status()
+        headers = self._kept_headers(response.headers)
+        if self._storable(response):
+            self._save(url, response.status_code, headers, response.content, now + freshness_lifetime(headers, now))
+            self._count("misses")
+            return CachedResponse(url, response.status_code, response.content, headers, "miss")
+        self._count("uncacheable")
+        return CachedResponse(url, response.status_code, response.content, headers, "uncached")
+
+    @staticmethod
+    def _kept_headers(headers) -> Dict[str, str]:
+        names = ("Cache-Control", "Date", "Expires", "ETag", "Last-Modified", "Content-Type", "Vary")
+        return {name: headers[name] for name in names if name in headers}
+
+    @staticmethod
+    def _storable(response: requests.Response) -> bool:
+        if response.status_code != 200:
+            return False
+        if "no-store" in _cache_control(response.headers):
+            return False
+        if re.search(r"(^|,)\s*\*\s*(,|$)", response.headers.get("Vary", "")):
+            return False
+        # Worth keeping only if it can be reused fresh or revalidated later
+        return bool(
+            response.headers.get("ETag") or response.headers.get("Last-Modified")
+            or freshness_lifetime(response.headers, time.time()) > 0
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+            requests_seen = self.fresh_hits + self.revalidated + self.misses + self.uncacheable
+            return {
+                "entries": entries,
+                "bytes": size,
+                "max_bytes": self.max_bytes,
+                "fresh_hits": self.fresh_hits,
+                "revalidated_304": self.revalidated,
+                "misses": self.misses,
+                "uncacheable": self.uncacheable,
+                "hit_rate": round((self.fresh_hits + self.revalidated) / requests_seen, 4) if requests_seen else 0.0,
+            }
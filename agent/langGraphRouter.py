@@ -1,9 +1,12 @@
+import asyncio
+import functools
 import urllib.parse
 from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, END
 from agent.chromaMemory import handle_user_input 
-from typing import TypedDict, Dict, Any, List
-from agent.llm import get_intent, get_plan
+from typing import TypedDict, Dict, Any, List, Callable
+from agent.llm import get_intent, get_plan, get_plan_and_intent, ROUTER_MODE, ROUTER_MODES, STRUCTURED_OUTPUT
+from agent.schemas import TOOL_ARG_SCHEMAS, validate_tool_chain
 from agent.tools.clock import clock
 from agent.tools.search import search_web
 from agent.tools.app_launcher import open_app
@@ -11,6 +14,10 @@ from agent.tools.recommend import recommend_music
 from agent.tools.shell_command import linux_commands
 from agent.tools.system_control import system_control
 from agent.tools.scraper import scraper_tool  # NEW
+from agent.memo import RequestMemo
+from agent.fastPath import match_fast_path
+from agent.embeddingRouter import build_intent_index, route_by_embedding
+from agent.memoryService import memory_service
 import logging
 
 logger = logging.getLogger(__name__)
@@ -28,16 +35,21 @@ class BitBudState(TypedDict, total=False):
     reasoning: str # --- NEW
     steps: List[str] # --- NEW
     final_instruction: str # --- NEW
+    fast_path_rule: str # name of the fast-path rule that handled the input, if any
+    embedding_route: Dict[str, Any] # nearest labelled example when the embedding router handled the input
+    router_mode: str # "two_stage" or "fused", defaults to BITBUD_ROUTER_MODE
+    memo: RequestMemo # per-request cache of plans, LLM calls and embeddings
+    on_token: Callable[[str], None] # set by the streaming endpoint to receive RAG answer tokens
 
 
-def fallback(args: Dict[str, Any] = None) -> str:
+def fallback(args: Dict[str, Any] = None, memo: RequestMemo = None, on_token: Callable[[str], None] = None) -> str:
     """Fallback function that uses RAG for unknown intents."""
     # Remove the problematic global user_input reference
     user_input = args.get("user_input", "") if args else ""
     logger.info(f"user_input_fallback: {user_input}")
     
     if user_input:
-        return handle_user_input(user_input)
+        return handle_user_input(user_input, memo=memo, on_token=on_token)
     return "I'm not sure how to help with that."
 
 
@@ -69,13 +81,93 @@ def normalize_intent_result(result: Any) -> List[Dict[str, Any]]:
         return [result]
     return []
 
+# --- Deterministic fast path for trivial commands, skips the planner/router LLM calls
+def fast_path(state: BitBudState) -> Dict[str, Any]:
+    user_input = state["input"]
+    matched = match_fast_path(user_input)
+
+    if not matched:
+        return {}
+
+    tool_chain = matched["tool_chain"]
+    first_tool = tool_chain[0]
+    logger.info(f"Fast path rule '{matched['rule']}' matched: {tool_chain}")
+
+    return {
+        "fast_path_rule": matched["rule"],
+        "function": first_tool["function"],
+        "args": first_tool["args"],
+        "output": "",
+        "tool_chain": tool_chain,
+        "current_tool_index": 0,
+        "execution_results": []
+    }
+
+
+def after_fast_path(state: BitBudState) -> str:
+    """Unmatched input goes to the embedding router, matched input straight to execution."""
+    if not state.get("fast_path_rule"):
+        return "embedding_route"
+    return decide_execution_path(state)
+
+
+# --- Nearest-neighbour router over labelled examples, skips the planner when confident
+def embedding_route(state: BitBudState) -> Dict[str, Any]:
+    user_input = state["input"]
+    memo = state.get("memo") or RequestMemo()
+
+    try:
+        matched = route_by_embedding(user_input, memo=memo)
+    except Exception as e:
+        logger.error(f"Embedding router failed, using planner: {e}")
+        matched = None
+
+    if not matched:
+        return {"memo": memo}
+
+    tool_chain = matched["tool_chain"]
+    first_tool = tool_chain[0]
+    logger.info(
+        f"Embedding router matched '{matched['example']}' "
+        f"(score {matched['score']:.3f}, margin {matched['margin']:.3f}): {tool_chain}"
+    )
+
+    return {
+        "memo": memo,
+        "embedding_route": {k: matched[k] for k in ("function", "example", "score", "margin")},
+        "function": first_tool["function"],
+        "args": first_tool["args"],
+        "output": "",
+        "tool_chain": tool_chain,
+        "current_tool_index": 0,
+        "execution_results": []
+    }
+
+
+def after_embedding_route(state: BitBudState) -> str:
+    if not state.get("embedding_route"):
+        return "create_plan"
+    return decide_execution_path(state)
+
+
 # --- CoT Planner  # --- NEW
 def create_plan(state: BitBudState) -> Dict[str, Any]:
     user_input = state["input"]
+    memo = state.get("memo") or RequestMemo()
+    
+    router_mode = state.get("router_mode") or ROUTER_MODE
+    if router_mode not in ROUTER_MODES:
+        logger.warning(f"Unknown router mode '{router_mode}', using two_stage")
+        router_mode = "two_stage"
     
-    logger.info(f"Creating plan for user input: {user_input}")
+    logger.info(f"Creating plan for user input: {user_input} (router mode: {router_mode})")
 
-    plan_result = get_plan(user_input)
+    if router_mode == "fused":
+        # Plan and tool chain come back from a single LLM call; route_input skips get_intent
+        plan_result = dict(get_plan_and_intent(user_input, memo=memo))
+        plan_result.pop("raw", None)
+    else:
+        plan_result = get_plan(user_input, memo=memo)
 
     if not plan_result:
         logger.warning("No plan generated by LLM, falling back to RAG.")
@@ -83,24 +175,36 @@ def create_plan(state: BitBudState) -> Dict[str, Any]:
             "clarify": None,
             "reasoning": "No plan generated",
             "steps": [],
-            "final_instruction": {user_input}
+            "final_instruction": user_input,
+            "memo": memo
         }
     logger.info(f"Plan generated: {plan_result}")
 
-    return plan_result
+    return {**plan_result, "memo": memo}
 
 # --- Route input to functions or fallback to RAG
 def route_input(state):
     user_input = state["input"] 
-    plan_result = create_plan(state) # --- NEW
-    clarify = plan_result.get("clarify", None) # --- NEW
-    reasoning = plan_result.get("reasoning", "") # --- NEW
-    steps = plan_result.get("steps", []) # --- NEW
-    final_instruction = plan_result.get("final_instruction", user_input) # --- NEW
-
-    result = get_intent(user_input, clarify, reasoning, steps, final_instruction) # --- NEW
+    memo = state.get("memo")
+    # Plan fields were already written to the state by the create_plan node
+    clarify = state.get("clarify", None) # --- NEW
+    reasoning = state.get("reasoning", "") # --- NEW
+    steps = state.get("steps") or [] # --- NEW
+    final_instruction = state.get("final_instruction") or user_input # --- NEW
+
+    if state.get("tool_chain") is not None:
+        # Fused mode: the planner already produced the tool chain
+        result = state["tool_chain"]
+    else:
+        result = get_intent(user_input, clarify, reasoning, steps, final_instruction, memo=memo) # --- NEW
 
     tool_chain = normalize_intent_result(result)
+
+    if STRUCTURED_OUTPUT and tool_chain:
+        # Drop calls whose args don't match the handler's schema instead of failing inside the tool
+        tool_chain, errors = validate_tool_chain(tool_chain)
+        if errors:
+            logger.warning(f"Dropped invalid tool calls: {errors}")
     
     if not tool_chain:
         # Fallback to RAG - create fallback tool chain
@@ -139,6 +243,7 @@ def execute_single_tool(state: BitBudState) -> Dict[str, Any]:
     func = state.get("function")
     args = state.get("args", {})
     execution_results = state.get("execution_results", []) 
+    memo = state.get("memo")
     
     if func not in FUNCTION_HANDLERS:
         error_msg = f"Unknown function: {func}"
@@ -162,7 +267,9 @@ def execute_single_tool(state: BitBudState) -> Dict[str, Any]:
             result = handler(args.get("command", ""))
         elif func == "recommend_music":
             result = handler()
-        elif func in ["clock", "system_control", "fallback"]:
+        elif func == "fallback":
+            result = handler(args, memo=memo, on_token=state.get("on_token"))
+        elif func in ["clock", "system_control"]:
             result = handler(args)
         elif func == "scraper_tool":
             result = handler(args)
@@ -206,7 +313,9 @@ def process_tool_chain(state: BitBudState) -> Dict[str, Any]:
     temp_state = {
         "function": func,
         "args": args,
-        "execution_results": execution_results
+        "execution_results": execution_results,
+        "memo": state.get("memo"),
+        "on_token": state.get("on_token")
     }
     
     # Execute the current tool
@@ -269,23 +378,56 @@ def decide_execution_path(state: BitBudState) -> str:
     return "execute_single_tool"
 
 
+def _offload(func):
+    """Awaitable version of a node: blocking LLM, Chroma and subprocess work runs in a worker thread."""
+    @functools.wraps(func)
+    async def _async_node(state):
+        return await asyncio.to_thread(func, state)
+    return _async_node
+
+
+async def afast_path(state: BitBudState) -> Dict[str, Any]:
+    # Pure regex matching, cheap enough to run on the event loop
+    return fast_path(state)
+
+
 def build_graph():
     try:
         logger.info("Starting to build BitBud graph...")
 
         graph = StateGraph(BitBudState)
 
-        # nodes - Added create_plan node
-        graph.add_node("create_plan", RunnableLambda(create_plan))
-        graph.add_node("route_input", RunnableLambda(route_input))
-        graph.add_node("execute_single_tool", RunnableLambda(execute_single_tool))
-        graph.add_node("process_tool_chain", RunnableLambda(process_tool_chain))
-        graph.add_node("finalize_tool_chain", RunnableLambda(finalize_tool_chain))
-
-        # entry point - now starts with planning
-        graph.set_entry_point("create_plan")
+        # nodes - each has a sync body for graph.invoke and an awaitable one for graph.ainvoke
+        graph.add_node("fast_path", RunnableLambda(fast_path, afunc=afast_path))
+        graph.add_node("embedding_route", RunnableLambda(embedding_route, afunc=_offload(embedding_route)))
+        graph.add_node("create_plan", RunnableLambda(create_plan, afunc=_offload(create_plan)))
+        graph.add_node("route_input", RunnableLambda(route_input, afunc=_offload(route_input)))
+        graph.add_node("execute_single_tool", RunnableLambda(execute_single_tool, afunc=_offload(execute_single_tool)))
+        graph.add_node("process_tool_chain", RunnableLambda(process_tool_chain, afunc=_offload(process_tool_chain)))
+        graph.add_node("finalize_tool_chain", RunnableLambda(finalize_tool_chain, afunc=_offload(finalize_tool_chain)))
+
+        missing_schemas = set(FUNCTION_HANDLERS) - set(TOOL_ARG_SCHEMAS)
+        if missing_schemas:
+            logger.warning(f"No argument schema for: {sorted(missing_schemas)}; structured output can't route to them")
+
+        # Labelled examples are embedded once, as soon as the embedder has loaded (not per request and
+        # not blocking startup); until then unmatched input goes to the planner
+        memory_service.when_ready(lambda: build_intent_index(FUNCTION_HANDLERS.keys()))
+
+        # entry point - rule-based fast path, then embedding router, planning only for unmatched input
+        graph.set_entry_point("fast_path")
+        graph.add_conditional_edges("fast_path", after_fast_path, {
+            "embedding_route": "embedding_route",
+            "execute_single_tool": "execute_single_tool",
+            "process_tool_chain": "process_tool_chain"
+        })
+        graph.add_conditional_edges("embedding_route", after_embedding_route, {
+            "create_plan": "create_plan",
+            "execute_single_tool": "execute_single_tool",
+            "process_tool_chain": "process_tool_chain"
+        })
         
-        # Flow: Plan -> Route -> Execute
+        # Flow: Fast path -> Embedding router -> Plan -> Route -> Execute
         graph.add_edge("create_plan", "route_input")
 
         # entry point and conditional edges
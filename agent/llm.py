@@ -1,34 +1,82 @@
+import os
 import re
-from langchain_community.llms import Ollama
 from typing import Optional, TypedDict
 import json
 from langchain_core.prompts import PromptTemplate
 from langchain_core.runnables import RunnableLambda
+from agent.memo import memoized
+from agent.llmBackend import generate, stream
+from agent.batcher import MicroBatcher
+from agent.summaryCache import SummaryCache
+from agent.schemas import PLAN_SCHEMA, TOOL_CHAIN_SCHEMA, FUSED_SCHEMA
 
 
 SYSTEM_PROMPT_PATH = "agent/prompts/system_prompt.txt"
 RAG_PROMPT_PATH = "agent/prompts/rag_prompt.txt"
 CONEXT_SUMMARY_PROMPT_PATH = "agent/prompts/context_summary_prompt.txt"
 TEXT_TO_SHELL_PROMPT_PATH = "agent/prompts/text_to_shell_prompt.txt"
+FUSED_ROUTER_PROMPT_PATH = "agent/prompts/fused_router_prompt.txt"
 
-llm = Ollama(model="gemma3:4b")
+# "two_stage" = get_plan -> get_intent (two LLM calls), "fused" = get_plan_and_intent (one call)
+ROUTER_MODES = ("two_stage", "fused")
+ROUTER_MODE = os.getenv("BITBUD_ROUTER_MODE", "two_stage")
+
+# Pass JSON schemas to Ollama's `format` for plan/tool-call output and stop as soon as the JSON closes
+STRUCTURED_OUTPUT = os.getenv("BITBUD_STRUCTURED_OUTPUT", "0") == "1"
+
+# Optional: context summaries from concurrent requests are merged into one LLM call
+SUMMARY_BATCHING = os.getenv("BITBUD_SUMMARY_BATCHING", "0") == "1"
+SUMMARY_BATCH_SIZE = int(os.getenv("BITBUD_SUMMARY_BATCH_SIZE", "8"))
+SUMMARY_BATCH_WAIT_MS = float(os.getenv("BITBUD_SUMMARY_BATCH_WAIT_MS", "20"))
+
+# Context summaries are cached by content hash across requests (0 disables); set a path to keep them across restarts
+SUMMARY_CACHE_SIZE = int(os.getenv("BITBUD_SUMMARY_CACHE_SIZE", "2048"))
+SUMMARY_CACHE_PATH = os.getenv("BITBUD_SUMMARY_CACHE_PATH", "")
 
 def load_system_prompt(file_path: str) -> str:
     with open(file_path, "r", encoding="utf-8") as f:
         return f.read().strip()
 
 system_prompt = load_system_prompt(SYSTEM_PROMPT_PATH)
-
-def get_intent(user_input, clarify, reasoning, steps, final_instruction) -> dict:
-    prompt = system_prompt + user_input + "\n\n" + \
-             "### ADDITIONAL INFORMATION" + \
+fused_router_prompt = load_system_prompt(FUSED_ROUTER_PROMPT_PATH)
+
+def invoke_llm(prompt: str, memo=None, prefix: str = "", label: str = "llm", schema: Optional[dict] = None) -> str:
+    """
+    Single entry point for prompt -> completion, memoized per request by prompt text.
+    `prefix` is the static part of the prompt (identical across requests) so Ollama can reuse its KV cache.
+    With `schema` (structured-output mode) Ollama's grammar constrains the output to that JSON schema
+    and the generation is cut off as soon as the top-level JSON value closes.
+    """
+    if schema is None:
+        return memoized(memo, "llm", prefix + prompt, lambda: generate(prompt, prefix=prefix, label=label).text)
+
+    return memoized(memo, "llm_structured", prefix + prompt, lambda: generate(
+        prompt, prefix=prefix, label=label, extra={"format": schema}, stop_on_json_close=True
+    ).text)
+
+def stream_llm(prompt: str, on_token, memo=None, prefix: str = "", label: str = "llm") -> str:
+    """Stream a completion from Ollama, calling on_token(chunk) as tokens arrive; returns the full text."""
+    def _stream():
+        chunks = []
+        for chunk in stream(prompt, prefix=prefix, label=label):
+            chunks.append(chunk)
+            on_token(chunk)
+        return "".join(chunks).strip()
+    return memoized(memo, "llm", prefix + prompt, _stream)
+
+def get_intent(user_input, clarify, reasoning, steps, final_instruction, memo=None) -> dict:
+    # system_prompt is the static prefix (it ends with "User:"); only the suffix changes per request
+    prompt = f" {user_input}\n\n" + \
+             "### ADDITIONAL INFORMATION\n" + \
              f"Clarify: {clarify}\n" + \
              f"Reasoning: {reasoning}\n" + \
              f"Steps: {', '.join(steps)}\n" + \
              f"Final Instruction: {final_instruction}\n\n"
 
+    raw_response = ""
     try:
-        raw_response = llm.invoke(prompt).strip()
+        raw_response = invoke_llm(prompt, memo, prefix=system_prompt, label="intent",
+                                  schema=TOOL_CHAIN_SCHEMA if STRUCTURED_OUTPUT else None)
         json_block = re.sub(r"^```(?:json)?\n|\n```$", "", raw_response.strip(), flags=re.IGNORECASE) # Removing md block
         return json.loads(json_block)
 
@@ -40,24 +88,24 @@ def get_intent(user_input, clarify, reasoning, steps, final_instruction) -> dict
 def build_rag_prompt(user_input: str, memory_context_docs: list[str], about_context_docs: list[str]) -> str:
     memory_str = "\n".join(memory_context_docs)
     about_str = "\n".join(about_context_docs)
+    # Static persona/instructions first so every RAG call shares the same cached prefix
     return f"""
 You are BitBud, a concise and intelligent personal AI agent.
 
+Instruction:
+Given the user input below, respond in a short, factual, and helpful way using the context that follows **only if it's relevant**. Do **NOT** guess or overexplain. DO **NOT** use direct sentences from the contexts, make it sound more natural. If no context applies, respond naturally and ask clarification questions.
+
 Here are the last few things you talked about:
 {memory_str}
 
 Furthermore, here is some additional context about the user:
 {about_str}
 
-Instruction:
-Given the user input below, respond in a short, factual, and helpful way using the above context **only if it's relevant**. Do **NOT** guess or overexplain. DO **NOT** use direct sentences from the contexts, make it sound more natural. If no context applies, respond naturally and ask clarification questions.
-
 User: "{user_input}"
 """.strip()
 
 
-def generate_context_summary(text: str):
-    prompt = f"""
+CONTEXT_SUMMARY_PROMPT = """
 You are a BitBud, a memory assistant.
 
 Please generate a **short, high-quality contextual summary** of the user's message. The goal is to help retrieve this input later based on its intent, meaning, or relevance.
@@ -73,27 +121,121 @@ Do **NOT** include generic statements like “The user said something” — ins
 Answer only with the cleaned-up, standalone context summary — no explanation, no prefixes.
 
 
-Message: {text}
-Summary:
 """
-    summary = llm.invoke(prompt).strip()
+
+def _summarize_one(text: str) -> str:
+    return invoke_llm(f"Message: {text}\nSummary:\n", prefix=CONTEXT_SUMMARY_PROMPT, label="summary")
+
+
+def _summarize_batch(texts: list[str]) -> list[str]:
+    """One LLM call for several messages; falls back to one call per message if the output doesn't line up."""
+    if len(texts) == 1:
+        return [_summarize_one(texts[0])]
+
+    messages = "\n".join(f"{i + 1}. {json.dumps(text, ensure_ascii=False)}" for i, text in enumerate(texts))
+    prompt = (
+        f"Summarize each of the following {len(texts)} messages independently.\n"
+        f"Respond with a ***pure JSON*** array of exactly {len(texts)} strings, one summary per message, in order.\n\n"
+        f"Messages:\n{messages}\n\nSummaries:\n"
+    )
+    raw = ""
+    try:
+        raw = invoke_llm(prompt, prefix=CONTEXT_SUMMARY_PROMPT, label="summary_batch")
+        summaries = json.loads(re.sub(r"^```(?:json)?\n|\n```$", "", raw.strip(), flags=re.IGNORECASE))
+        if isinstance(summaries, list) and len(summaries) == len(texts):
+            return [str(summary).strip() for summary in summaries]
+        print(f"[Summary batch] Expected {len(texts)} summaries, got: {raw[:100]}")
+    except Exception as e:
+        print("[Summary batch parsing failed]", e)
+    return [_summarize_one(text) for text in texts]
+
+
+summary_batcher = MicroBatcher(
+    "context_summary", _summarize_batch, max_batch_size=SUMMARY_BATCH_SIZE, max_wait_ms=SUMMARY_BATCH_WAIT_MS
+) if SUMMARY_BATCHING else None
+
+
+summary_cache = SummaryCache(SUMMARY_CACHE_SIZE, SUMMARY_CACHE_PATH or None) if SUMMARY_CACHE_SIZE > 0 else None
+
+
+def _compute_context_summary(text: str, memo=None):
+    if summary_batcher is not None:
+        summary = memoized(memo, "summary", text, lambda: summary_batcher.submit(text).result())
+    else:
+        summary = invoke_llm(f"Message: {text}\nSummary:\n", memo, prefix=CONTEXT_SUMMARY_PROMPT, label="summary")
     return None if summary.lower() == "none" else summary
 
 
-def text_to_shell_command(message: str) -> str:
-    prompt = f"""You are a Linux command generator.
+def generate_context_summary(text: str, memo=None):
+    # Storing a message and retrieving with it as the query summarize the same text; one LLM call serves both
+    if summary_cache is None:
+        return _compute_context_summary(text, memo)
+    return summary_cache.get_or_compute(text, lambda: _compute_context_summary(text, memo))
+
+
+def generate_context_summaries(texts: list[str], batch_size: int = SUMMARY_BATCH_SIZE) -> list:
+    """Summaries for many texts with one LLM call per `batch_size` texts (bulk import); cached entries are reused."""
+    def normalize(summary):
+        return None if not summary or summary.lower() == "none" else summary
+
+    results = [None] * len(texts)
+    pending = []
+    for i, text in enumerate(texts):
+        cached = summary_cache.peek(text) if summary_cache else None
+        if cached is not None:
+            results[i] = cached
+        else:
+            pending.append(i)
+
+    for start in range(0, len(pending), batch_size):
+        group = pending[start:start + batch_size]
+        summaries = _summarize_batch([texts[i] for i in group])
+        for i, summary in zip(group, summaries):
+            results[i] = normalize(summary)
+            if summary_cache:
+                summary_cache.get_or_compute(texts[i], lambda value=results[i]: value)
+    return results
+
+
+def summary_cache_stats() -> dict:
+    return summary_cache.stats() if summary_cache else {"enabled": False}
+
+
+SESSION_SUMMARY_PROMPT = """
+You are a BitBud, a memory assistant.
+
+Below is part of a finished conversation between the user and BitBud, one message per line, oldest first.
+Write a **compact memory** of it that can replace the individual messages in long-term storage.
+
+Keep:
+- Facts the user shared about themselves (name, location, preferences, plans, people, dates)
+- Questions they asked and tasks they gave, with the answers or outcomes that matter later
+- Anything the user asked BitBud to remember
+
+Drop greetings, small talk and anything that won't matter in a later conversation.
+Answer only with the memory as a few short sentences — no explanation, no prefixes.
+
+
+"""
+
+def summarize_session(turns: list[str]) -> str:
+    """One summary standing in for a run of turns from a closed session (cold memory tier)."""
+    messages = "\n".join(f"- {turn}" for turn in turns)
+    return invoke_llm(f"Conversation:\n{messages}\n\nMemory:\n", prefix=SESSION_SUMMARY_PROMPT, label="session_summary")
+
+
+TEXT_TO_SHELL_PROMPT = """You are a Linux command generator.
 Given a user's request in plain English, output the most appropriate shell command.
 Only output the shell command, nothing else. Do **NOT** include any explanations or additional text.
 
-User: {message}
-Command:"""
-    cmd = llm.invoke(prompt).strip()
+"""
+
+def text_to_shell_command(message: str) -> str:
+    cmd = invoke_llm(f"User: {message}\nCommand:", prefix=TEXT_TO_SHELL_PROMPT, label="shell")
     return cmd if cmd else "echo 'No command generated'"
 
 
-def get_plan(user_input: str) -> dict:
-    prompt = f"""
-You are BitBud's internal Planning Agent — a Chain-of-Thought thinker for pre-routing reasoning.
+PLAN_PROMPT = """You are BitBud's internal Planning Agent — a Chain-of-Thought thinker for pre-routing reasoning.
 
 Your goal is to deeply analyze the user's natural language input and do the following:
 
@@ -142,7 +284,7 @@ Your goal is to deeply analyze the user's natural language input and do the foll
 
 User: "my laptop is heating up"
 → 
-{{
+{
   "clarify": null,
   "reasoning": "The user is reporting a thermal issue. First, we need to check temperature. Then diagnose running processes. Possibly recommend tips.",
   "steps": [
@@ -151,51 +293,61 @@ User: "my laptop is heating up"
     "Suggest ways to reduce overheating"
   ],
   "final_instruction": "Check system temperature, list current processes, and suggest tips to reduce heating."
-}}
+}
 
 User: "set a timer"
 → 
-{{
+{
   "clarify": "How long should I set the timer for?",
   "reasoning": "Timer duration is missing. Need more info before planning.",
   "steps": [],
   "final_instruction": ""
-}}
+}
 
 User: "open Spotify and search for rainfall sounds"
 → 
-{{
+{
   "clarify": null,
   "reasoning": "User wants to launch Spotify and play a specific type of sound.",
   "steps": ["Open Spotify with the search term 'rainfall sounds'"],
   "final_instruction": "Open Spotify and search for rainfall sounds"
-}}
+}
 
 User: "increase volume and check temperature"
 → 
-{{
+{
   "clarify": null,
   "reasoning": "This is a multi-function intent: increase volume and system health check.",
   "steps": ["Increase volume", "Check system temperature"],
   "final_instruction": "Increase volume and check system temperature"
-}}
+}
 
 ---
 
-### USER INPUT:
-\"\"\"{user_input}\"\"\"
-
 Respond with a ***pure JSON*** object only:
-{{
+{
   "clarify": str or null,
   "reasoning": str,
   "steps": [list of steps],
   "final_instruction": str
-}}
-    """.strip()
+}
+
+---
+
+### USER INPUT:
+"""
+
+
+def get_plan(user_input: str, memo=None) -> dict:
+    return memoized(memo, "plan", user_input, lambda: _generate_plan(user_input, memo))
+
+
+def _generate_plan(user_input: str, memo=None) -> dict:
+    # Static instructions/examples first, the user input last, so the prefix is identical across requests
+    prompt = f'"""{user_input}"""\n'
 
     try:
-        raw = llm.invoke(prompt).strip()
+        raw = invoke_llm(prompt, memo, prefix=PLAN_PROMPT, label="plan", schema=PLAN_SCHEMA if STRUCTURED_OUTPUT else None)
         json_block = raw.strip("` \n").replace("json\n", "")
         # print (json_block)
         return json.loads(json_block)
@@ -210,5 +362,40 @@ Respond with a ***pure JSON*** object only:
         }
 
 
+def get_plan_and_intent(user_input: str, memo=None) -> dict:
+    """Fused planner + router: one LLM call returns the plan fields and the tool chain."""
+    return memoized(memo, "fused_plan", user_input, lambda: _generate_plan_and_intent(user_input, memo))
+
+
+def _generate_plan_and_intent(user_input: str, memo=None) -> dict:
+    prompt = f' "{user_input}"\n'
+
+    raw = ""
+    try:
+        raw = invoke_llm(prompt, memo, prefix=fused_router_prompt, label="fused",
+                         schema=FUSED_SCHEMA if STRUCTURED_OUTPUT else None)
+        json_block = re.sub(r"^```(?:json)?\n|\n```$", "", raw.strip(), flags=re.IGNORECASE) # Removing md block
+        result = json.loads(json_block)
+
+        tool_chain = result.get("tool_chain", [])
+        if isinstance(tool_chain, dict):
+            tool_chain = [tool_chain]
 
+        return {
+            "clarify": result.get("clarify"),
+            "reasoning": result.get("reasoning", ""),
+            "steps": result.get("steps", []),
+            "final_instruction": result.get("final_instruction") or user_input,
+            "tool_chain": tool_chain
+        }
 
+    except Exception as e:
+        print("[get_plan_and_intent ERROR]", e)
+        return {
+            "clarify": None,
+            "reasoning": "Fallback: could not parse fused plan.",
+            "steps": [],
+            "final_instruction": user_input,
+            "tool_chain": [],
+            "raw": raw
+        }
@@ -0,0 +1,350 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import threading
+import weakref
+import httpx
+import requests
+from collections import defaultdict
+from dataclasses import dataclass
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+OLLAMA_URL = os.getenv("OLLAMA_HOST", "http://localhost:11434").rstrip("/")
+MODEL = os.getenv("BITBUD_MODEL", "gemma3:4b")
+# Keep the model (and its KV cache) resident between requests instead of Ollama's 5 minute default
+KEEP_ALIVE = os.getenv("BITBUD_KEEP_ALIVE", "30m")
+# Generations allowed in flight at once; match OLLAMA_NUM_PARALLEL on the server
+MAX_IN_FLIGHT = int(os.getenv("BITBUD_LLM_MAX_IN_FLIGHT", "2"))
+# Default deadline for a whole generation (queueing for a slot included), in seconds
+TIMEOUT = float(os.getenv("BITBUD_LLM_TIMEOUT", "120"))
+CONNECT_TIMEOUT = 5.0
+
+
+class LLMBackendError(Exception):
+    """Ollama could not produce a completion."""
+
+
+class LLMTimeoutError(LLMBackendError):
+    """The per-call deadline passed before the completion finished."""
+
+
+class LLMCancelledError(LLMBackendError):
+    """The caller cancelled the generation."""
+
+
+@dataclass
+class GenerationResult:
+    text: str
+    prompt_eval_count: int = 0
+    prompt_eval_ms: float = 0.0
+    eval_count: int = 0
+    eval_ms: float = 0.0
+    total_ms: float = 0.0
+    # Generation was cut off once the top-level JSON value closed; prompt-eval counts are then unknown
+    stopped_early: bool = False
+
+
+class _JsonCloseDetector:
+    """Tracks bracket depth over streamed text (ignoring brackets inside strings) to spot the end of the top-level value."""
+
+    def __init__(self):
+        self.depth = 0
+        self.started = False
+        self.in_string = False
+        self.escaped = False
+
+    def feed(self, chunk: str) -> Optional[int]:
+        """Return the offset just past the closing bracket if the top-level value closes in this chunk."""
+        for i, char in enumerate(chunk):
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in "{[":
+                self.depth += 1
+                self.started = True
+            elif char in "}]":
+                self.depth -= 1
+                if self.started and self.depth == 0:
+                    return i + 1
+        return None
+
+
+class OllamaBackend:
+    """
+    The one client every LLM call goes through: pooled keep-alive connections, per-call deadlines,
+    cancellation, and a cap on generations in flight. Sync methods use a requests.Session, async
+    methods a shared httpx.AsyncClient; both share the same in-flight limit.
+    """
+
+    def __init__(self, base_url: str = OLLAMA_URL, model: str = MODEL, keep_alive: str = KEEP_ALIVE,
+                 max_in_flight: int = MAX_IN_FLIGHT, timeout: float = TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self.max_in_flight = max_in_flight
+
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._session = requests.Session()
+        # Retry only failed connects (Ollama restarting); a generation that started is never resent
+        retries = Retry(total=2, connect=2, read=0, status=0, backoff_factor=0.2, allowed_methods=None)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(4, max_in_flight * 2), max_retries=retries)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._async_clients = weakref.WeakKeyDictionary()
+
+        self._stats_lock = threading.Lock()
+        self._call_stats = defaultdict(lambda: defaultdict(float))
+
+    # --- Payloads
+    def _payload(self, prompt: str, prefix: str, model: Optional[str], options: Optional[Dict[str, Any]],
+                 extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {
+            "model": model or self.model,
+            "stream": True,
+            "keep_alive": self.keep_alive,
+        }
+        if options:
+            payload["options"] = options
+        if extra:
+            payload.update(extra)
+
+        # Identical static prefix on every call, so Ollama's runner reuses its KV cache and only prefills the suffix
+        payload["prompt"] = prefix + prompt
+        return payload
+
+    # --- Stats
+    def _record(self, label: str, result: GenerationResult):
+        with self._stats_lock:
+            stats = self._call_stats[label]
+            stats["calls"] += 1
+            stats["prompt_eval_count"] += result.prompt_eval_count
+            stats["prompt_eval_ms"] += result.prompt_eval_ms
+            stats["eval_count"] += result.eval_count
+            stats["eval_ms"] += result.eval_ms
+            stats["total_ms"] += result.total_ms
+
+        logger.info(
+            f"[LLM] {label}: prompt_eval {result.prompt_eval_count} tok / {result.prompt_eval_ms:.0f}ms, "
+            f"eval {result.eval_count} tok / {result.eval_ms:.0f}ms, total {result.total_ms:.0f}ms"
+            + (" (stopped at JSON close)" if result.stopped_early else "")
+        )
+
+    def _result(self, text: str, final: Dict[str, Any]) -> GenerationResult:
+        return GenerationResult(
+            text=text.strip(),
+            prompt_eval_count=final.get("prompt_eval_count", 0),
+            prompt_eval_ms=final.get("prompt_eval_duration", 0) / 1e6,
+            eval_count=final.get("eval_count", 0),
+            eval_ms=final.get("eval_duration", 0) / 1e6,
+            total_ms=final.get("total_duration", 0) / 1e6,
+        )
+
+    def _early_result(self, text: str, tokens: int, started: float) -> GenerationResult:
+        # Ollama streams one token per chunk, so the chunk count is the number of tokens generated
+        return GenerationResult(
+            text=text.strip(),
+            eval_count=tokens,
+            total_ms=(time.monotonic() - started) * 1000,
+            stopped_early=True,
+        )
+
+    def call_stats(self) -> Dict[str, Any]:
+        """Totals per call site, so prompt-eval (prefill) time can be compared against eval time."""
+        with self._stats_lock:
+            return {label: dict(stats) for label, stats in self._call_stats.items()}
+
+    # --- Sync
+    def _acquire(self, deadline: float):
+        if not self._slots.acquire(timeout=max(0.0, deadline - time.monotonic())):
+            raise LLMTimeoutError(f"No free generation slot within the deadline ({self.max_in_flight} in flight)")
+
+    def stream(self, prompt: str, prefix: str = "", label: str = "llm", options: Optional[Dict[str, Any]] = None,
+               timeout: Optional[float] = None, cancel: Optional[threading.Event] = None, model: Optional[str] = None,
+               extra: Optional[Dict[str, Any]] = None, on_done: Optional[Callable[[GenerationResult], None]] = None,
+               stop_on_json_close: bool = False) -> Iterator[str]:
+        """
+        Yield response chunks as Ollama produces them. Closing the iterator or setting `cancel` aborts the generation.
+        With stop_on_json_close the generation is aborted as soon as the top-level JSON object/array closes.
+        """
+        started = time.monotonic()
+        deadline = started + (timeout or self.timeout)
+        payload = self._payload(prompt, prefix, model, options, extra)
+        closer = _JsonCloseDetector() if stop_on_json_close else None
+
+        self._acquire(deadline)
+        try:
+            response = self._session.post(
+                f"{self.base_url}/api/generate", json=payload, stream=True,
+                timeout=(CONNECT_TIMEOUT, max(0.1, deadline - time.monotonic()))
+            )
+            try:
+                response.raise_for_status()
+                chunks, tokens = [], 0
+                for line in response.iter_lines():
+                    if cancel is not None and cancel.is_set():
+                        raise LLMCancelledError("Generation cancelled")
+                    if time.monotonic() > deadline:
+                        raise LLMTimeoutError(f"Generation exceeded its {timeout or self.timeout:g}s deadline")
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    if data.get("error"):
+                        raise LLMBackendError(data["error"])
+                    chunk = data.get("response", "")
+                    if chunk:
+                        tokens += 1
+                        end = closer.feed(chunk) if closer is not None else None
+                        if end is not None:
+                            chunk = chunk[:end]
+                        chunks.append(chunk)
+                        yield chunk
+                        if end is not None:
+                            result = self._early_result("".join(chunks), tokens, started)
+                            self._record(label, result)
+                            if on_done:
+                                on_done(result)
+                            return
+                    if data.get("done"):
+                        result = self._result("".join(chunks), data)
+                        self._record(label, result)
+                        if on_done:
+                            on_done(result)
+                        return
+            finally:
+                # Closing the connection makes Ollama stop generating for this request
+                response.close()
+        except requests.RequestException as e:
+            # A read timeout mid-stream surfaces as ConnectionError, so judge by the deadline
+            if isinstance(e, requests.Timeout) or time.monotonic() >= deadline:
+                raise LLMTimeoutError(str(e)) from e
+            raise LLMBackendError(str(e)) from e
+        finally:
+            self._slots.release()
+
+    def generate(self, prompt: str, prefix: str = "", label: str = "llm", options: Optional[Dict[str, Any]] = None,
+                 timeout: Optional[float] = None, cancel: Optional[threading.Event] = None, model: Optional[str] = None,
+                 extra: Optional[Dict[str, Any]] = None, stop_on_json_close: bool = False) -> GenerationResult:
+        results = []
+        text = "".join(self.stream(prompt, prefix, label, options, timeout, cancel, model, extra,
+                                   on_done=results.append, stop_on_json_close=stop_on_json_close))
+        return results[0] if results else GenerationResult(text=text.strip())
+
+    # --- Async
+    def _async_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            limits = httpx.Limits(max_connections=max(4, self.max_in_flight * 2), max_keepalive_connections=self.max_in_flight)
+            client = httpx.AsyncClient(base_url=self.base_url, limits=limits, timeout=httpx.Timeout(self.timeout, connect=CONNECT_TIMEOUT))
+            self._async_clients[loop] = client
+        return client
+
+    async def _aacquire(self, deadline: float):
+        # Polling keeps one limit shared with the sync path and is safe to cancel while waiting
+        while not self._slots.acquire(blocking=False):
+            if time.monotonic() >= deadline:
+                raise LLMTimeoutError(f"No free generation slot within the deadline ({self.max_in_flight} in flight)")
+            await asyncio.sleep(0.01)
+
+    async def astream(self, prompt: str, prefix: str = "", label: str = "llm", options: Optional[Dict[str, Any]] = None,
+                      timeout: Optional[float] = None, model: Optional[str] = None, extra: Optional[Dict[str, Any]] = None,
+                      on_done: Optional[Callable[[GenerationResult], None]] = None,
+                      stop_on_json_close: bool = False) -> AsyncIterator[str]:
+        """Async variant of stream(); cancelling the awaiting task aborts the generation."""
+        started = time.monotonic()
+        deadline = started + (timeout or self.timeout)
+        closer = _JsonCloseDetector() if stop_on_json_close else None
+        payload = self._payload(prompt, prefix, model, options, extra)
+
+        await self._aacquire(deadline)
+        try:
+            async with self._async_client().stream("POST", "/api/generate", json=payload,
+                                                   timeout=max(0.1, deadline - time.monotonic())) as response:
+                response.raise_for_status()
+                chunks, tokens = [], 0
+                async for line in response.aiter_lines():
+                    if time.monotonic() > deadline:
+                        raise LLMTimeoutError(f"Generation exceeded its {timeout or self.timeout:g}s deadline")
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    if data.get("error"):
+                        raise LLMBackendError(data["error"])
+                    chunk = data.get("response", "")
+                    if chunk:
+                        tokens += 1
+                        end = closer.feed(chunk) if closer is not None else None
+                        if end is not None:
+                            chunk = chunk[:end]
+                        chunks.append(chunk)
+                        yield chunk
+                        if end is not None:
+                            result = self._early_result("".join(chunks), tokens, started)
+                            self._record(label, result)
+                            if on_done:
+                                on_done(result)
+                            return
+                    if data.get("done"):
+                        result = self._result("".join(chunks), data)
+                        self._record(label, result)
+                        if on_done:
+                            on_done(result)
+                        return
+        except httpx.TimeoutException as e:
+            raise LLMTimeoutError(str(e)) from e
+        except httpx.HTTPError as e:
+            raise LLMBackendError(str(e)) from e
+        finally:
+            self._slots.release()
+
+    async def agenerate(self, prompt: str, prefix: str = "", label: str = "llm", options: Optional[Dict[str, Any]] = None,
+                        timeout: Optional[float] = None, model: Optional[str] = None,
+                        extra: Optional[Dict[str, Any]] = None, stop_on_json_close: bool = False) -> GenerationResult:
+        results = []
+        chunks = [chunk async for chunk in self.astream(prompt, prefix, label, options, timeout, model, extra,
+                                                        on_done=results.append, stop_on_json_close=stop_on_json_close)]
+        return results[0] if results else GenerationResult(text="".join(chunks).strip())
+
+    async def aclose(self):
+        client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    def close(self):
+        self._session.close()
+
+
+backend = OllamaBackend()
+
+
+def generate(prompt: str, prefix: str = "", label: str = "llm", **kwargs) -> GenerationResult:
+    return backend.generate(prompt, prefix=prefix, label=label, **kwargs)
+
+
+def stream(prompt: str, prefix: str = "", label: str = "llm", **kwargs) -> Iterator[str]:
+    return backend.stream(prompt, prefix=prefix, label=label, **kwargs)
+
+
+async def agenerate(prompt: str, prefix: str = "", label: str = "llm", **kwargs) -> GenerationResult:
+    return await backend.agenerate(prompt, prefix=prefix, label=label, **kwargs)
+
+
+def astream(prompt: str, prefix: str = "", label: str = "llm", **kwargs) -> AsyncIterator[str]:
+    return backend.astream(prompt, prefix=prefix, label=label, **kwargs)
+
+
+def call_stats() -> Dict[str, Any]:
+    return backend.call_stats()
@@ -0,0 +1,48 @@
+import logging
+import threading
+from collections import defaultdict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RequestMemo:
+    """Per-request memo so each LLM prompt, plan and embedding runs at most once per graph run."""
+
+    def __init__(self):
+        self._values: Dict[tuple, Any] = {}
+        self._lock = threading.Lock()
+        self.hits = defaultdict(int)
+        self.misses = defaultdict(int)
+
+    def get_or_compute(self, namespace: str, key: Hashable, compute: Callable[[], Any]) -> Any:
+        cache_key = (namespace, key)
+        with self._lock:
+            if cache_key in self._values:
+                self.hits[namespace] += 1
+                return self._values[cache_key]
+            self.misses[namespace] += 1
+
+        value = compute()
+
+        with self._lock:
+            self._values[cache_key] = value
+        return value
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Hit/miss counters per namespace (llm, plan, embedding, ...)."""
+        namespaces = set(self.hits) | set(self.misses)
+        return {
+            ns: {"hits": self.hits[ns], "misses": self.misses[ns]}
+            for ns in sorted(namespaces)
+        }
+
+    def saved_calls(self) -> int:
+        return sum(self.hits.values())
+
+
+def memoized(memo: Optional[RequestMemo], namespace: str, key: Hashable, compute: Callable[[], Any]) -> Any:
+    """Run compute() through the memo if one is active for this request."""
+    if memo is None:
+        return compute()
+    return memo.get_or_compute(namespace, key, compute)
@@ -0,0 +1,21 @@
+def is_worth_storing(text: str) -> bool:
+    """Filter out trivial messages that don't need long-term storage"""
+    text_lower = text.lower().strip()
+
+    # Skip common greetings/acknowledgments
+    trivial_patterns = [
+        "hi", "hello", "hey", "thanks", "thank you", "ok", "okay", 
+        "yes", "no", "sure", "good", "great", "nice", "cool",
+        "bye", "goodbye", "see you", "lol", "haha", "hmm", "oh",
+        "got it", "understood", "will do", "sounds good", "alright",
+        "no problem", "you too", "take care", "have a nice day",
+        "i see", "interesting", "right", "exactly", "absolutely",
+        "i agree", "i understand", "that's fine", "that's okay",
+    ]
+    
+    # message is just trivial words >> skip
+    words = text_lower.split()
+    if all(word in trivial_patterns for word in words) or text_lower in trivial_patterns:
+        return False
+    
+    return True
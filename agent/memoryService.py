@@ -0,0 +1,274 @@
+import os
+import time
+import logging
+import threading
+from urllib.parse import urlsplit
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# All collections (conversation turns, session summaries, ABOUT.md chunks) live in one persistent Chroma client
+MEMORY_DIR = os.getenv("BITBUD_MEMORY_DIR", "./bitbud_memory")
+# Chroma server (e.g. http://127.0.0.1:8000) used instead of the embedded client in MEMORY_DIR. The embedded
+# client is single-process, so several server workers must share the collections through a Chroma server
+CHROMA_URL = os.getenv("BITBUD_CHROMA_URL", "")
+EMBED_MODEL = "/home/ayush/Documents/bitbud/models/paraphrase-MiniLM-L3-v2/"
+
+# "huggingface" (sentence-transformers on torch) or "onnx" (the model exported by export_onnx.py, on onnxruntime)
+EMBED_PROVIDER = os.getenv("BITBUD_EMBED_PROVIDER", "huggingface")
+EMBED_ONNX_DIR = os.getenv("BITBUD_EMBED_ONNX_DIR", EMBED_MODEL.rstrip("/") + "-onnx")
+EMBED_ONNX_INT8 = os.getenv("BITBUD_EMBED_ONNX_INT8", "0") == "1"
+# CPU threads for embedding inference (0 = the runtime's default)
+EMBED_THREADS = int(os.getenv("BITBUD_EMBED_THREADS", "0"))
+
+# Concurrent requests' embeddings are collected for a few ms and embedded as one batch
+EMBED_BATCHING = os.getenv("BITBUD_EMBED_BATCHING", "1") == "1"
+EMBED_BATCH_SIZE = int(os.getenv("BITBUD_EMBED_BATCH_SIZE", "32"))
+EMBED_BATCH_WAIT_MS = float(os.getenv("BITBUD_EMBED_BATCH_WAIT_MS", "3"))
+
+# Embeddings are cached by (model, text hash) in RAM and in a memory-mapped file shared by both stores
+EMBED_CACHE = os.getenv("BITBUD_EMBED_CACHE", "1") == "1"
+EMBED_CACHE_DIR = os.getenv("BITBUD_EMBED_CACHE_DIR", "./embedding_cache")
+EMBED_CACHE_MB = float(os.getenv("BITBUD_EMBED_CACHE_MB", "64"))
+EMBED_CACHE_RAM_ENTRIES = int(os.getenv("BITBUD_EMBED_CACHE_RAM_ENTRIES", "4096"))
+
+# Search index over each collection: Chroma's own, or an in-process NumPy/HNSW mirror of it
+VECTOR_BACKEND = os.getenv("BITBUD_VECTOR_BACKEND", "chroma")
+# compact backend: vectors held as float16 or int8 codes, top RERANK x k candidates rescored from Chroma's float32 copy
+VECTOR_PRECISION = os.getenv("BITBUD_VECTOR_PRECISION", "int8")
+VECTOR_RERANK = int(os.getenv("BITBUD_VECTOR_RERANK", "4"))
+# In-process indexes only see other workers' writes after a reload; 0 disables periodic reloads
+VECTOR_REFRESH_S = float(os.getenv("BITBUD_VECTOR_REFRESH_S", "0"))
+
+# Servers start loading the embedder and opening Chroma in the background at startup
+MEMORY_WARMUP = os.getenv("BITBUD_MEMORY_WARMUP", "1") == "1"
+
+
+def _chroma_client(chromadb, directory: str):
+    if not CHROMA_URL:
+        return chromadb.PersistentClient(path=directory)
+    url = urlsplit(CHROMA_URL)
+    ssl = url.scheme == "https"
+    return chromadb.HttpClient(host=url.hostname, port=url.port or (443 if ssl else 8000), ssl=ssl)
+
+
+def _load_huggingface():
+    # Imported here: sentence-transformers pulls in torch, which is most of the startup cost
+    from langchain.embeddings import HuggingFaceEmbeddings
+
+    if EMBED_THREADS > 0:
+        import torch
+        torch.set_num_threads(EMBED_THREADS)
+    return HuggingFaceEmbeddings(model_name=EMBED_MODEL), EMBED_MODEL
+
+
+def _load_provider():
+    """(embedder, cache name); the cache name keeps vectors from different runtimes apart."""
+    if EMBED_PROVIDER == "onnx":
+        try:
+            from agent.onnxEmbeddings import OnnxEmbeddings
+
+            embeddings = OnnxEmbeddings(
+                EMBED_ONNX_DIR, quantized=EMBED_ONNX_INT8, threads=EMBED_THREADS, batch_size=EMBED_BATCH_SIZE
+            )
+            embeddings.warm_up()
+            return embeddings, f"{EMBED_MODEL}#onnx{'-int8' if EMBED_ONNX_INT8 else ''}"
+        except Exception as e:
+            logger.error(f"Failed to load ONNX embeddings from {EMBED_ONNX_DIR}, using sentence-transformers: {e}")
+    return _load_huggingface()
+
+
+def _load_embeddings():
+    from agent.batcher import BatchedEmbeddings
+    from agent.embeddingCache import CachedEmbeddings
+
+    embeddings, cache_name = _load_provider()
+    if EMBED_BATCHING:
+        embeddings = BatchedEmbeddings(embeddings, max_batch_size=EMBED_BATCH_SIZE, max_wait_ms=EMBED_BATCH_WAIT_MS)
+    if EMBED_CACHE:
+        # Outermost, so cache hits return without waiting on the batch window
+        embeddings = CachedEmbeddings(
+            embeddings, cache_name, EMBED_CACHE_DIR,
+            max_disk_mb=EMBED_CACHE_MB, max_ram_entries=EMBED_CACHE_RAM_ENTRIES
+        )
+    return embeddings
+
+
+class MemoryService:
+    """
+    Owns the embedder, the Chroma client and its collections, created on first use (or by warm_up).
+
+    Nothing is loaded at import, so graph building and fast-path tool requests don't wait for the
+    embedding model. Code that needs the stores ready but shouldn't block startup registers with
+    when_ready(); those callbacks run on a background thread once loading has finished.
+    """
+
+    def __init__(self, directory: str = MEMORY_DIR):
+        self.directory = directory
+        self._lock = threading.RLock()
+        self._loaded = threading.Event()
+        self._embeddings = None
+        self._client = None
+        self._stores: Dict[str, Any] = {}
+        self._backends: Dict[str, Any] = {}
+        self._refresher: Optional[threading.Thread] = None
+        self._ready_hooks: List[Callable[[], None]] = []
+        self._timings: Dict[str, float] = {}
+        self._error: Optional[str] = None
+
+    def _load(self):
+        if self._loaded.is_set():
+            return
+        with self._lock:
+            if self._loaded.is_set():
+                return
+            try:
+                started = time.perf_counter()
+                self._embeddings = _load_embeddings()
+                self._timings["embeddings_s"] = round(time.perf_counter() - started, 3)
+                logger.info(f"Embedding function initialized in {self._timings['embeddings_s']}s")
+            except Exception as e:
+                logger.error(f"Failed to initialize embedding function: {e}")
+                self._error = str(e)
+
+            try:
+                import chromadb
+                from langchain.vectorstores import Chroma
+
+                started = time.perf_counter()
+                self._client = _chroma_client(chromadb, self.directory)
+                for name in ("bitbud", "bitbud_sessions", "about_user"):
+                    self._stores[name] = Chroma(
+                        client=self._client, collection_name=name, embedding_function=self._embeddings
+                    )
+                self._timings["chroma_s"] = round(time.perf_counter() - started, 3)
+                logger.info(f"Vectorstores initialized in {self._timings['chroma_s']}s")
+            except Exception as e:
+                logger.error(f"Failed to initialize vectorstores: {e}")
+                self._error = str(e)
+
+            self._loaded.set()
+            hooks, self._ready_hooks = self._ready_hooks, []
+
+        if hooks:
+            threading.Thread(target=self._run_hooks, args=(hooks,), name="memory-ready", daemon=True).start()
+
+    def _run_hooks(self, hooks):
+        for hook in hooks:
+            try:
+                hook()
+            except Exception as e:
+                logger.error(f"Memory ready hook {getattr(hook, '__name__', hook)} failed: {e}")
+
+    def when_ready(self, hook: Callable[[], None]):
+        """Run `hook` once the stores are loaded (in the background if they aren't yet)."""
+        with self._lock:
+            if not self._loaded.is_set():
+                self._ready_hooks.append(hook)
+                return
+        self._run_hooks([hook])
+
+    @property
+    def ready(self) -> bool:
+        return self._loaded.is_set()
+
+    @property
+    def embeddings(self):
+        self._load()
+        return self._embeddings
+
+    @property
+    def memory_store(self):
+        self._load()
+        return self._stores.get("bitbud")
+
+    @property
+    def session_store(self):
+        """Cold tier: summaries of closed sessions."""
+        self._load()
+        return self._stores.get("bitbud_sessions")
+
+    @property
+    def about_store(self):
+        self._load()
+        return self._stores.get("about_user")
+
+    def backend(self, name: str):
+        """
+        Search/write backend (agent.vectorBackend) over the named collection, built on first use.
+        Falls back to Chroma's own index if the configured one can't be built.
+        """
+        self._load()
+        backend = self._backends.get(name)
+        if backend is not None:
+            return backend
+        with self._lock:
+            if name in self._backends:
+                return self._backends[name]
+            store = self._stores.get(name)
+            if store is None:
+                return None
+            backend = self._build_backend(name, store)
+            self._backends[name] = backend
+            if VECTOR_REFRESH_S > 0 and backend.name != "chroma" and self._refresher is None:
+                self._refresher = threading.Thread(target=self._refresh_loop, name="vector-refresh", daemon=True)
+                self._refresher.start()
+            return backend
+
+    def _build_backend(self, name: str, store):
+        from agent.vectorBackend import make_backend
+
+        try:
+            options = {"precision": VECTOR_PRECISION, "rerank_factor": VECTOR_RERANK} if VECTOR_BACKEND == "compact" else {}
+            backend = make_backend(VECTOR_BACKEND, store._collection, **options)
+        except Exception as e:
+            logger.error(f"Failed to build {VECTOR_BACKEND} backend for {name}, using chroma: {e}")
+            backend = make_backend("chroma", store._collection)
+        logger.info(f"Vector backend for {name}: {backend.name} ({backend.count()} rows)")
+        return backend
+
+    def _refresh_loop(self):
+        # Rebuild off to the side and swap, so queries keep using the old index while the new one loads
+        while True:
+            time.sleep(VECTOR_REFRESH_S)
+            for name in list(self._backends):
+                try:
+                    rebuilt = self._build_backend(name, self._stores[name])
+                    self._backends[name] = rebuilt
+                except Exception as e:
+                    logger.error(f"Vector backend refresh for {name} failed: {e}")
+
+    def warm_up(self) -> Dict[str, Any]:
+        """Load everything now and run one embedding so the first request doesn't pay for model start-up."""
+        self._load()
+        for name in list(self._stores):
+            self.backend(name)
+        if self._embeddings is not None and "first_embed_s" not in self._timings:
+            started = time.perf_counter()
+            self._embeddings.embed_query("warm up")
+            self._timings["first_embed_s"] = round(time.perf_counter() - started, 3)
+        return self.status()
+
+    def warm_up_in_background(self) -> threading.Thread:
+        thread = threading.Thread(target=self.warm_up, name="memory-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def status(self) -> Dict[str, Any]:
+        embedder = self._embeddings
+        while hasattr(embedder, "base"):
+            # Unwrap the cache and batcher down to the model runtime
+            embedder = embedder.base
+        return {
+            "ready": self.ready,
+            "embeddings": self._embeddings is not None,
+            "embedder": embedder.stats() if hasattr(embedder, "stats") else type(embedder).__name__,
+            "collections": sorted(self._stores),
+            "backends": {name: backend.stats() for name, backend in self._backends.items()},
+            "directory": self.directory,
+            "timings": dict(self._timings),
+            "error": self._error,
+        }
+
+
+memory_service = MemoryService()
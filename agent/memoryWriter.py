@@ -0,0 +1,225 @@
+import os
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_registry: Dict[str, "WriteBehindQueue"] = {}
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class WriteBehindQueue:
+    """
+    Bounded queue drained by a background thread that hands records to `write_batch` in batches.
+
+    Every accepted record is appended to a per-process JSONL spool before submit() returns and is
+    removed once its batch is written, so records that were queued when the process died are
+    replayed on the next start. Records need a stable "id" so replays can be written idempotently.
+    `write_batch` receives (record, context) pairs; context is an in-memory extra (e.g. the request
+    memo) and is None for replayed records.
+    """
+
+    def __init__(self, name: str, write_batch: Callable[[List[Tuple[dict, Any]]], None], spool_dir: str,
+                 max_queue: int = 256, max_batch_size: int = 16, max_wait_ms: float = 50.0):
+        self.name = name
+        self.write_batch = write_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, max_queue))
+
+        os.makedirs(spool_dir, exist_ok=True)
+        self._spool_dir = spool_dir
+        self._spool_path = os.path.join(spool_dir, f"{name}-{os.getpid()}.jsonl")
+        self._pending: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+        # Unfinished = queued or being written; flush() waits for it to reach zero
+        self._unfinished = 0
+        self._idle = threading.Condition(self._lock)
+
+        self._written = 0
+        self._failed = 0
+        self._rejected = 0
+        self._batches = 0
+        self._closed = False
+
+        self._replay = self._claim_spools()
+        self._worker = threading.Thread(target=self._run, name=f"writer-{name}", daemon=True)
+        self._worker.start()
+
+        _registry[name] = self
+        atexit.register(self.close)
+
+    def _claim_spools(self) -> List[dict]:
+        """Adopt spool files left behind by processes that are no longer running."""
+        records: Dict[str, dict] = {}
+        for filename in sorted(os.listdir(self._spool_dir)):
+            if not (filename.startswith(f"{self.name}-") and filename.endswith(".jsonl")):
+                continue
+            try:
+                pid = int(filename[len(self.name) + 1:-len(".jsonl")])
+            except ValueError:
+                continue
+            if pid != os.getpid() and _pid_alive(pid):
+                continue
+
+            path = os.path.join(self._spool_dir, filename)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            # A torn last line from a crash mid-append
+                            logger.warning(f"Skipping unreadable spool line in {path}")
+                            continue
+                        records[record["id"]] = record
+                if path != self._spool_path:
+                    os.remove(path)
+            except OSError as e:
+                logger.error(f"Could not read spool {path}: {e}")
+
+        replay = list(records.values())
+        with self._lock:
+            self._pending.update(records)
+            self._unfinished += len(replay)
+            self._rewrite_spool()
+        if replay:
+            logger.info(f"Write-behind {self.name}: replaying {len(replay)} spooled records")
+        return replay
+
+    def _rewrite_spool(self):
+        # Caller holds self._lock
+        if not self._pending:
+            if os.path.exists(self._spool_path):
+                os.remove(self._spool_path)
+            return
+        tmp_path = self._spool_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for record in self._pending.values():
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self._spool_path)
+
+    def submit(self, record: dict, context: Any = None) -> bool:
+        """Queue a record for writing. Returns False if the queue is full or closed; the caller should write it itself."""
+        with self._lock:
+            if self._closed:
+                return False
+            try:
+                self._queue.put_nowait((record, context))
+            except queue.Full:
+                self._rejected += 1
+                return False
+            with open(self._spool_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._pending[record["id"]] = record
+            self._unfinished += 1
+        return True
+
+    def _collect(self) -> List[Tuple[dict, Any]]:
+        if self._replay:
+            batch = [(record, None) for record in self._replay[:self.max_batch_size]]
+            self._replay = self._replay[self.max_batch_size:]
+            return batch
+
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch[0][0] is None:
+                # close() sentinel
+                return
+            try:
+                self.write_batch(batch)
+                ok = True
+            except Exception as e:
+                # Records stay in the spool and are retried on the next start
+                logger.error(f"Write-behind {self.name}: batch of {len(batch)} failed: {e}")
+                ok = False
+
+            with self._lock:
+                self._batches += 1
+                if ok:
+                    self._written += len(batch)
+                    for record, _ in batch:
+                        self._pending.pop(record["id"], None)
+                    try:
+                        self._rewrite_spool()
+                    except OSError as e:
+                        logger.error(f"Write-behind {self.name}: could not update spool: {e}")
+                else:
+                    self._failed += len(batch)
+                self._unfinished -= len(batch)
+                self._idle.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until every queued record has been written (or failed). Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._idle:
+            while self._unfinished > 0:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    def close(self, timeout: Optional[float] = 30.0):
+        """Flush and stop the worker. Later submits are refused so callers fall back to writing directly."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        if not self.flush(timeout):
+            logger.warning(f"Write-behind {self.name}: {self._unfinished} records still pending at shutdown; kept in spool")
+            return
+        self._queue.put((None, None))
+        self._worker.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "queued": self._queue.qsize() + len(self._replay),
+                "pending": self._unfinished,
+                "spooled": len(self._pending),
+                "written": self._written,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "batches": self._batches,
+                "max_queue": self._queue.maxsize,
+                "max_batch_size": self.max_batch_size,
+            }
+
+
+def writer_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: writer.stats() for name, writer in _registry.items()}
+
+
+def flush_writers(timeout: Optional[float] = None) -> bool:
+    """Flush hook for shutdown and tests: wait for every write-behind queue to drain."""
+    return all([writer.flush(timeout) for writer in list(_registry.values())])
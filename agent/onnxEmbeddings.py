@@ -0,0 +1,103 @@
+import os
+import time
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_INT8_MODEL_FILE = "model.int8.onnx"
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    Sentence embeddings from a MiniLM model exported to ONNX (export_onnx.py), run on onnxruntime's CPU
+    provider: HF fast tokenizer, one session run per batch, attention-masked mean pooling (the pooling
+    sentence-transformers applies for paraphrase-MiniLM). No torch import, so loading takes a fraction
+    of HuggingFaceEmbeddings' start-up.
+
+    Texts are sorted by length before batching so each batch pads to a similar length.
+    """
+
+    def __init__(self, model_dir: str, quantized: bool = False, threads: int = 0,
+                 batch_size: int = 32, max_length: int = 128):
+        # Optional dependencies: only needed when this provider is selected
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        self.model_path = os.path.join(model_dir, ONNX_INT8_MODEL_FILE if quantized else ONNX_MODEL_FILE)
+        self.batch_size = max(1, batch_size)
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads > 0:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+
+        started = time.perf_counter()
+        self.session = onnxruntime.InferenceSession(self.model_path, options, providers=["CPUExecutionProvider"])
+        self._input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+        self.load_s = round(time.perf_counter() - started, 3)
+
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.texts = 0
+        self.inference_s = 0.0
+        logger.info(f"ONNX embedding model {self.model_path} loaded in {self.load_s}s")
+
+    def _run(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.asarray([encoding.ids for encoding in encodings], dtype=np.int64)
+        attention_mask = np.asarray([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+        feed = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._input_names:
+            feed["token_type_ids"] = np.asarray([encoding.type_ids for encoding in encodings], dtype=np.int64)
+
+        hidden = self.session.run(None, feed)[0]
+        mask = attention_mask[:, :, None].astype(np.float32)
+        return (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        started = time.perf_counter()
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors: List[Optional[np.ndarray]] = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            for i, vector in zip(batch, self._run([texts[i] for i in batch])):
+                vectors[i] = vector
+
+        with self._lock:
+            self.calls += 1
+            self.texts += len(texts)
+            self.inference_s += time.perf_counter() - started
+        return [vector.tolist() for vector in vectors]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def warm_up(self):
+        """Run a single text and a full batch so the session's first-run allocations happen before traffic."""
+        started = time.perf_counter()
+        self.embed_documents(["warm up"])
+        self.embed_documents(["warm up the embedding batch path"] * self.batch_size)
+        logger.info(f"ONNX embedding model warmed up in {time.perf_counter() - started:.3f}s")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "model": self.model_path,
+                "load_s": self.load_s,
+                "calls": self.calls,
+                "texts": self.texts,
+                "ms_per_text": round(self.inference_s * 1000 / self.texts, 3) if self.texts else 0.0,
+            }
@@ -0,0 +1,96 @@
+import time
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+# Same multipliers the per-document loop in retrieve_context used
+SESSION_BOOST = 1.5
+KEYWORD_BOOST = 1.3
+RECENCY_WINDOW_HOURS = 24
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+
+def keyword_hits(contexts: List[str], tokens: Iterable[str]) -> np.ndarray:
+    """Boolean mask: which contexts contain any of the tokens as a substring."""
+    hits = np.zeros(len(contexts), dtype=bool)
+    tokens = [token for token in tokens if token]
+    if not tokens or not contexts:
+        return hits
+    lowered = np.char.lower(np.asarray(contexts, dtype=str))
+    for token in tokens:
+        hits |= np.char.find(lowered, token) >= 0
+    return hits
+
+
+def mmr_select(vectors: np.ndarray, scores: np.ndarray, k: int, mmr_lambda: float) -> List[int]:
+    """
+    Greedy maximal marginal relevance over the candidates: each pick maximises
+    lambda * relevance - (1 - lambda) * (max cosine similarity to the picks so far).
+    """
+    if len(scores) == 0:
+        return []
+    relevance = scores / scores.max() if scores.max() > 0 else scores
+    unit = _normalize_rows(vectors)
+    pairwise = unit @ unit.T
+
+    selected = [int(np.argmax(relevance))]
+    redundancy = pairwise[selected[0]].copy()
+    available = np.ones(len(scores), dtype=bool)
+    available[selected[0]] = False
+
+    while len(selected) < min(k, len(scores)):
+        marginal = mmr_lambda * relevance - (1 - mmr_lambda) * redundancy
+        marginal[~available] = -np.inf
+        pick = int(np.argmax(marginal))
+        selected.append(pick)
+        available[pick] = False
+        redundancy = np.maximum(redundancy, pairwise[pick])
+    return selected
+
+
+def rerank(query_vector, candidate_vectors, metadatas: List[dict], k: int,
+           query_tokens: Iterable[str] = (), session_id: Optional[str] = None,
+           min_similarity: float = 0.0, mmr_lambda: float = 1.0, now: Optional[float] = None) -> List[int]:
+    """
+    Score retrieval candidates in one pass over arrays and return the indices to keep, best first.
+
+    score = cosine similarity * session boost * recency boost * keyword boost; candidates whose
+    cosine similarity is below `min_similarity` are dropped before boosting. mmr_lambda < 1 trades
+    relevance for diversity among the kept candidates.
+    """
+    if len(metadatas) == 0 or k <= 0:
+        return []
+    now = time.time() if now is None else now
+
+    vectors = np.asarray(candidate_vectors, dtype=np.float32)
+    query = np.asarray(query_vector, dtype=np.float32)
+    similarity = _normalize_rows(vectors) @ (query / (np.linalg.norm(query) or 1.0))
+
+    sessions = np.array([m.get("session_id") for m in metadatas], dtype=object)
+    timestamps = np.array([m.get("ts", np.nan) for m in metadatas], dtype=np.float64)
+    contexts = [m.get("context") or "" for m in metadatas]
+
+    scores = similarity.astype(np.float64)
+    if session_id is not None:
+        scores *= np.where(sessions == session_id, SESSION_BOOST, 1.0)
+
+    hours_ago = (now - timestamps) / 3600
+    with np.errstate(invalid="ignore"):
+        recent = hours_ago < RECENCY_WINDOW_HOURS
+    scores *= np.where(recent, 1.2 - np.nan_to_num(hours_ago) / 100, 1.0)
+
+    scores *= np.where(keyword_hits(contexts, query_tokens), KEYWORD_BOOST, 1.0)
+
+    keep = np.flatnonzero(similarity >= min_similarity)
+    if len(keep) == 0:
+        return []
+
+    if mmr_lambda >= 1.0:
+        order = keep[np.argsort(-scores[keep], kind="stable")]
+        return [int(i) for i in order[:k]]
+    picks = mmr_select(vectors[keep], scores[keep], k, mmr_lambda)
+    return [int(keep[i]) for i in picks]
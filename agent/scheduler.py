@@ -0,0 +1,109 @@
+import os
+import json
+import time
+import fcntl
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_registry: Dict[str, "PeriodicJob"] = {}
+
+
+class PeriodicJob:
+    """
+    Runs `run` on a background thread at most once per `interval_s`, across restarts and processes.
+
+    The time of the last run is kept in `state_path`; an exclusive lock on that file lets only one
+    uvicorn worker run the job while the others see the fresh timestamp and skip it. `run` may
+    return a dict of results (rows deleted, ...) that is kept for stats.
+    """
+
+    def __init__(self, name: str, run: Callable[[], Optional[dict]], interval_s: float, state_path: str,
+                 initial_delay_s: float = 60.0):
+        self.name = name
+        self.run = run
+        self.interval_s = max(1.0, interval_s)
+        self.initial_delay_s = max(0.0, initial_delay_s)
+        self.state_path = state_path
+        self._stop = threading.Event()
+        self._thread = None
+        self._last: Dict[str, Any] = {}
+        self.runs = 0
+        _registry[name] = self
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name=f"job-{self.name}", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _read_state(self, f) -> dict:
+        f.seek(0)
+        try:
+            return json.loads(f.read() or "{}")
+        except ValueError:
+            return {}
+
+    def run_if_due(self, force: bool = False) -> Optional[dict]:
+        """Run the job now if the interval has passed (or `force`); returns its result or None if skipped."""
+        os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+        with open(self.state_path, "a+", encoding="utf-8") as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # Another process is running it right now
+                return None
+            try:
+                state = self._read_state(f)
+                if not force and time.time() - state.get("last_run", 0) < self.interval_s:
+                    self._last = state
+                    return None
+
+                started = time.perf_counter()
+                try:
+                    result = self.run() or {}
+                    state = {"last_run": time.time(), "ok": True, **result}
+                except Exception as e:
+                    logger.error(f"Job {self.name} failed: {e}")
+                    result = None
+                    state = {"last_run": time.time(), "ok": False, "error": str(e)}
+                state["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(state))
+                f.flush()
+                self._last = state
+                self.runs += 1
+                logger.info(f"Job {self.name}: {state}")
+                return result
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _loop(self):
+        if self._stop.wait(self.initial_delay_s):
+            return
+        while True:
+            self.run_if_due()
+            # Wake up when the next run is due, re-checking at least every interval
+            remaining = self.interval_s - (time.time() - self._last.get("last_run", 0))
+            if self._stop.wait(min(self.interval_s, max(1.0, remaining))):
+                return
+
+    def stats(self) -> Dict[str, Any]:
+        last = dict(self._last)
+        return {
+            "interval_s": self.interval_s,
+            "runs_in_process": self.runs,
+            "last": last,
+            "next_run_in_s": round(max(0.0, self.interval_s - (time.time() - last["last_run"])), 1) if "last_run" in last else None,
+        }
+
+
+def job_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: job.stats() for name, job in _registry.items()}
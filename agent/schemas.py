@@ -0,0 +1,126 @@
+import logging
+from typing import Any, Dict, List, Tuple
+from jsonschema import Draft7Validator
+
+logger = logging.getLogger(__name__)
+
+_NUMBER = {"anyOf": [{"type": "integer"}, {"type": "string"}]}
+
+# Argument schema for every entry in FUNCTION_HANDLERS (agent/langGraphRouter.py)
+TOOL_ARG_SCHEMAS: Dict[str, Dict[str, Any]] = {
+    "open_app": {
+        "type": "object",
+        "properties": {"name": {"type": "string"}, "query": {"type": "string"}},
+        "required": ["name"],
+        "additionalProperties": False,
+    },
+    "recommend_music": {
+        "type": "object",
+        "properties": {},
+        "additionalProperties": False,
+    },
+    "search_web": {
+        "type": "object",
+        "properties": {"query": {"type": "string"}},
+        "required": ["query"],
+        "additionalProperties": False,
+    },
+    "linux_commands": {
+        "type": "object",
+        "properties": {"command": {"type": "string"}},
+        "required": ["command"],
+        "additionalProperties": False,
+    },
+    "clock": {
+        "type": "object",
+        "properties": {
+            "type": {"enum": ["alarm", "timer", "get_time", "get_active_alarms", "get_active_timers", "clear_alarms", "clear_timers"]},
+            "hour": _NUMBER,
+            "minute": _NUMBER,
+            "seconds": _NUMBER,
+            "objective": {"type": "string"},
+        },
+        "required": ["type"],
+        "additionalProperties": False,
+    },
+    "system_control": {
+        "type": "object",
+        "properties": {
+            "type": {"enum": ["get_system_info", "processes", "kill_process", "immediate_action", "get_system_temperature", "volume"]},
+            "action": {"enum": ["get", "set", "mute", "unmute", "up", "down", "shutdown", "restart", "logout", "sleep", "hibernate"]},
+            "value": _NUMBER,
+            "process": _NUMBER,
+        },
+        "required": ["type"],
+        "additionalProperties": False,
+    },
+    "scraper_tool": {
+        "type": "object",
+        "properties": {"url": {"type": "string"}, "format": {"enum": ["text", "json", "csv", "structured"]}},
+        "required": ["url"],
+        "additionalProperties": False,
+    },
+    "fallback": {
+        "type": "object",
+        "properties": {"user_input": {"type": "string"}},
+        "additionalProperties": False,
+    },
+}
+
+TOOL_CALL_SCHEMA = {
+    "anyOf": [
+        {
+            "type": "object",
+            "properties": {"function": {"const": name}, "args": args_schema},
+            "required": ["function", "args"],
+            "additionalProperties": False,
+        }
+        for name, args_schema in TOOL_ARG_SCHEMAS.items()
+    ]
+}
+
+TOOL_CHAIN_SCHEMA = {"type": "array", "items": TOOL_CALL_SCHEMA, "minItems": 1}
+
+_PLAN_PROPERTIES = {
+    "clarify": {"anyOf": [{"type": "string"}, {"type": "null"}]},
+    "reasoning": {"type": "string"},
+    "steps": {"type": "array", "items": {"type": "string"}},
+    "final_instruction": {"type": "string"},
+}
+
+PLAN_SCHEMA = {
+    "type": "object",
+    "properties": _PLAN_PROPERTIES,
+    "required": list(_PLAN_PROPERTIES),
+    "additionalProperties": False,
+}
+
+FUSED_SCHEMA = {
+    "type": "object",
+    "properties": {**_PLAN_PROPERTIES, "tool_chain": TOOL_CHAIN_SCHEMA},
+    "required": [*_PLAN_PROPERTIES, "tool_chain"],
+    "additionalProperties": False,
+}
+
+_arg_validators = {name: Draft7Validator(schema) for name, schema in TOOL_ARG_SCHEMAS.items()}
+
+
+def validate_tool_chain(tool_chain: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """Split a tool chain into calls that match their function's argument schema and a list of errors."""
+    valid, errors = [], []
+    for call in tool_chain:
+        if not isinstance(call, dict):
+            errors.append(f"Not a tool call: {call!r}")
+            continue
+        name = call.get("function")
+        validator = _arg_validators.get(name)
+        if validator is None:
+            errors.append(f"Unknown function: {name}")
+            continue
+        args = call.get("args", {})
+        problems = [e.message for e in validator.iter_errors(args)]
+        if problems:
+            errors.append(f"{name}: {'; '.join(problems)}")
+            continue
+        valid.append(call)
+    return valid, errors
@@ -0,0 +1,142 @@
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def content_key(text: str) -> str:
+    """Hash of the whitespace/case-normalized text, so "Hi  there" and "hi there" share an entry."""
+    normalized = " ".join(text.lower().split())
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+class SummaryCache:
+    """
+    Content-hash LRU for context summaries, shared by memory storage and retrieval across requests.
+
+    Concurrent lookups of the same text wait for the one computation in flight instead of starting
+    another LLM call. With `path` set, entries are also kept in a SQLite file and survive restarts.
+    """
+
+    def __init__(self, max_entries: int = 2048, path: Optional[str] = None):
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[str, Optional[str]]" = OrderedDict()
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+
+        self._db = None
+        if path:
+            try:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                self._db = sqlite3.connect(path, check_same_thread=False)
+                self._db.execute("CREATE TABLE IF NOT EXISTS summaries (key TEXT PRIMARY KEY, summary TEXT, used REAL)")
+                rows = self._db.execute(
+                    "SELECT key, summary FROM summaries ORDER BY used DESC LIMIT ?", (self.max_entries,)
+                ).fetchall()
+                for key, summary in reversed(rows):
+                    self._entries[key] = summary
+                logger.info(f"Summary cache loaded {len(rows)} entries from {path}")
+            except sqlite3.Error as e:
+                logger.error(f"Summary cache persistence disabled, could not open {path}: {e}")
+                self._db = None
+
+    def _persist(self, key: str, summary: Optional[str]):
+        # Caller holds self._lock
+        if self._db is None:
+            return
+        try:
+            self._db.execute("INSERT OR REPLACE INTO summaries VALUES (?, ?, ?)", (key, summary, time.time()))
+            if len(self._entries) >= self.max_entries:
+                self._db.execute(
+                    "DELETE FROM summaries WHERE key NOT IN (SELECT key FROM summaries ORDER BY used DESC LIMIT ?)",
+                    (self.max_entries,)
+                )
+            self._db.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Summary cache write failed: {e}")
+
+    def get_or_compute(self, text: str, compute: Callable[[], Optional[str]]) -> Optional[str]:
+        key = content_key(text)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = self._in_flight[key] = Future()
+                self.misses += 1
+            else:
+                self.shared += 1
+
+        if not owner:
+            return future.result()
+
+        try:
+            summary = compute()
+        except Exception as e:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._entries[key] = summary
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._persist(key, summary)
+            self._in_flight.pop(key, None)
+        future.set_result(summary)
+        return summary
+
+    def peek(self, text: str) -> Optional[str]:
+        """Cached summary for the text without computing one (None if absent)."""
+        with self._lock:
+            return self._entries.get(content_key(text))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses + self.shared
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "shared_in_flight": self.shared,
+                "hit_rate": round((self.hits + self.shared) / lookups, 4) if lookups else 0.0,
+                "persistent": self._db is not None,
+            }
+
+
+_STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below between both
+but by can could did do does doing down during each few for from further had has have having he her here hers
+herself him himself his how i if in into is it its itself just let me more most my myself no nor not now of off
+on once only or other our ours ourselves out over own please same she should so some such than that the their
+theirs them themselves then there these they this those through to too under until up very was we were what
+when where which while who whom why will with would you your yours yourself yourselves tell know like want
+""".split())
+
+_WORD = re.compile(r"[a-z0-9][a-z0-9'\-]*")
+
+
+def extract_keywords(text: str, limit: int = 8) -> List[str]:
+    """Cheap stand-in for an LLM summary in the retrieval boost: the most frequent non-stopwords, first-seen order on ties."""
+    words = [w.strip("'-") for w in _WORD.findall(text.lower())]
+    words = [w for w in words if len(w) > 2 and w not in _STOPWORDS]
+    counts = Counter(words)
+    first_seen = {w: i for i, w in reversed(list(enumerate(words)))}
+    return sorted(counts, key=lambda w: (-counts[w], first_seen[w]))[:limit]
@@ -1,21 +1,52 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from bs4 import BeautifulSoup
 from urllib.parse import urlparse
+from collections import OrderedDict
+import copy
 import csv
 import json
+import hashlib
 import logging
 import re
+import threading
 from typing import Dict, Any, Optional
 import os
 
+from agent.httpCache import HttpCache
+
 logger = logging.getLogger(__name__)
 
+# One scraper per process: pooled keep-alive connections, and an on-disk HTTP cache (ETag / Last-Modified /
+# Cache-Control) shared by all workers, so re-scraping an unchanged page is a local hit or a 304
+SCRAPER_CACHE = os.getenv("BITBUD_SCRAPER_CACHE", "1") == "1"
+SCRAPER_CACHE_PATH = os.getenv("BITBUD_SCRAPER_CACHE_PATH", "./http_cache/scraper.sqlite")
+SCRAPER_CACHE_MB = float(os.getenv("BITBUD_SCRAPER_CACHE_MB", "64"))
+SCRAPER_POOL_SIZE = int(os.getenv("BITBUD_SCRAPER_POOL_SIZE", "10"))
+# Parsed pages kept in RAM, keyed by URL and body hash, so an unchanged page isn't parsed again either
+SCRAPER_PARSED_ENTRIES = 32
+
 class ContentScraper:
-    def __init__(self):
+    def __init__(self, cache: Optional[HttpCache] = None, pool_size: int = SCRAPER_POOL_SIZE):
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
+        # Keep-alive connections per host, with a couple of retries on transient upstream errors
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=[502, 503, 504], allowed_methods=["GET"])
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.cache = cache
+
+        self._parsed: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.parse_hits = 0
+        self.parse_misses = 0
     
     def _clean_text(self, text: str) -> str:
         """Clean and normalize extracted text"""
@@ -129,67 +160,28 @@ class ContentScraper:
             if not parsed.scheme:
                 url = 'https://' + url
             
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Extract metadata
-            metadata = self._extract_metadata(soup, url)
-            
-            # Extract main content
-            main_content = self._extract_main_content(soup)
-            
-            if main_content:
-                # Get text content
-                text_content = main_content.get_text(separator=' ', strip=True)
-                text_content = self._clean_text(text_content)
-                
-                # Get structured content (headings, paragraphs, lists)
-                structured_content = []
-                
-                for element in main_content.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'ul', 'ol']):
-                    if element.name.startswith('h'):
-                        structured_content.append({
-                            'type': 'heading',
-                            'level': int(element.name[1]),
-                            'text': self._clean_text(element.get_text())
-                        })
-                    elif element.name == 'p':
-                        text = self._clean_text(element.get_text())
-                        if text and len(text) > 10:  # Avoiding very short paragraphs
-                            structured_content.append({
-                                'type': 'paragraph',
-                                'text': text
-                            })
-                    elif element.name in ['ul', 'ol']:
-                        items = []
-                        for li in element.find_all('li'):
-                            item_text = self._clean_text(li.get_text())
-                            if item_text:
-                                items.append(item_text)
-                        if items:
-                            structured_content.append({
-                                'type': 'list',
-                                'list_type': element.name,
-                                'items': items
-                            })
-                
-                return {
-                    'success': True,
-                    'metadata': metadata,
-                    'text_content': text_content,
-                    'structured_content': structured_content,
-                    'word_count': len(text_content.split()),
-                    'character_count': len(text_content)
-                }
+            if self.cache is not None:
+                response = self.cache.get(self.session, url, timeout=10)
             else:
-                return {
-                    'success': False,
-                    'error': 'Could not extract main content from the page',
-                    'metadata': metadata
-                }
-                
+                response = self.session.get(url, timeout=10)
+                response.raise_for_status()
+
+            key = (url, hashlib.sha1(response.content).hexdigest())
+            with self._lock:
+                if key in self._parsed:
+                    self._parsed.move_to_end(key)
+                    self.parse_hits += 1
+                    return copy.deepcopy(self._parsed[key])
+                self.parse_misses += 1
+
+            result = self._parse(response.content, url)
+            if result['success']:
+                with self._lock:
+                    self._parsed[key] = copy.deepcopy(result)
+                    while len(self._parsed) > SCRAPER_PARSED_ENTRIES:
+                        self._parsed.popitem(last=False)
+            return result
+
         except requests.RequestException as e:
             logger.error(f"Network error scraping {url}: {str(e)}")
             return {
@@ -205,10 +197,97 @@ class ContentScraper:
                 'url': url
             }
 
+    def _parse(self, content: bytes, url: str) -> Dict[str, Any]:
+        """Metadata, main text and structured content of a downloaded page."""
+        soup = BeautifulSoup(content, 'html.parser')
+        
+        # Extract metadata
+        metadata = self._extract_metadata(soup, url)
+        
+        # Extract main content
+        main_content = self._extract_main_content(soup)
+        
+        if main_content:
+            # Get text content
+            text_content = main_content.get_text(separator=' ', strip=True)
+            text_content = self._clean_text(text_content)
+            
+            # Get structured content (headings, paragraphs, lists)
+            structured_content = []
+            
+            for element in main_content.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'ul', 'ol']):
+                if element.name.startswith('h'):
+                    structured_content.append({
+                        'type': 'heading',
+                        'level': int(element.name[1]),
+                        'text': self._clean_text(element.get_text())
+                    })
+                elif element.name == 'p':
+                    text = self._clean_text(element.get_text())
+                    if text and len(text) > 10:  # Avoiding very short paragraphs
+                        structured_content.append({
+                            'type': 'paragraph',
+                            'text': text
+                        })
+                elif element.name in ['ul', 'ol']:
+                    items = []
+                    for li in element.find_all('li'):
+                        item_text = self._clean_text(li.get_text())
+                        if item_text:
+                            items.append(item_text)
+                    if items:
+                        structured_content.append({
+                            'type': 'list',
+                            'list_type': element.name,
+                            'items': items
+                        })
+            
+            return {
+                'success': True,
+                'metadata': metadata,
+                'text_content': text_content,
+                'structured_content': structured_content,
+                'word_count': len(text_content.split()),
+                'character_count': len(text_content)
+            }
+        else:
+            return {
+                'success': False,
+                'error': 'Could not extract main content from the page',
+                'metadata': metadata
+            }
+
+
+_scraper: Optional[ContentScraper] = None
+_scraper_lock = threading.Lock()
+
+
+def get_scraper() -> ContentScraper:
+    """The process-wide scraper, created on first use."""
+    global _scraper
+    if _scraper is None:
+        with _scraper_lock:
+            if _scraper is None:
+                cache = None
+                if SCRAPER_CACHE:
+                    try:
+                        cache = HttpCache(SCRAPER_CACHE_PATH, int(SCRAPER_CACHE_MB * 1024 * 1024))
+                    except Exception as e:
+                        logger.error(f"Scraper HTTP cache disabled, could not open {SCRAPER_CACHE_PATH}: {e}")
+                _scraper = ContentScraper(cache)
+    return _scraper
+
+
+def scraper_stats() -> Dict[str, Any]:
+    if _scraper is None:
+        return {"started": False}
+    with _scraper._lock:
+        parsed = {"parse_hits": _scraper.parse_hits, "parse_misses": _scraper.parse_misses}
+    return {"http_cache": _scraper.cache.stats() if _scraper.cache else None, **parsed}
+
 
 def scrape_content(url: str, output_format: str = "text") -> str:
-    scraper = ContentScraper()
-    result = scraper.scrape_url(url)
+    result = get_scraper().scrape_url(url)
     
     if not result['success']:
         return f"Error scraping {url}: {result['error']}"
@@ -0,0 +1,457 @@
+import time
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+VECTOR_BACKENDS = ("chroma", "numpy", "hnsw", "compact")
+COMPACT_PRECISIONS = ("float16", "int8")
+LOAD_PAGE_SIZE = 5000
+
+
+@dataclass
+class QueryResult:
+    """Nearest neighbours of one query vector, best first."""
+    ids: List[str] = field(default_factory=list)
+    documents: List[str] = field(default_factory=list)
+    metadatas: List[dict] = field(default_factory=list)
+    vectors: np.ndarray = field(default_factory=lambda: np.zeros((0, 0), dtype=np.float32))
+    similarities: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.float32))
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def _unit(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+
+class VectorBackend:
+    """
+    Search and write interface over one collection of (id, vector, document, metadata) rows.
+    Similarities are cosine similarities whatever distance the implementation uses internally.
+    """
+
+    name = "base"
+
+    def upsert(self, ids: List[str], vectors, documents: List[str], metadatas: List[dict]):
+        raise NotImplementedError
+
+    def delete(self, ids: List[str]):
+        raise NotImplementedError
+
+    def query(self, vector, k: int) -> QueryResult:
+        raise NotImplementedError
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, "count": self.count()}
+
+
+class ChromaBackend(VectorBackend):
+    """Chroma's own persistent HNSW index; the source of truth the in-process backends mirror."""
+
+    name = "chroma"
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def upsert(self, ids, vectors, documents, metadatas):
+        if ids:
+            self.collection.upsert(ids=list(ids), embeddings=np.asarray(vectors, dtype=np.float32).tolist(),
+                                   documents=list(documents), metadatas=list(metadatas))
+
+    def delete(self, ids):
+        if ids:
+            self.collection.delete(ids=list(ids))
+
+    def query(self, vector, k):
+        found = self.collection.query(
+            query_embeddings=[np.asarray(vector, dtype=np.float32).tolist()],
+            n_results=k,
+            include=["documents", "metadatas", "embeddings"]
+        )
+        if not found["ids"][0]:
+            return QueryResult()
+        vectors = np.asarray(found["embeddings"][0], dtype=np.float32)
+        similarities = _unit(vectors) @ _unit(vector)
+        return QueryResult(found["ids"][0], found["documents"][0],
+                           [metadata or {} for metadata in found["metadatas"][0]], vectors, similarities)
+
+    def count(self):
+        return self.collection.count()
+
+    def rows(self):
+        """Every stored row, a page at a time: (ids, vectors, documents, metadatas)."""
+        offset = 0
+        while True:
+            page = self.collection.get(include=["embeddings", "documents", "metadatas"], limit=LOAD_PAGE_SIZE, offset=offset)
+            if not page["ids"]:
+                return
+            yield page["ids"], np.asarray(page["embeddings"], dtype=np.float32), page["documents"], page["metadatas"]
+            offset += LOAD_PAGE_SIZE
+
+    def fetch(self, ids: List[str]):
+        """Full-precision vectors, documents and metadatas for the given ids, in that order."""
+        page = self.collection.get(ids=list(ids), include=["embeddings", "documents", "metadatas"])
+        position = {doc_id: i for i, doc_id in enumerate(page["ids"])}
+        found = [doc_id for doc_id in ids if doc_id in position]
+        rows = [position[doc_id] for doc_id in found]
+        vectors = np.asarray([page["embeddings"][i] for i in rows], dtype=np.float32)
+        return found, vectors, [page["documents"][i] for i in rows], [page["metadatas"][i] or {} for i in rows]
+
+
+class InProcessBackend(VectorBackend):
+    """
+    Index held in this process. With a `source` (ChromaBackend) writes go to Chroma first and the index
+    is loaded from it; without one it is a standalone index (benchmarks). Other processes' writes are
+    only seen after reload().
+    """
+
+    def __init__(self, source: Optional[ChromaBackend] = None):
+        self.source = source
+        self._lock = threading.RLock()
+        self._documents: Dict[str, str] = {}
+        self._metadatas: Dict[str, dict] = {}
+        self.load_s = 0.0
+        self._reset()
+        if source is not None:
+            self.reload()
+
+    def reload(self):
+        started = time.perf_counter()
+        with self._lock:
+            self._reset()
+            self._documents.clear()
+            self._metadatas.clear()
+            for ids, vectors, documents, metadatas in self.source.rows():
+                self._index_rows(ids, vectors, documents, metadatas)
+        self.load_s = round(time.perf_counter() - started, 3)
+        logger.info(f"{self.name} backend loaded {self.count()} rows in {self.load_s}s")
+
+    def upsert(self, ids, vectors, documents, metadatas):
+        if not ids:
+            return
+        if self.source is not None:
+            self.source.upsert(ids, vectors, documents, metadatas)
+        with self._lock:
+            self._index_rows(list(ids), np.asarray(vectors, dtype=np.float32), list(documents), list(metadatas))
+
+    def delete(self, ids):
+        if not ids:
+            return
+        if self.source is not None:
+            self.source.delete(ids)
+        with self._lock:
+            for doc_id in ids:
+                if doc_id in self._documents:
+                    self._remove(doc_id)
+                    self._documents.pop(doc_id, None)
+                    self._metadatas.pop(doc_id, None)
+
+    def _index_rows(self, ids, vectors, documents, metadatas):
+        # Caller holds self._lock
+        self._add_vectors(ids, _unit(vectors) if len(ids) else vectors)
+        for doc_id, document, metadata in zip(ids, documents, metadatas):
+            self._documents[doc_id] = document
+            self._metadatas[doc_id] = metadata or {}
+
+    def _result(self, ids, vectors, similarities) -> QueryResult:
+        return QueryResult(list(ids), [self._documents[i] for i in ids], [self._metadatas[i] for i in ids],
+                           vectors, np.asarray(similarities, dtype=np.float32))
+
+    def count(self):
+        return len(self._documents)
+
+    def stats(self):
+        return {"backend": self.name, "count": self.count(), "load_s": self.load_s}
+
+    # Index-specific parts
+    def _reset(self):
+        raise NotImplementedError
+
+    def _add_vectors(self, ids, unit_vectors):
+        raise NotImplementedError
+
+    def _remove(self, doc_id):
+        raise NotImplementedError
+
+
+class NumpyBackend(InProcessBackend):
+    """Exact brute-force search over a normalized float32 matrix (one matmul per query)."""
+
+    name = "numpy"
+
+    def _reset(self):
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._size = 0
+        self._row_ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+
+    def _add_vectors(self, ids, unit_vectors):
+        if len(ids) == 0:
+            return
+        if self._matrix.shape[1] != unit_vectors.shape[1]:
+            self._matrix = np.zeros((0, unit_vectors.shape[1]), dtype=np.float32)
+        for doc_id, vector in zip(ids, unit_vectors):
+            row = self._rows.get(doc_id)
+            if row is None:
+                if self._size == len(self._matrix):
+                    # Grow geometrically so appends stay amortized O(1)
+                    grown = np.zeros((max(1024, 2 * len(self._matrix)), self._matrix.shape[1]), dtype=np.float32)
+                    grown[:self._size] = self._matrix[:self._size]
+                    self._matrix = grown
+                row = self._size
+                self._size += 1
+                self._rows[doc_id] = row
+                self._row_ids.append(doc_id)
+            self._matrix[row] = vector
+
+    def _remove(self, doc_id):
+        # Move the last row into the hole so the live rows stay contiguous
+        row = self._rows.pop(doc_id)
+        last = self._size - 1
+        if row != last:
+            moved = self._row_ids[last]
+            self._matrix[row] = self._matrix[last]
+            self._row_ids[row] = moved
+            self._rows[moved] = row
+        self._row_ids.pop()
+        self._size -= 1
+
+    def query(self, vector, k):
+        with self._lock:
+            if self._size == 0 or k <= 0:
+                return QueryResult()
+            similarities = self._matrix[:self._size] @ _unit(vector)
+            k = min(k, self._size)
+            top = np.argpartition(-similarities, k - 1)[:k]
+            top = top[np.argsort(-similarities[top])]
+            return self._result([self._row_ids[i] for i in top], self._matrix[top].copy(), similarities[top])
+
+    def stats(self):
+        return {**super().stats(), "index_bytes": int(self._matrix[:self._size].nbytes)}
+
+
+class HnswBackend(InProcessBackend):
+    """
+    Approximate search with hnswlib (cosine space). Each id keeps one label for as long as it is indexed and
+    labels are never handed out twice; the slots of deleted elements are reused on insert (replace_deleted).
+    Vectors live only in the index and are read back with get_items.
+    """
+
+    name = "hnsw"
+
+    def __init__(self, source: Optional[ChromaBackend] = None, m: int = 16, ef_construction: int = 200, ef_search: int = 64):
+        # Optional dependency: only needed when this backend is selected
+        import hnswlib
+
+        self._hnswlib = hnswlib
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        super().__init__(source)
+
+    def _reset(self):
+        self._index = None
+        self._labels: Dict[str, int] = {}
+        self._label_ids: Dict[int, str] = {}
+        self._next_label = 0
+
+    def _ensure_capacity(self, dim: int, extra: int):
+        if self._index is None:
+            self._index = self._hnswlib.Index(space="cosine", dim=dim)
+            self._index.init_index(max_elements=max(1024, extra), ef_construction=self.ef_construction,
+                                   M=self.m, allow_replace_deleted=True)
+            self._index.set_ef(self.ef_search)
+        needed = self._index.get_current_count() + extra
+        if needed > self._index.get_max_elements():
+            self._index.resize_index(max(needed, 2 * self._index.get_max_elements()))
+
+    def _add_vectors(self, ids, unit_vectors):
+        if len(ids) == 0:
+            return
+        self._ensure_capacity(unit_vectors.shape[1], len(ids))
+        labels = []
+        for doc_id in ids:
+            label = self._labels.get(doc_id)
+            if label is None:
+                label = self._next_label
+                self._next_label += 1
+                self._labels[doc_id] = label
+                self._label_ids[label] = doc_id
+            labels.append(label)
+        self._index.add_items(unit_vectors, np.asarray(labels), replace_deleted=True)
+
+    def _remove(self, doc_id):
+        label = self._labels.pop(doc_id)
+        self._label_ids.pop(label, None)
+        self._index.mark_deleted(label)
+
+    def query(self, vector, k):
+        with self._lock:
+            if not self._labels or k <= 0:
+                return QueryResult()
+            k = min(k, len(self._labels))
+            self._index.set_ef(max(self.ef_search, k))
+            labels, distances = self._index.knn_query(_unit(vector).reshape(1, -1), k=k)
+            labels = [int(label) for label in labels[0]]
+            vectors = np.asarray(self._index.get_items(labels), dtype=np.float32)
+            return self._result([self._label_ids[label] for label in labels], vectors, 1.0 - distances[0])
+
+
+class CompactBackend(InProcessBackend):
+    """
+    Scalar-quantized vectors (float16, or int8 with a per-row scale) searched by brute force, with the
+    top `rerank_factor * k` candidates rescored at full precision. With a source, only the codes and
+    ids stay in RAM: the candidates' float32 vectors, documents and metadata are fetched from Chroma.
+    Standalone, documents are kept in RAM and candidates are ranked on their dequantized vectors.
+    """
+
+    name = "compact"
+    # Rows converted back to float32 at a time while scoring
+    SCORE_CHUNK = 8192
+
+    def __init__(self, source: Optional[ChromaBackend] = None, precision: str = "int8", rerank_factor: int = 4):
+        if precision not in COMPACT_PRECISIONS:
+            raise ValueError(f"Unknown precision {precision!r}; expected one of {COMPACT_PRECISIONS}")
+        self.precision = precision
+        self.rerank_factor = max(1, rerank_factor)
+        super().__init__(source)
+
+    def _reset(self):
+        dtype = np.float16 if self.precision == "float16" else np.int8
+        self._codes = np.zeros((0, 0), dtype=dtype)
+        self._scales = np.zeros(0, dtype=np.float32)
+        self._size = 0
+        self._row_ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+
+    def _encode(self, unit_vectors: np.ndarray):
+        if self.precision == "float16":
+            return unit_vectors.astype(np.float16), np.ones(len(unit_vectors), dtype=np.float32)
+        scales = np.abs(unit_vectors).max(axis=1) / 127
+        scales[scales == 0] = 1.0
+        return np.round(unit_vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+
+    def _decode(self, rows) -> np.ndarray:
+        return self._codes[rows].astype(np.float32) * self._scales[rows, None]
+
+    def _index_rows(self, ids, vectors, documents, metadatas):
+        # Caller holds self._lock
+        self._add_vectors(ids, _unit(vectors) if len(ids) else vectors)
+        if self.source is None:
+            for doc_id, document, metadata in zip(ids, documents, metadatas):
+                self._documents[doc_id] = document
+                self._metadatas[doc_id] = metadata or {}
+
+    def _add_vectors(self, ids, unit_vectors):
+        if len(ids) == 0:
+            return
+        if self._codes.shape[1] != unit_vectors.shape[1]:
+            self._codes = np.zeros((0, unit_vectors.shape[1]), dtype=self._codes.dtype)
+        codes, scales = self._encode(unit_vectors)
+        for doc_id, code, scale in zip(ids, codes, scales):
+            row = self._rows.get(doc_id)
+            if row is None:
+                if self._size == len(self._codes):
+                    capacity = max(1024, 2 * len(self._codes))
+                    grown = np.zeros((capacity, self._codes.shape[1]), dtype=self._codes.dtype)
+                    grown[:self._size] = self._codes[:self._size]
+                    self._codes = grown
+                    self._scales = np.resize(self._scales, capacity)
+                row = self._size
+                self._size += 1
+                self._rows[doc_id] = row
+                self._row_ids.append(doc_id)
+            self._codes[row] = code
+            self._scales[row] = scale
+
+    def delete(self, ids):
+        if not ids:
+            return
+        if self.source is not None:
+            self.source.delete(ids)
+        with self._lock:
+            for doc_id in ids:
+                if doc_id in self._rows:
+                    self._remove(doc_id)
+                    self._documents.pop(doc_id, None)
+                    self._metadatas.pop(doc_id, None)
+
+    def _remove(self, doc_id):
+        row = self._rows.pop(doc_id)
+        last = self._size - 1
+        if row != last:
+            moved = self._row_ids[last]
+            self._codes[row] = self._codes[last]
+            self._scales[row] = self._scales[last]
+            self._row_ids[row] = moved
+            self._rows[moved] = row
+        self._row_ids.pop()
+        self._size -= 1
+
+    def query(self, vector, k):
+        query = _unit(vector)
+        with self._lock:
+            if self._size == 0 or k <= 0:
+                return QueryResult()
+            approximate = np.empty(self._size, dtype=np.float32)
+            for start in range(0, self._size, self.SCORE_CHUNK):
+                end = min(start + self.SCORE_CHUNK, self._size)
+                approximate[start:end] = (self._codes[start:end].astype(np.float32) @ query) * self._scales[start:end]
+            n = min(self._size, k * self.rerank_factor)
+            top = np.argpartition(-approximate, n - 1)[:n]
+            candidate_ids = [self._row_ids[i] for i in top]
+            if self.source is None:
+                vectors = self._decode(top)
+                documents = [self._documents[i] for i in candidate_ids]
+                metadatas = [self._metadatas[i] for i in candidate_ids]
+
+        if self.source is not None:
+            # Rescore at full precision, outside the lock (this is a Chroma read)
+            candidate_ids, vectors, documents, metadatas = self.source.fetch(candidate_ids)
+            if not candidate_ids:
+                return QueryResult()
+
+        similarities = _unit(vectors) @ query
+        order = np.argsort(-similarities)[:k]
+        return QueryResult([candidate_ids[i] for i in order], [documents[i] for i in order],
+                           [metadatas[i] for i in order], vectors[order], similarities[order])
+
+    def count(self):
+        return self._size
+
+    def stats(self):
+        return {
+            "backend": self.name,
+            "count": self.count(),
+            "load_s": self.load_s,
+            "precision": self.precision,
+            "rerank_factor": self.rerank_factor,
+            "index_bytes": int(self._codes[:self._size].nbytes + self._scales[:self._size].nbytes),
+        }
+
+
+def make_backend(kind: str, collection=None, **kwargs) -> VectorBackend:
+    """Backend of the given kind over a Chroma collection (or a standalone index when collection is None)."""
+    if kind not in VECTOR_BACKENDS:
+        raise ValueError(f"Unknown vector backend {kind!r}; expected one of {VECTOR_BACKENDS}")
+    source = ChromaBackend(collection) if collection is not None else None
+    if kind == "chroma":
+        if source is None:
+            raise ValueError("The chroma backend needs a collection")
+        return source
+    if kind == "numpy":
+        return NumpyBackend(source)
+    if kind == "compact":
+        return CompactBackend(source, **kwargs)
+    return HnswBackend(source, **kwargs)
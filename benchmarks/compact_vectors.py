@@ -0,0 +1,136 @@
+"""
+Memory footprint, query latency and recall@k of the compact (float16 / int8) memory index against the
+current `bitbud` collection layout, on a Chroma collection of synthetic memories shaped like the ones
+store_to_memory writes (document, timestamp/session/tier metadata and a context summary).
+
+Layouts compared, each in a fresh process over the same persisted collection:
+  chroma          queries Chroma's own index (BITBUD_VECTOR_BACKEND=chroma)
+  numpy           float32 vectors, documents and metadata mirrored in RAM
+  compact-*       quantized codes in RAM; the top rerank x k candidates are rescored from Chroma's float32 copy
+
+    python -m benchmarks.compact_vectors --sizes 10000 50000 --k 10
+"""
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+from multiprocessing import get_context
+from concurrent.futures import ProcessPoolExecutor
+
+from agent.vectorBackend import make_backend
+from benchmarks.vector_backends import _rss_mb, synthetic_vectors, synthetic_queries, exact_neighbours
+
+LAYOUTS = {
+    "chroma": ("chroma", {}),
+    "numpy": ("numpy", {}),
+    "compact-float16": ("compact", {"precision": "float16", "rerank_factor": 4}),
+    "compact-int8": ("compact", {"precision": "int8", "rerank_factor": 4}),
+    "compact-int8-norerank": ("compact", {"precision": "int8", "rerank_factor": 1}),
+}
+
+
+def build_collection(directory: str, size: int, dim: int, seed: int) -> float:
+    """Persist `size` synthetic memories; returns the on-disk size in MB."""
+    import chromadb
+
+    collection = chromadb.PersistentClient(path=directory).get_or_create_collection("bitbud", metadata={"hnsw:space": "cosine"})
+    now = time.time()
+    for start, batch in synthetic_vectors(size, dim, seed):
+        ids = [str(i) for i in range(start, start + len(batch))]
+        documents = [f"Synthetic conversation turn {i} about plans, reminders and the things said earlier that day." for i in ids]
+        metadatas = [{
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(now - int(i) * 60)),
+            "ts": now - int(i) * 60,
+            "session_id": f"session-{int(i) // 40}",
+            "source": "conversation",
+            "tier": "hot",
+            "context": "plans reminders earlier day",
+        } for i in ids]
+        collection.upsert(ids=ids, embeddings=batch.tolist(), documents=documents, metadatas=metadatas)
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(directory) for name in names) / 2**20
+
+
+def run_layout(layout: str, directory: str, queries, truth, k: int) -> dict:
+    """Runs in its own process so memory figures aren't polluted by earlier runs."""
+    import chromadb
+
+    kind, options = LAYOUTS[layout]
+    collection = chromadb.PersistentClient(path=directory).get_collection("bitbud")
+    rss_start = _rss_mb()
+
+    started = time.perf_counter()
+    backend = make_backend(kind, collection, **options)
+    backend.query(queries[0], k)  # Chroma loads its index on the first query
+    load_s = time.perf_counter() - started
+    rss_loaded = _rss_mb()
+
+    latencies, recalls = [], []
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        result = backend.query(query, k)
+        latencies.append((time.perf_counter() - started) * 1000)
+        recalls.append(len({int(i) for i in result.ids} & set(expected.tolist())) / k)
+
+    latencies.sort()
+    stats = backend.stats()
+    return {
+        "layout": layout,
+        "load_s": round(load_s, 2),
+        "p50_ms": round(statistics.median(latencies), 3),
+        "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 3),
+        f"recall@{k}": round(statistics.mean(recalls), 4),
+        "rss_mb": round(rss_loaded, 1),
+        "index_rss_mb": round(rss_loaded - rss_start, 1),
+        "vector_mb": round(stats["index_bytes"] / 2**20, 1) if "index_bytes" in stats else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000])
+    parser.add_argument("--dim", type=int, default=384, help="MiniLM embeddings are 384-dimensional")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--layout", choices=list(LAYOUTS), action="append", help="layout(s) to run (default: all)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        directory = tempfile.mkdtemp(prefix="bitbud-compact-")
+        try:
+            disk_mb = build_collection(directory, size, args.dim, args.seed)
+            queries = synthetic_queries(size, args.dim, args.seed, args.queries)
+            truth = exact_neighbours(size, args.dim, args.seed, queries, args.k)
+            if not args.json:
+                print(f"n={size:,}  chroma on disk {disk_mb:.1f}MB", flush=True)
+            for layout in args.layout or list(LAYOUTS):
+                with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+                    try:
+                        result = pool.submit(run_layout, layout, directory, queries, truth, args.k).result()
+                    except Exception as e:
+                        result = {"layout": layout, "error": str(e)}
+                result.update(size=size, disk_mb=round(disk_mb, 1))
+                results.append(result)
+                if args.json:
+                    continue
+                if "error" in result:
+                    print(f"  {layout:<22} failed: {result['error']}")
+                    continue
+                vector_mb = f"{result['vector_mb']:>7.1f}MB" if result["vector_mb"] is not None else "      -  "
+                print(f"  {layout:<22} load {result['load_s']:>6.2f}s  p50 {result['p50_ms']:>8.3f}ms  "
+                      f"p99 {result['p99_ms']:>8.3f}ms  recall@{args.k} {result[f'recall@{args.k}']:.3f}  "
+                      f"rss +{result['index_rss_mb']:.1f}MB  vectors {vector_mb}", flush=True)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Compare the embedding providers: sentence-transformers on PyTorch (the current HuggingFaceEmbeddings)
+against the ONNX export on onnxruntime, float32 and int8. Export the ONNX models first (export_onnx.py).
+
+Each provider runs in a fresh process and reports load time (imports included), the first call,
+single-text latency p50/p99, throughput at several batch sizes, RSS, and the cosine similarity of
+its vectors to the PyTorch ones. Run from the repo root:
+
+    python -m benchmarks.embedding_providers --threads 4 --texts 512
+"""
+import json
+import time
+import argparse
+import statistics
+from multiprocessing import get_context
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from benchmarks.rag_retrieval import make_dataset
+from benchmarks.vector_backends import _rss_mb
+
+PROVIDERS = ("huggingface", "onnx", "onnx-int8")
+AGREEMENT_SAMPLE = 64
+
+
+def _load(provider: str, threads: int, batch_size: int):
+    from agent.memoryService import EMBED_MODEL, EMBED_ONNX_DIR
+
+    if provider == "huggingface":
+        import torch
+        from langchain.embeddings import HuggingFaceEmbeddings
+
+        if threads > 0:
+            torch.set_num_threads(threads)
+        return HuggingFaceEmbeddings(model_name=EMBED_MODEL)
+
+    from agent.onnxEmbeddings import OnnxEmbeddings
+    return OnnxEmbeddings(EMBED_ONNX_DIR, quantized=provider == "onnx-int8", threads=threads, batch_size=batch_size)
+
+
+def run_provider(provider: str, texts: list[str], threads: int, batch_sizes: list[int], singles: int) -> dict:
+    """Runs in its own process so load time and memory start from a cold interpreter."""
+    rss_start = _rss_mb()
+    started = time.perf_counter()
+    embeddings = _load(provider, threads, max(batch_sizes))
+    load_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    embeddings.embed_query(texts[0])
+    first_ms = (time.perf_counter() - started) * 1000
+
+    latencies = []
+    for text in texts[:singles]:
+        started = time.perf_counter()
+        embeddings.embed_query(text)
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+
+    throughput = {}
+    for batch_size in batch_sizes:
+        started = time.perf_counter()
+        for start in range(0, len(texts), batch_size):
+            embeddings.embed_documents(texts[start:start + batch_size])
+        throughput[str(batch_size)] = round(len(texts) / (time.perf_counter() - started), 1)
+
+    return {
+        "provider": provider,
+        "load_s": round(load_s, 3),
+        "first_call_ms": round(first_ms, 2),
+        "p50_ms": round(statistics.median(latencies), 3),
+        "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 3),
+        "texts_per_s": throughput,
+        "rss_mb": round(_rss_mb(), 1),
+        "load_rss_mb": round(_rss_mb() - rss_start, 1),
+        "sample": embeddings.embed_documents(texts[:AGREEMENT_SAMPLE]),
+    }
+
+
+def _agreement(vectors, reference) -> dict:
+    vectors, reference = np.asarray(vectors), np.asarray(reference)
+    cosine = (vectors * reference).sum(axis=1) / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(reference, axis=1))
+    return {"mean_cosine": round(float(cosine.mean()), 5), "min_cosine": round(float(cosine.min()), 5)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--provider", choices=PROVIDERS, action="append", help="provider(s) to run (default: all)")
+    parser.add_argument("--threads", type=int, default=0, help="inference threads (0 = runtime default)")
+    parser.add_argument("--texts", type=int, default=512, help="synthetic conversation turns to embed")
+    parser.add_argument("--singles", type=int, default=200, help="single-text calls timed for p50/p99")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    memories, facts = make_dataset(max(1, args.texts // 30), 30, 20, 30, seed=7)
+    texts = ([fact for fact, _ in facts] + [text for text, _, _ in memories])[:args.texts]
+
+    results = []
+    for provider in args.provider or PROVIDERS:
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+            try:
+                result = pool.submit(run_provider, provider, texts, args.threads, args.batch_sizes, args.singles).result()
+            except Exception as e:
+                result = {"provider": provider, "error": str(e)}
+        results.append(result)
+
+    reference = next((r["sample"] for r in results if r.get("provider") == "huggingface" and "sample" in r), None)
+    for result in results:
+        sample = result.pop("sample", None)
+        if reference is not None and sample is not None:
+            result["agreement"] = _agreement(sample, reference)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for result in results:
+        if "error" in result:
+            print(f"{result['provider']:<12} failed: {result['error']}")
+            continue
+        throughput = "  ".join(f"b{size} {rate:,.0f}/s" for size, rate in result["texts_per_s"].items())
+        agreement = f"  cos {result['agreement']['mean_cosine']:.4f} (min {result['agreement']['min_cosine']:.4f})" if "agreement" in result else ""
+        print(f"{result['provider']:<12} load {result['load_s']:>6.2f}s  first {result['first_call_ms']:>8.1f}ms  "
+              f"p50 {result['p50_ms']:>7.2f}ms  p99 {result['p99_ms']:>7.2f}ms  {throughput}  "
+              f"rss {result['rss_mb']:.0f}MB{agreement}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Offline evaluation of the embedding nearest-neighbour router against the LLM router.
+
+For each labelled utterance reports, per router, whether the first routed function matches
+the label and how long routing took. For the embedding router it also reports coverage: the
+share of inputs it would answer directly instead of deferring to the planner. Run from the
+repo root (the LLM half needs a running Ollama):
+
+    python -m benchmarks.intent_router_eval
+    python -m benchmarks.intent_router_eval --skip-llm
+"""
+import argparse
+import json
+import statistics
+import time
+
+from agent.embeddingRouter import build_intent_index, classify_intent, route_by_embedding
+from agent.langGraphRouter import FUNCTION_HANDLERS
+from agent.llm import get_intent, get_plan, get_plan_and_intent
+from agent.memo import RequestMemo
+
+EVAL_SET_PATH = "benchmarks/data/intent_eval.jsonl"
+
+
+def load_eval_set(path: str) -> list[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _first_function(result) -> str:
+    if isinstance(result, dict):
+        result = [result]
+    if isinstance(result, list) and result and isinstance(result[0], dict):
+        return result[0].get("function", "fallback")
+    return "fallback"
+
+
+def route_with_llm(text: str, mode: str) -> str:
+    if mode == "fused":
+        return _first_function(get_plan_and_intent(text).get("tool_chain"))
+    plan = get_plan(text)
+    return _first_function(get_intent(
+        text,
+        plan.get("clarify"),
+        plan.get("reasoning", ""),
+        plan.get("steps", []),
+        plan.get("final_instruction", text),
+    ))
+
+
+def _ms(values: list[float]) -> str:
+    if not values:
+        return "n/a"
+    return f"p50 {statistics.median(values) * 1000:.1f}ms, mean {statistics.mean(values) * 1000:.1f}ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--eval-set", default=EVAL_SET_PATH)
+    parser.add_argument("--mode", choices=["two_stage", "fused"], default="two_stage", help="LLM router to compare against")
+    parser.add_argument("--skip-llm", action="store_true", help="only evaluate the embedding router")
+    args = parser.parse_args()
+
+    rows = load_eval_set(args.eval_set)
+
+    start = time.perf_counter()
+    index = build_intent_index(FUNCTION_HANDLERS.keys())
+    if index is None:
+        raise SystemExit("Embedding router index could not be built (embedding model missing?)")
+    print(f"Index: {len(index)} examples built in {time.perf_counter() - start:.2f}s\n")
+
+    nn_correct = emitted = emitted_correct = llm_correct = 0
+    nn_times, llm_times = [], []
+
+    for row in rows:
+        text, label = row["text"], row["function"]
+
+        t0 = time.perf_counter()
+        memo = RequestMemo()  # both calls share one embedding, as in the graph
+        nearest = classify_intent(text, memo)
+        routed = route_by_embedding(text, memo)
+        nn_times.append(time.perf_counter() - t0)
+
+        nn_correct += nearest["function"] == label
+        if routed:
+            emitted += 1
+            emitted_correct += routed["function"] == label
+
+        llm_function = "-"
+        if not args.skip_llm:
+            t0 = time.perf_counter()
+            llm_function = route_with_llm(text, args.mode)
+            llm_times.append(time.perf_counter() - t0)
+            llm_correct += llm_function == label
+
+        marker = "direct" if routed else "defer "
+        print(f"{marker} {text[:45]:<45} | label {label:<15} | nn {nearest['function']:<15} ({nearest['score']:.2f}/{nearest['margin']:.2f}) | llm {llm_function}")
+
+    total = len(rows)
+    print()
+    print(f"Embedding router: top-1 accuracy {nn_correct / total:.1%}, {_ms(nn_times)}")
+    print(f"                  coverage {emitted / total:.1%}, precision when emitting {emitted_correct / emitted:.1%}" if emitted else
+          "                  coverage 0.0% (nothing cleared the confidence margin)")
+    if not args.skip_llm:
+        print(f"LLM router ({args.mode}): accuracy {llm_correct / total:.1%}, {_ms(llm_times)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+Exercise agent.llmBackend.OllamaBackend against a stand-in /api/generate server started in-process, so
+the client can be checked without Ollama or a model: sync and async streaming, the per-call deadline,
+cancellation and the in-flight cap. Run from the repo root; exits non-zero if any check fails:
+
+    python -m benchmarks.llm_backend_check
+
+The stand-in streams one NDJSON line per word of its reply, like Ollama streams one per token. A
+prompt of "slow" makes it pause STEP_S between words, long enough to hit short deadlines.
+"""
+import sys
+import json
+import time
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from agent.llmBackend import LLMCancelledError, LLMTimeoutError, OllamaBackend
+
+REPLY = "the quick brown fox jumps over the lazy dog"
+STEP_S = 0.05
+
+
+class StandInOllama(ThreadingHTTPServer):
+    """Minimal /api/generate: streams REPLY word by word and records how many requests ran at once."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests = []
+
+    def wait_idle(self, timeout: float = 5.0):
+        """Wait for abandoned streams (cancelled or timed out by the client) to notice the closed connection."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self.lock:
+                if self.in_flight == 0:
+                    self.max_in_flight = 0
+                    return
+            time.sleep(0.01)
+        raise AssertionError(f"stand-in still has {self.in_flight} request(s) running")
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _line(self, data: dict):
+        body = (json.dumps(data) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(body):x}\r\n".encode("ascii") + body + b"\r\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        server = self.server
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        with server.lock:
+            server.requests.append(payload)
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        words = REPLY.split(" ")
+        step = STEP_S if payload.get("prompt", "").endswith("slow") else 0.0
+        finished = False
+        try:
+            for i, word in enumerate(words):
+                time.sleep(step)
+                self._line({"model": payload["model"], "response": word if i == 0 else " " + word, "done": False})
+            # Leave the in-flight count before the final line, so a client that reads it and starts its next
+            # request is never counted twice
+            with server.lock:
+                server.in_flight -= 1
+            finished = True
+            self._line({"model": payload["model"], "response": "", "done": True, "prompt_eval_count": 12,
+                        "prompt_eval_duration": 3_000_000, "eval_count": len(words), "eval_duration": 9_000_000,
+                        "total_duration": 15_000_000})
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client closed the stream: that is how a cancelled or timed-out generation stops
+            self.close_connection = True
+        finally:
+            if not finished:
+                with server.lock:
+                    server.in_flight -= 1
+
+
+def check_sync_stream(server: StandInOllama):
+    backend = OllamaBackend(base_url=server.url, model="stand-in")
+    chunks = list(backend.stream("hello", prefix="static prefix\n", label="check"))
+    assert "".join(chunks) == REPLY, chunks
+    assert len(chunks) == len(REPLY.split(" ")), chunks
+    sent = server.requests[-1]
+    assert sent["prompt"] == "static prefix\nhello" and sent["stream"] is True, sent
+    assert sent["keep_alive"] == backend.keep_alive, sent
+
+    result = backend.generate("hello", label="check")
+    assert result.text == REPLY and result.eval_count == len(REPLY.split(" ")), result
+    assert result.prompt_eval_count == 12 and result.prompt_eval_ms == 3.0, result
+    assert backend.call_stats()["check"]["calls"] == 2, backend.call_stats()
+    backend.close()
+
+
+def check_async_stream(server: StandInOllama):
+    backend = OllamaBackend(base_url=server.url, model="stand-in")
+
+    async def run():
+        try:
+            chunks = [chunk async for chunk in backend.astream("hello", label="check")]
+            result = await backend.agenerate("hello", label="check")
+            return chunks, result
+        finally:
+            await backend.aclose()
+
+    chunks, result = asyncio.run(run())
+    assert "".join(chunks) == REPLY, chunks
+    assert result.text == REPLY and result.eval_count == len(REPLY.split(" ")), result
+
+
+def check_deadline(server: StandInOllama):
+    backend = OllamaBackend(base_url=server.url, model="stand-in")
+    started = time.monotonic()
+    try:
+        backend.generate("slow", timeout=0.2)
+        raise AssertionError("sync generation outlived its deadline")
+    except LLMTimeoutError as e:
+        assert "0.2s" in str(e), e
+    assert time.monotonic() - started < 0.2 + 2 * STEP_S + 0.2, "sync deadline enforced late"
+
+    async def run():
+        try:
+            await backend.agenerate("slow", timeout=0.2)
+        finally:
+            await backend.aclose()
+
+    try:
+        asyncio.run(run())
+        raise AssertionError("async generation outlived its deadline")
+    except LLMTimeoutError as e:
+        assert "0.2s" in str(e), e
+    # Both slots are free again
+    assert backend.generate("hello").text == REPLY
+    backend.close()
+
+
+def check_cancel(server: StandInOllama):
+    backend = OllamaBackend(base_url=server.url, model="stand-in", max_in_flight=1)
+    cancel = threading.Event()
+    chunks = []
+    try:
+        for chunk in backend.stream("slow", cancel=cancel):
+            chunks.append(chunk)
+            cancel.set()
+        raise AssertionError("cancelled generation kept streaming")
+    except LLMCancelledError:
+        pass
+    assert len(chunks) == 1, chunks
+
+    async def run():
+        task = asyncio.create_task(backend.agenerate("slow"))
+        await asyncio.sleep(2 * STEP_S)
+        task.cancel()
+        try:
+            await task
+            raise AssertionError("cancelled task finished")
+        except asyncio.CancelledError:
+            pass
+        finally:
+            await backend.aclose()
+
+    asyncio.run(run())
+    # With a single slot, this only completes if both cancellations released it
+    assert backend.generate("hello", timeout=2).text == REPLY
+    backend.close()
+
+
+def check_in_flight_cap(server: StandInOllama):
+    backend = OllamaBackend(base_url=server.url, model="stand-in", max_in_flight=2)
+    server.wait_idle()
+    errors = []
+
+    def worker():
+        try:
+            backend.generate("slow", timeout=10)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    # Both slots are taken by slow generations: a short deadline expires while waiting for one
+    time.sleep(STEP_S)
+    try:
+        backend.generate("hello", timeout=0.05)
+        raise AssertionError("generation started beyond the in-flight cap")
+    except LLMTimeoutError as e:
+        assert "No free generation slot" in str(e), e
+    for thread in threads:
+        thread.join()
+    assert not errors, errors
+    assert server.max_in_flight == 2, server.max_in_flight
+
+    async def run():
+        try:
+            results = await asyncio.gather(*(backend.agenerate("slow", timeout=10) for _ in range(6)))
+        finally:
+            await backend.aclose()
+        assert all(result.text == REPLY for result in results), results
+
+    server.wait_idle()
+    asyncio.run(run())
+    assert server.max_in_flight == 2, server.max_in_flight
+    backend.close()
+
+
+CHECKS = [check_sync_stream, check_async_stream, check_deadline, check_cancel, check_in_flight_cap]
+
+
+def main():
+    server = StandInOllama()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    failed = 0
+    try:
+        for check in CHECKS:
+            started = time.perf_counter()
+            try:
+                check(server)
+                print(f"ok      {check.__name__} ({time.perf_counter() - started:.2f}s)")
+            except Exception as e:
+                failed += 1
+                print(f"FAILED  {check.__name__}: {type(e).__name__}: {e}")
+    finally:
+        server.shutdown()
+        server.server_close()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
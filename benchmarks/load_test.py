@@ -0,0 +1,97 @@
+"""
+Closed-loop load test for the /ask endpoint: throughput and latency at several concurrency levels.
+
+Start a server first (`python server.py`, `BITBUD_CHROMA_URL=... python server.py --workers 4` or `python main.py`), then from the repo root:
+
+    python -m benchmarks.load_test --url http://127.0.0.1:5001 --concurrency 1 8 32 --requests 64
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+
+DEFAULT_MESSAGES = [
+    "what time is it?",
+    "list alarms",
+    "show processes",
+    "what is the current volume?",
+    "what did I tell you about my weekend?",
+    "I like coffee",
+]
+
+
+async def _worker(client: httpx.AsyncClient, url: str, messages: list[str], queue: asyncio.Queue, latencies: list, errors: list):
+    while True:
+        try:
+            i = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+        message = messages[i % len(messages)]
+        start = time.perf_counter()
+        try:
+            response = await client.post(f"{url}/ask", json={"message": message})
+            if response.status_code != 200:
+                errors.append(response.status_code)
+            else:
+                latencies.append(time.perf_counter() - start)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+
+
+async def run_level(url: str, concurrency: int, total: int, messages: list[str], timeout: float) -> dict:
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(i)
+
+    latencies, errors = [], []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*[_worker(client, url, messages, queue, latencies, errors) for _ in range(concurrency)])
+        elapsed = time.perf_counter() - start
+
+    ordered = sorted(latencies)
+
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] if ordered else float("nan")
+
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "ok": len(latencies),
+        "errors": len(errors),
+        "elapsed_s": round(elapsed, 2),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_s": round(statistics.median(ordered), 3) if ordered else None,
+        "p99_s": round(pct(99), 3) if ordered else None,
+    }
+
+
+async def main_async(args):
+    messages = DEFAULT_MESSAGES if not args.message else args.message
+    results = []
+    for concurrency in args.concurrency:
+        result = await run_level(args.url.rstrip("/"), concurrency, max(args.requests, concurrency), messages, args.timeout)
+        results.append(result)
+        print(f"c={result['concurrency']:<3} ok={result['ok']:<4} errors={result['errors']:<3} "
+              f"throughput={result['throughput_rps']:>7.2f} req/s  p50={result['p50_s']}s  p99={result['p99_s']}s")
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:5001")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=64, help="requests per concurrency level")
+    parser.add_argument("--message", action="append", help="message to send (repeatable); defaults to a mixed set")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--json", action="store_true")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
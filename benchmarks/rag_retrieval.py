@@ -0,0 +1,310 @@
+"""
+Offline latency and quality benchmark for the RAG fallback path: retrieve_context, retrieve_about_context
+and build_rag_prompt, run exactly as handle_user_input runs them, against temporary Chroma stores.
+
+Synthetic sessions of filler turns are written to a throwaway memory directory, with one planted fact
+per query (e.g. "I parked the car on level 4 of the airport garage." for "Which level did I park on at
+the airport garage?"). Each query is replayed with per-stage timings (embedding, search, rerank, boost
+terms, about search, prompt build) and recall@k / MRR against its planted fact. LLM calls (context and
+session summaries) are replaced by local keyword extraction, so nothing needs Ollama. Run from the repo
+root and compare the JSON between commits:
+
+    python -m benchmarks.rag_retrieval --sessions 200 --turns 30 --queries 100
+    python -m benchmarks.rag_retrieval --embedder hash --json --output before.json
+    BITBUD_VECTOR_BACKEND=numpy python -m benchmarks.rag_retrieval --tiers
+
+--embedder hash uses a token-hashing embedder instead of MiniLM (no model files, less meaningful recall).
+--tiers compacts the older sessions into the cold tier before querying, as the compaction job would.
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import shutil
+import tempfile
+import statistics
+import subprocess
+from contextlib import redirect_stdout
+
+FACTS = [
+    ("My sister {name} just moved to {city}.", "Where does my sister {name} live now?"),
+    ("I parked the car on level {n} of the {place} garage.", "Which level did I park on at the {place} garage?"),
+    ("My {doctor} appointment is on {day} at {hour} o'clock.", "When is my {doctor} appointment?"),
+    ("The wifi password for the {place} office is {word}{n}.", "What's the wifi password at the {place} office?"),
+    ("{name} is allergic to {food}.", "What is {name} allergic to?"),
+    ("My flight to {city} leaves from gate {n}.", "Which gate does my flight to {city} leave from?"),
+    ("I lent my {thing} to {name} last week.", "Who did I lend my {thing} to?"),
+    ("{name}'s birthday is on the {n}th of {month}.", "When is {name}'s birthday?"),
+    ("My {thing} is in the storage unit by the {place}.", "Where is my {thing} stored?"),
+    ("{name} recommended a great book about {topic}.", "What was the book {name} recommended about?"),
+    ("I'm meeting {name} in {city} on {day}.", "When am I meeting {name} in {city}?"),
+    ("The {topic} class starts at {hour} o'clock on {day}s.", "What time does the {topic} class start?"),
+]
+
+FILLER = [
+    "Can you remind me to {task} tomorrow?",
+    "I think {topic} is really interesting lately.",
+    "Let's talk about {topic} for a bit.",
+    "I had {food} for lunch today.",
+    "What's a good way to get better at {topic}?",
+    "I need to {task} before the weekend.",
+    "{name} and I watched a documentary about {topic}.",
+    "Remind me what we said about {topic} earlier.",
+]
+
+ABOUT_FACTS = [
+    "The user's name is Sam and they work as a {job}.",
+    "The user lives in {city} with a cat called {name}.",
+    "The user prefers short answers and metric units.",
+    "The user is learning {topic} in their spare time.",
+    "The user usually starts work at {hour} o'clock.",
+]
+
+SLOTS = {
+    "name": ["Priya", "Marco", "Aisha", "Tomas", "Mei", "Jonas", "Leila", "Kofi", "Ines", "Ravi", "Nora", "Hugo"],
+    "city": ["Lisbon", "Osaka", "Nairobi", "Denver", "Krakow", "Auckland", "Montreal", "Seville", "Hanoi", "Oslo"],
+    "place": ["airport", "downtown", "riverside", "station", "north campus", "mall", "harbour", "hospital"],
+    "doctor": ["dentist", "dermatologist", "physio", "optician", "GP", "allergist"],
+    "day": ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"],
+    "month": ["January", "March", "May", "July", "September", "November"],
+    "word": ["maple", "orbit", "pepper", "quartz", "willow", "falcon"],
+    "food": ["peanuts", "shellfish", "sesame", "kiwi", "gluten", "ramen", "tacos", "curry", "salad"],
+    "thing": ["drill", "tent", "bike", "camera", "ladder", "projector", "kayak", "guitar"],
+    "task": ["call the bank", "renew my passport", "water the plants", "book a haircut", "pay the rent", "back up my laptop"],
+    "topic": ["astronomy", "sourdough baking", "chess openings", "rust programming", "birdwatching", "jazz piano", "climbing"],
+    "job": ["nurse", "data engineer", "teacher", "architect"],
+}
+
+STAGES = ["embed", "boost_terms", "search", "rerank", "retrieve", "about", "prompt", "total"]
+
+
+def _values(rng: random.Random) -> dict:
+    values = {slot: rng.choice(options) for slot, options in SLOTS.items()}
+    values["n"] = rng.randint(2, 28)
+    values["hour"] = rng.randint(7, 18)
+    return values
+
+
+def make_dataset(sessions: int, turns: int, queries: int, days: float, seed: int):
+    """(memories, facts): memories are (text, session_index, ts); facts are (fact text, query) pairs planted among them."""
+    rng = random.Random(seed)
+    now = time.time()
+    memories = []
+    for session in range(sessions):
+        start = now - days * 86400 * (1 - session / max(1, sessions)) - 2 * 3600
+        for turn in range(turns):
+            template = rng.choice(FILLER)
+            memories.append((template.format(**_values(rng)), session, start + turn * 60))
+
+    facts, seen, used = [], set(), set()
+    # Bounded: the templates only have so many distinct queries
+    for _ in range(queries * 1000):
+        if len(facts) >= min(queries, len(memories)):
+            break
+        fact_template, query_template = rng.choice(FACTS)
+        values = _values(rng)
+        query = query_template.format(**values)
+        slot = rng.randrange(len(memories))
+        if query in seen or slot in used:
+            continue
+        seen.add(query)
+        used.add(slot)
+        fact = fact_template.format(**values)
+        _, session, ts = memories[slot]
+        memories[slot] = (fact, session, ts)
+        facts.append((fact, query))
+    return memories, facts
+
+
+class HashEmbeddings:
+    """Token-hashing bag-of-words embedder: deterministic and model-free, for runs without MiniLM."""
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def _embed(self, text: str) -> list[float]:
+        import numpy as np
+
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token in text.lower().replace("?", " ").replace(".", " ").replace("'s", " ").split():
+            digest = hashlib.md5(token.encode("utf-8")).digest()
+            vector[int.from_bytes(digest[:4], "little") % self.dim] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._embed(text)
+
+
+class StageTimer:
+    """Accumulates wall time per stage for the query in progress."""
+
+    def __init__(self):
+        self.current = {}
+
+    def wrap(self, stage: str, func):
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.current[stage] = self.current.get(stage, 0.0) + time.perf_counter() - started
+        return timed
+
+
+def _percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--turns", type=int, default=30, help="turns per session")
+    parser.add_argument("--queries", type=int, default=50, help="queries, each with one planted fact")
+    parser.add_argument("--days", type=float, default=30, help="span the sessions are spread over")
+    parser.add_argument("--k", type=int, default=5, help="memories retrieve_context returns")
+    parser.add_argument("--embedder", choices=["model", "hash"], default="model")
+    parser.add_argument("--tiers", action="store_true", help="compact closed sessions into the cold tier first")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    parser.add_argument("--output", help="also write the JSON summary to this file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bitbud-rag-bench-")
+    # Everything the memory modules read at import: a throwaway store, no background writers or jobs
+    os.environ["BITBUD_MEMORY_DIR"] = os.path.join(workdir, "memory")
+    os.environ["BITBUD_EMBED_CACHE_DIR"] = os.path.join(workdir, "embedding_cache")
+    os.environ["BITBUD_MEMORY_WRITE_BEHIND"] = "0"
+    os.environ["BITBUD_ABOUT_WATCH"] = "0"
+    os.environ["BITBUD_MEMORY_RETENTION_DAYS"] = "0"
+    os.environ["BITBUD_SESSION_COMPACTION"] = "1" if args.tiers else "0"
+    os.environ["BITBUD_COMPACTION_INTERVAL_MIN"] = str(10 ** 6)
+
+    import agent.memoryService as memory_module
+    from agent.memo import RequestMemo
+    from agent.summaryCache import extract_keywords
+
+    if args.embedder == "hash":
+        memory_module._load_embeddings = HashEmbeddings
+
+    import agent.chromaMemory as memory
+
+    timer = StageTimer()
+
+    def stub_summary(text, memo=None):
+        return " ".join(extract_keywords(text)) or None
+
+    # LLM stand-ins: keyword "summaries" for context boosts, concatenated turns for session summaries
+    memory.generate_context_summary = timer.wrap("boost_terms", stub_summary)
+    memory.summarize_session = lambda turns: " ".join(turns)
+    memory.ABOUT_FILE = os.path.join(workdir, "ABOUT.md")
+
+    rng = random.Random(args.seed)
+    with open(memory.ABOUT_FILE, "w", encoding="utf-8") as f:
+        f.write("\n".join(line.format(**_values(rng)) for line in ABOUT_FACTS))
+
+    service = memory_module.memory_service
+    started = time.perf_counter()
+    service.warm_up()
+    load_s = time.perf_counter() - started
+
+    memories, facts = make_dataset(args.sessions, args.turns, args.queries, args.days, args.seed)
+    started = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        memory.reindex_about()
+        hot = service.backend("bitbud")
+        for start in range(0, len(memories), 256):
+            batch = memories[start:start + 256]
+            texts = [text for text, _, _ in batch]
+            metadatas = [{
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(ts)),
+                "ts": ts,
+                "session_id": f"bench-{session}",
+                "source": "conversation",
+                "tier": "hot",
+                "context": stub_summary(text) or "",
+            } for text, session, ts in batch]
+            ids = [f"bench-{start + i}" for i in range(len(batch))]
+            hot.upsert(ids, service.embeddings.embed_documents(texts), texts, metadatas)
+        compacted = memory.compact_closed_sessions(max_sessions=args.sessions) if args.tiers else None
+    fill_s = time.perf_counter() - started
+
+    memory.embed_text = timer.wrap("embed", memory.embed_text)
+    memory.rerank = timer.wrap("rerank", memory.rerank)
+    for name in ("bitbud", "bitbud_sessions"):
+        backend = service.backend(name)
+        if backend is not None:
+            backend.query = timer.wrap("search", backend.query)
+
+    samples, hits, reciprocal_ranks = [], [], []
+    with redirect_stdout(io.StringIO()):
+        for fact, query in facts:
+            timer.current = {}
+            memo = RequestMemo()
+            started = time.perf_counter()
+            memory_docs = timer.wrap("retrieve", memory.retrieve_context)(query, k=args.k, memo=memo)
+            about_docs = timer.wrap("about", memory.retrieve_about_context)(query, memo=memo)
+            timer.wrap("prompt", memory.build_rag_prompt)(query, memory_docs, about_docs)
+            timer.current["total"] = time.perf_counter() - started
+            samples.append(dict(timer.current))
+
+            rank = next((i + 1 for i, doc in enumerate(memory_docs) if fact in doc), None)
+            hits.append(rank is not None)
+            reciprocal_ranks.append(1 / rank if rank else 0.0)
+
+    stages = {}
+    for stage in STAGES:
+        values = [sample.get(stage, 0.0) * 1000 for sample in samples]
+        stages[stage] = {
+            "p50_ms": round(statistics.median(values), 3),
+            "p95_ms": round(_percentile(values, 0.95), 3),
+            "mean_ms": round(statistics.mean(values), 3),
+        }
+
+    summary = {
+        "revision": _git_revision(),
+        "backend": memory_module.VECTOR_BACKEND,
+        "embedder": args.embedder,
+        "memories": len(memories),
+        "queries": len(facts),
+        "tiers": compacted,
+        "load_s": round(load_s, 2),
+        "fill_s": round(fill_s, 2),
+        f"recall@{args.k}": round(sum(hits) / len(hits), 4) if hits else 0.0,
+        "mrr": round(statistics.mean(reciprocal_ranks), 4) if reciprocal_ranks else 0.0,
+        "stages": stages,
+    }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print(f"{summary['memories']} memories, {summary['queries']} queries  backend {summary['backend']}  "
+              f"embedder {summary['embedder']}  load {summary['load_s']}s  fill {summary['fill_s']}s")
+        print(f"recall@{args.k} {summary[f'recall@{args.k}']:.3f}  MRR {summary['mrr']:.3f}")
+        for stage, stats in stages.items():
+            print(f"  {stage:<12} p50 {stats['p50_ms']:>9.3f}ms  p95 {stats['p95_ms']:>9.3f}ms  mean {stats['mean_ms']:>9.3f}ms")
+    sys.stdout.flush()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Compare the two-stage (get_plan -> get_intent) router against the fused single-call router.
+
+Reports per-mode latency and how often both modes pick the same function sequence.
+Needs a running Ollama with gemma3:4b. Run from the repo root:
+
+    python -m benchmarks.router_modes --runs 3
+"""
+import argparse
+import json
+import statistics
+import time
+
+from agent.llm import get_intent, get_plan, get_plan_and_intent
+
+DEFAULT_QUERIES = [
+    "what time is it?",
+    "set alarm for 6:30 AM to wake up",
+    "I want to take some break, set a timer for 10 minutes",
+    "list all alarms",
+    "open YouTube and search lo-fi beats",
+    "play Espresso on Spotify and then tell me the time",
+    "what is the system temperature?",
+    "increase volume by 10%",
+    "decrease volume by 5%, then mute it",
+    "list running processes",
+    "get me information about my system",
+    "look up the weather in Gurugram",
+    "run a command to show the current directory",
+    "scrape https://example.com and give the output as csv",
+    "my laptop is heating up",
+    "I like coffee",
+    "what's my name?",
+    "how are you today?",
+]
+
+
+def _functions(result) -> list[str]:
+    if isinstance(result, dict):
+        result = [result]
+    if not isinstance(result, list):
+        return []
+    return [call.get("function", "") for call in result if isinstance(call, dict)]
+
+
+def run_two_stage(query: str):
+    start = time.perf_counter()
+    plan = get_plan(query)
+    result = get_intent(
+        query,
+        plan.get("clarify"),
+        plan.get("reasoning", ""),
+        plan.get("steps", []),
+        plan.get("final_instruction", query),
+    )
+    return time.perf_counter() - start, _functions(result) or ["fallback"]
+
+
+def run_fused(query: str):
+    start = time.perf_counter()
+    result = get_plan_and_intent(query)
+    return time.perf_counter() - start, _functions(result.get("tool_chain")) or ["fallback"]
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=1, help="repetitions per query and mode")
+    parser.add_argument("--queries", help="optional file with one query per line")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args()
+
+    queries = DEFAULT_QUERIES
+    if args.queries:
+        with open(args.queries, "r", encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+
+    latencies = {"two_stage": [], "fused": []}
+    agreements = 0
+    rows = []
+
+    for query in queries:
+        for _ in range(args.runs):
+            two_stage_time, two_stage_funcs = run_two_stage(query)
+            fused_time, fused_funcs = run_fused(query)
+            latencies["two_stage"].append(two_stage_time)
+            latencies["fused"].append(fused_time)
+
+            agree = two_stage_funcs == fused_funcs
+            agreements += agree
+            rows.append({
+                "query": query,
+                "two_stage": two_stage_funcs,
+                "fused": fused_funcs,
+                "two_stage_s": round(two_stage_time, 3),
+                "fused_s": round(fused_time, 3),
+                "agree": agree,
+            })
+
+    total = len(rows)
+    summary = {
+        mode: {
+            "p50_s": round(statistics.median(times), 3),
+            "p90_s": round(_percentile(times, 90), 3),
+            "mean_s": round(statistics.mean(times), 3),
+        }
+        for mode, times in latencies.items()
+    }
+    summary["agreement"] = round(agreements / total, 3) if total else 0.0
+    summary["samples"] = total
+
+    if args.json:
+        print(json.dumps({"summary": summary, "rows": rows}, indent=2))
+        return
+
+    for row in rows:
+        marker = " " if row["agree"] else "*"
+        print(f"{marker} {row['query'][:45]:<45} | two_stage {row['two_stage_s']:6.2f}s {row['two_stage']} | fused {row['fused_s']:6.2f}s {row['fused']}")
+    print()
+    for mode in ("two_stage", "fused"):
+        stats = summary[mode]
+        print(f"{mode:<10} p50 {stats['p50_s']:.2f}s  p90 {stats['p90_s']:.2f}s  mean {stats['mean_s']:.2f}s")
+    print(f"Routing agreement: {summary['agreement'] * 100:.1f}% over {total} samples (* = disagreement)")
+
+
+if __name__ == "__main__":
+    main()
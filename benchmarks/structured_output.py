@@ -0,0 +1,79 @@
+"""
+Compare free-form JSON generation against schema-constrained generation (Ollama `format` + stop at JSON close)
+for the plan and fused router prompts.
+
+Reports latency, generated tokens and how often the output parses and validates.
+Needs a running Ollama with gemma3:4b. Run from the repo root:
+
+    python -m benchmarks.structured_output --runs 3
+"""
+import argparse
+import json
+import re
+import statistics
+import time
+
+from jsonschema import Draft7Validator
+
+from agent.llm import PLAN_PROMPT, fused_router_prompt
+from agent.llmBackend import generate
+from agent.schemas import PLAN_SCHEMA, FUSED_SCHEMA
+from benchmarks.router_modes import DEFAULT_QUERIES
+
+PROMPTS = {
+    "plan": (PLAN_PROMPT, lambda query: f'"""{query}"""\n', PLAN_SCHEMA),
+    "fused": (fused_router_prompt, lambda query: f' "{query}"\n', FUSED_SCHEMA),
+}
+
+
+def _check(text: str, validator: Draft7Validator) -> tuple[bool, bool]:
+    """(parsed, valid) for a model reply, after stripping a markdown fence like the router does."""
+    try:
+        value = json.loads(re.sub(r"^```(?:json)?\n|\n```$", "", text.strip(), flags=re.IGNORECASE))
+    except ValueError:
+        return False, False
+    return True, validator.is_valid(value)
+
+
+def run_once(kind: str, query: str, structured: bool) -> dict:
+    prefix, build, schema = PROMPTS[kind]
+    kwargs = {"extra": {"format": schema}, "stop_on_json_close": True} if structured else {}
+    start = time.perf_counter()
+    result = generate(build(query), prefix=prefix, label=f"bench_{kind}", **kwargs)
+    elapsed = time.perf_counter() - start
+    parsed, valid = _check(result.text, Draft7Validator(schema))
+    return {"s": elapsed, "tokens": result.eval_count, "parsed": parsed, "valid": valid}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=1, help="repetitions per query and mode")
+    parser.add_argument("--kind", choices=list(PROMPTS), action="append", help="prompt(s) to compare (default: all)")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args()
+
+    summary = {}
+    for kind in args.kind or list(PROMPTS):
+        for structured in (False, True):
+            samples = [run_once(kind, query, structured) for query in DEFAULT_QUERIES for _ in range(args.runs)]
+            times = [s["s"] for s in samples]
+            summary[f"{kind}/{'structured' if structured else 'free'}"] = {
+                "samples": len(samples),
+                "p50_s": round(statistics.median(times), 3),
+                "mean_s": round(statistics.mean(times), 3),
+                "mean_tokens": round(statistics.mean(s["tokens"] for s in samples), 1),
+                "parse_rate": round(sum(s["parsed"] for s in samples) / len(samples), 3),
+                "valid_rate": round(sum(s["valid"] for s in samples) / len(samples), 3),
+            }
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+
+    for mode, stats in summary.items():
+        print(f"{mode:<18} p50 {stats['p50_s']:.2f}s  mean {stats['mean_s']:.2f}s  tokens {stats['mean_tokens']:>6.1f}  "
+              f"parsed {stats['parse_rate'] * 100:5.1f}%  schema-valid {stats['valid_rate'] * 100:5.1f}%")
+
+
+if __name__ == "__main__":
+    main()
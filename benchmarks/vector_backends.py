@@ -0,0 +1,143 @@
+"""
+Compare the memory-search backends (agent.vectorBackend) on synthetic memories at several collection sizes.
+
+For each size and backend, in a fresh process: build time, query latency p50/p99, recall@k against exact
+search, and resident memory before and after building the index. Vectors are clustered like real
+sentence embeddings so the approximate indexes aren't flattered by uniform noise. Run from the repo root:
+
+    python -m benchmarks.vector_backends --sizes 10000 100000 1000000 --dim 384 --k 10
+
+The hnsw backend needs hnswlib; chroma runs against an in-memory client.
+"""
+import os
+import json
+import time
+import argparse
+import statistics
+from multiprocessing import get_context
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from agent.vectorBackend import VECTOR_BACKENDS, make_backend
+
+BATCH = 5000
+
+
+def _rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def synthetic_vectors(size: int, dim: int, seed: int, clusters: int = 256):
+    """Unit vectors scattered around random topic centres, generated a batch at a time."""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    for start in range(0, size, BATCH):
+        n = min(BATCH, size - start)
+        batch = centres[rng.integers(0, clusters, n)] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+        yield start, batch / np.linalg.norm(batch, axis=1, keepdims=True)
+
+
+def synthetic_queries(size: int, dim: int, seed: int, queries: int) -> np.ndarray:
+    """Queries near (not on) stored memories, like a follow-up question about something said earlier."""
+    rng = np.random.default_rng(seed + 1)
+    picks = set(rng.choice(size, min(queries, size), replace=False).tolist())
+    chosen = []
+    for start, batch in synthetic_vectors(size, dim, seed):
+        chosen.extend(batch[i - start] for i in sorted(picks) if start <= i < start + len(batch))
+    chosen = np.stack(chosen)
+    noisy = chosen + 0.3 * rng.standard_normal(chosen.shape).astype(np.float32) / np.sqrt(dim)
+    return noisy / np.linalg.norm(noisy, axis=1, keepdims=True)
+
+
+def exact_neighbours(size: int, dim: int, seed: int, queries: np.ndarray, k: int) -> np.ndarray:
+    """Ground-truth top-k row numbers per query, streaming over the data."""
+    best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+    best_rows = np.zeros((len(queries), k), dtype=np.int64)
+    for start, batch in synthetic_vectors(size, dim, seed):
+        scores = np.concatenate([best_scores, queries @ batch.T], axis=1)
+        rows = np.concatenate([best_rows, np.broadcast_to(np.arange(start, start + len(batch)), (len(queries), len(batch)))], axis=1)
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        best_scores = np.take_along_axis(scores, top, axis=1)
+        best_rows = np.take_along_axis(rows, top, axis=1)
+    return best_rows
+
+
+def _make(kind: str):
+    if kind != "chroma":
+        return make_backend(kind)
+    import chromadb
+
+    collection = chromadb.EphemeralClient().create_collection("bench", metadata={"hnsw:space": "cosine"})
+    return make_backend("chroma", collection)
+
+
+def run_backend(kind: str, size: int, dim: int, seed: int, queries: np.ndarray, truth: np.ndarray, k: int) -> dict:
+    """Runs in its own process so memory figures aren't polluted by earlier runs."""
+    rss_start = _rss_mb()
+    backend = _make(kind)
+
+    started = time.perf_counter()
+    for start, batch in synthetic_vectors(size, dim, seed):
+        ids = [str(i) for i in range(start, start + len(batch))]
+        backend.upsert(ids, batch, [f"memory {i}" for i in ids], [{"n": int(i)} for i in ids])
+    build_s = time.perf_counter() - started
+    rss_built = _rss_mb()
+
+    latencies, recalls = [], []
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        result = backend.query(query, k)
+        latencies.append((time.perf_counter() - started) * 1000)
+        recalls.append(len({int(i) for i in result.ids} & set(expected.tolist())) / k)
+
+    latencies.sort()
+    return {
+        "backend": kind,
+        "size": size,
+        "build_s": round(build_s, 2),
+        "p50_ms": round(statistics.median(latencies), 3),
+        "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 3),
+        f"recall@{k}": round(statistics.mean(recalls), 4),
+        "rss_mb": round(rss_built, 1),
+        "index_rss_mb": round(rss_built - rss_start, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--dim", type=int, default=384, help="MiniLM embeddings are 384-dimensional")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--backend", choices=VECTOR_BACKENDS, action="append", help="backend(s) to run (default: all)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        queries = synthetic_queries(size, args.dim, args.seed, args.queries)
+        truth = exact_neighbours(size, args.dim, args.seed, queries, args.k)
+        for kind in args.backend or VECTOR_BACKENDS:
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+                try:
+                    result = pool.submit(run_backend, kind, size, args.dim, args.seed, queries, truth, args.k).result()
+                except Exception as e:
+                    result = {"backend": kind, "size": size, "error": str(e)}
+            results.append(result)
+            if not args.json:
+                if "error" in result:
+                    print(f"{kind:<7} n={size:<9,} failed: {result['error']}")
+                else:
+                    print(f"{kind:<7} n={size:<9,} build {result['build_s']:>8.2f}s  p50 {result['p50_ms']:>8.3f}ms  "
+                          f"p99 {result['p99_ms']:>8.3f}ms  recall@{args.k} {result[f'recall@{args.k}']:.3f}  "
+                          f"rss {result['rss_mb']:>8.1f}MB (index {result['index_rss_mb']:+.1f}MB)", flush=True)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
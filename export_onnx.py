@@ -0,0 +1,96 @@
+"""
+Export the MiniLM sentence-embedding model to ONNX for BITBUD_EMBED_PROVIDER=onnx.
+
+    python export_onnx.py
+    python export_onnx.py --model /path/to/paraphrase-MiniLM-L3-v2 --output /path/to/paraphrase-MiniLM-L3-v2-onnx
+
+Writes model.onnx (float32), model.int8.onnx (dynamic int8 quantization of the weights, unless
+--no-int8) and the tokenizer files to the output directory, then checks both models against the
+PyTorch embeddings on a few sentences.
+"""
+import os
+import argparse
+import logging
+
+import numpy as np
+
+from agent.memoryService import EMBED_MODEL, EMBED_ONNX_DIR
+from agent.onnxEmbeddings import ONNX_MODEL_FILE, ONNX_INT8_MODEL_FILE, OnnxEmbeddings
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("export_onnx")
+
+CHECK_SENTENCES = [
+    "what time is it?",
+    "I parked the car on level 4 of the airport garage.",
+    "Remind me what we said about sourdough baking earlier.",
+    "My sister Priya just moved to Lisbon and loves it there.",
+]
+
+
+def export(model_dir: str, output_dir: str, opset: int):
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    model = AutoModel.from_pretrained(model_dir).eval()
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer.save_pretrained(output_dir)
+
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic = {"batch": 0, "sequence": 1}
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            os.path.join(output_dir, ONNX_MODEL_FILE),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes={**{name: dynamic for name in input_names}, "last_hidden_state": dynamic},
+            opset_version=opset,
+        )
+    logger.info(f"Exported {model_dir} to {os.path.join(output_dir, ONNX_MODEL_FILE)}")
+
+
+def quantize(output_dir: str):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(
+        os.path.join(output_dir, ONNX_MODEL_FILE),
+        os.path.join(output_dir, ONNX_INT8_MODEL_FILE),
+        weight_type=QuantType.QInt8,
+    )
+    logger.info(f"Wrote int8 model {os.path.join(output_dir, ONNX_INT8_MODEL_FILE)}")
+
+
+def check(model_dir: str, output_dir: str, int8: bool):
+    """Cosine similarity of each ONNX model's embeddings to sentence-transformers' on CHECK_SENTENCES."""
+    from sentence_transformers import SentenceTransformer
+
+    reference = SentenceTransformer(model_dir).encode(CHECK_SENTENCES)
+    for quantized in (False, True) if int8 else (False,):
+        vectors = np.asarray(OnnxEmbeddings(output_dir, quantized=quantized).embed_documents(CHECK_SENTENCES))
+        cosine = (vectors * reference).sum(axis=1) / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(reference, axis=1))
+        print(f"[Export] {'int8' if quantized else 'float32'} vs sentence-transformers: "
+              f"min cosine {cosine.min():.5f}, max abs diff {np.abs(vectors - reference).max():.2e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=EMBED_MODEL, help="sentence-transformers model directory")
+    parser.add_argument("--output", default=EMBED_ONNX_DIR, help="directory for the ONNX models (BITBUD_EMBED_ONNX_DIR)")
+    parser.add_argument("--opset", type=int, default=14)
+    parser.add_argument("--no-int8", action="store_true", help="skip the int8-quantized model")
+    parser.add_argument("--no-check", action="store_true", help="skip comparing against the PyTorch embeddings")
+    args = parser.parse_args()
+
+    export(args.model, args.output, args.opset)
+    if not args.no_int8:
+        quantize(args.output)
+    if not args.no_check:
+        check(args.model, args.output, not args.no_int8)
+
+
+if __name__ == "__main__":
+    main()
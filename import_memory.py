@@ -0,0 +1,217 @@
+"""
+Bulk-import chat transcripts into BitBud's conversation memory (the `bitbud` collection).
+
+    python import_memory.py transcripts.jsonl --workers 4 --summaries skip
+    python import_memory.py export.csv --text-field message --summaries batch
+
+JSONL rows (or CSV columns) may carry `text`, `timestamp` (ISO) or `ts` (epoch seconds), `session_id`
+and `source`. Rows are embedded in large batches across a process pool and written with ids derived
+from their content, so re-importing is idempotent. Progress is checkpointed next to the input file;
+rerunning the same command after an interruption resumes where it stopped (--restart ignores it).
+"""
+import os
+import csv
+import sys
+import json
+import time
+import hashlib
+import argparse
+import logging
+from collections import deque
+from datetime import datetime
+from multiprocessing import get_context
+from concurrent.futures import ProcessPoolExecutor
+
+from agent.memoryService import MEMORY_DIR, EMBED_MODEL
+from agent.memoryFilter import is_worth_storing
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("import_memory")
+
+_embedder = None
+
+
+def _init_worker(threads: int):
+    """Load the embedding model once per worker process."""
+    global _embedder
+    import torch
+    from langchain.embeddings import HuggingFaceEmbeddings
+
+    torch.set_num_threads(threads)
+    _embedder = HuggingFaceEmbeddings(model_name=EMBED_MODEL)
+
+
+def _embed_batch(texts: list[str]) -> list[list[float]]:
+    return _embedder.embed_documents(texts)
+
+
+def read_rows(path: str, text_field: str):
+    """Yield row dicts from a JSONL or CSV file, streaming."""
+    if path.endswith(".csv"):
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                yield {**row, "text": row.get(text_field, "")}
+        return
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                yield {"text": ""}
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                logger.warning(f"Line {line_number}: not valid JSON, skipped")
+                yield {"text": ""}
+                continue
+            yield {**row, "text": row.get(text_field, "")} if isinstance(row, dict) else {"text": ""}
+
+
+def _row_timestamp(row: dict) -> float:
+    if row.get("ts") not in (None, ""):
+        return float(row["ts"])
+    if row.get("timestamp"):
+        return datetime.fromisoformat(str(row["timestamp"])).timestamp()
+    return time.time()
+
+
+def to_record(row: dict, default_source: str):
+    """(id, text, metadata) in the same shape store_to_memory writes, or None for rows not worth storing."""
+    text = str(row.get("text") or "").strip()
+    if not text or not is_worth_storing(text):
+        return None
+    try:
+        ts = _row_timestamp(row)
+    except ValueError:
+        ts = time.time()
+    moment = datetime.fromtimestamp(ts)
+    # Without a session id, a day of transcript is one session, so compaction can fold it into summaries
+    session_id = str(row.get("session_id") or f"import-{moment:%Y%m%d}")
+    metadata = {
+        "timestamp": moment.isoformat(),
+        "ts": ts,
+        "session_id": session_id,
+        "source": str(row.get("source") or default_source),
+        "tier": "hot",
+    }
+    record_id = hashlib.sha1(f"{session_id}\0{ts}\0{text}".encode("utf-8")).hexdigest()
+    return record_id, text, metadata
+
+
+def _batches(rows, batch_size: int, skip: int, default_source: str):
+    """Yield (rows consumed, records) per batch, after skipping `skip` already-imported rows."""
+    consumed = 0
+    reported = skip
+    records = []
+    for row in rows:
+        consumed += 1
+        if consumed <= skip:
+            continue
+        record = to_record(row, default_source)
+        if record:
+            records.append(record)
+        if len(records) >= batch_size:
+            yield consumed, records
+            reported = consumed
+            records = []
+    if records or consumed > reported:
+        # Also checkpoint trailing rows that produced no records
+        yield consumed, records
+
+
+def _contexts(texts: list[str], mode: str) -> list:
+    if mode == "skip":
+        return [None] * len(texts)
+    if mode == "keywords":
+        from agent.summaryCache import extract_keywords
+        return [" ".join(extract_keywords(text)) or None for text in texts]
+    from agent.llm import generate_context_summaries
+    return generate_context_summaries(texts)
+
+
+def _load_state(path: str) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_state(path: str, state: dict):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="transcript file (.jsonl or .csv)")
+    parser.add_argument("--text-field", default="text")
+    parser.add_argument("--source", default="import", help="metadata source for rows without one")
+    parser.add_argument("--batch-size", type=int, default=256, help="rows per embedding batch")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--summaries", choices=["skip", "keywords", "batch"], default="skip",
+                        help="context metadata: none, local keywords, or LLM summaries batched several texts per call")
+    parser.add_argument("--state", help="checkpoint file (default: <input>.import-state.json)")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and start from the first row")
+    args = parser.parse_args()
+
+    import chromadb
+
+    state_path = args.state or f"{args.input}.import-state.json"
+    state = {} if args.restart else _load_state(state_path)
+    skip = state.get("rows_done", 0)
+    if skip:
+        logger.info(f"Resuming after {skip} rows (checkpoint {state_path})")
+
+    collection = chromadb.PersistentClient(path=MEMORY_DIR).get_or_create_collection("bitbud")
+    threads = max(1, (os.cpu_count() or 1) // args.workers)
+    pool = ProcessPoolExecutor(
+        max_workers=args.workers, mp_context=get_context("spawn"), initializer=_init_worker, initargs=(threads,)
+    )
+
+    started = time.perf_counter()
+    imported = 0
+    rows_done = skip
+    in_flight = deque()
+
+    def commit(consumed, records, future):
+        nonlocal imported, rows_done
+        if records:
+            ids, texts, metadatas = map(list, zip(*records))
+            vectors = future.result()
+            for metadata, context in zip(metadatas, _contexts(texts, args.summaries)):
+                if context:
+                    metadata["context"] = context
+            collection.upsert(ids=ids, embeddings=vectors, documents=texts, metadatas=metadatas)
+            imported += len(records)
+        rows_done = consumed
+        _save_state(state_path, {"rows_done": rows_done, "imported": state.get("imported", 0) + imported})
+
+        elapsed = time.perf_counter() - started
+        print(f"[Import] rows {rows_done}  imported {imported}  {imported / elapsed:,.1f} rows/s", flush=True)
+
+    try:
+        # Keep a bounded number of batches in flight so large files stream instead of being read up front
+        for consumed, records in _batches(read_rows(args.input, args.text_field), args.batch_size, skip, args.source):
+            future = pool.submit(_embed_batch, [text for _, text, _ in records]) if records else None
+            in_flight.append((consumed, records, future))
+            while len(in_flight) > args.workers * 2:
+                commit(*in_flight.popleft())
+        while in_flight:
+            commit(*in_flight.popleft())
+    except KeyboardInterrupt:
+        logger.warning(f"Interrupted after {rows_done} rows; rerun the same command to resume")
+        pool.shutdown(wait=False, cancel_futures=True)
+        sys.exit(130)
+
+    pool.shutdown()
+    elapsed = time.perf_counter() - started
+    print(f"[Import] Done: {imported} memories from {rows_done - skip} rows in {elapsed:.1f}s "
+          f"({imported / elapsed if elapsed else 0:,.1f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,20 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from agent.langGraphRouter import build_graph
+from agent.memo import RequestMemo
+from agent.fastPath import fast_path_stats
+from agent.llmBackend import call_stats
+from agent.batcher import batcher_stats
+from agent.llm import summary_cache_stats
+from agent.embeddingCache import embedding_cache_stats
+from agent.memoryWriter import writer_stats
+from agent.scheduler import job_stats
+from agent.chromaMemory import dedup_stats
+from agent.tools.scraper import scraper_stats
+from agent.memoryService import memory_service, MEMORY_WARMUP
+import json
+import queue
 import logging
+import threading
 import traceback
 
 # Setup logging
@@ -25,6 +39,10 @@ except Exception as e:
     logger.error(f"Failed to initialize graph: {e}")
     graph = None
 
+# Embedder and Chroma load in the background; fast-path and tool requests are served meanwhile
+if MEMORY_WARMUP:
+    memory_service.warm_up_in_background()
+
 @app.route("/")
 def home():
     return "BitBud backend is running!"
@@ -51,8 +69,10 @@ def ask():
         logger.info(f"Processing user input: {user_input}...")
         
         # Process with graph
-        result = graph.invoke({"input": user_input})
+        memo = RequestMemo()
+        result = graph.invoke({"input": user_input, "memo": memo})
         reply = result.get("output", "I'm having trouble processing that right now.")
+        logger.info(f"Request memo: {memo.saved_calls()} calls saved, {memo.stats()}")
         
         logger.info(f"Generated reply: {reply[:50]}...")
         return jsonify({"reply": reply})
@@ -66,6 +86,114 @@ def ask():
             "reply": "I'm experiencing technical difficulties. Please try again."
         }), 500
 
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def _run_graph_streaming(user_input: str, events: queue.Queue):
+    """Run the graph in a worker thread, pushing node, tool and token events as they happen."""
+    memo = RequestMemo()
+    reply = None
+    try:
+        state = {
+            "input": user_input,
+            "memo": memo,
+            "on_token": lambda token: events.put(("token", {"text": token}))
+        }
+        for update in graph.stream(state, stream_mode="updates"):
+            for node, values in update.items():
+                values = values or {}
+                events.put(("node", {"node": node}))
+                if node in ("execute_single_tool", "process_tool_chain") and "output" in values:
+                    events.put(("tool", {"function": values.get("function") or node, "output": values["output"]}))
+                if "output" in values and values["output"]:
+                    reply = values["output"]
+
+        logger.info(f"Request memo: {memo.saved_calls()} calls saved, {memo.stats()}")
+        events.put(("done", {"reply": reply or "I'm having trouble processing that right now."}))
+
+    except Exception as e:
+        logger.error(f"Error streaming request: {e}")
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        events.put(("error", {
+            "error": "Something went wrong processing your request.",
+            "reply": "I'm experiencing technical difficulties. Please try again."
+        }))
+
+@app.route("/ask/stream", methods=["POST"])
+def ask_stream():
+    """Server-sent events variant of /ask: node transitions, tool outputs and RAG answer tokens."""
+    if not request.is_json:
+        logger.warning("Received non-JSON request")
+        return jsonify({"error": "Request must be JSON"}), 400
+
+    user_input = request.json.get("message", "").strip()
+    if not user_input:
+        logger.warning("Received empty message")
+        return jsonify({"error": "Message cannot be empty"}), 400
+
+    if graph is None:
+        logger.error("Graph not initialized, cannot process request")
+        return jsonify({"error": "BitBud is not ready. Please restart the service. If the issue persists, check the logs or contact support."}), 503
+
+    logger.info(f"Streaming user input: {user_input}...")
+
+    events = queue.Queue()
+    threading.Thread(target=_run_graph_streaming, args=(user_input, events), daemon=True).start()
+
+    def generate():
+        yield _sse("start", {"message": user_input})
+        while True:
+            event, data = events.get()
+            yield _sse(event, data)
+            if event in ("done", "error"):
+                break
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.route("/stats/fast_path")
+def fast_path_metrics():
+    return jsonify(fast_path_stats())
+
+@app.route("/stats/llm")
+def llm_metrics():
+    return jsonify(call_stats())
+
+@app.route("/stats/batching")
+def batching_metrics():
+    return jsonify(batcher_stats())
+
+@app.route("/stats/memory_writer")
+def memory_writer_metrics():
+    return jsonify(writer_stats())
+
+@app.route("/stats/summary_cache")
+def summary_cache_metrics():
+    return jsonify(summary_cache_stats())
+
+@app.route("/stats/embedding_cache")
+def embedding_cache_metrics():
+    return jsonify(embedding_cache_stats())
+
+@app.route("/stats/memory")
+def memory_metrics():
+    return jsonify(memory_service.status())
+
+@app.route("/stats/jobs")
+def job_metrics():
+    return jsonify(job_stats())
+
+@app.route("/stats/dedup")
+def dedup_metrics():
+    return jsonify(dedup_stats())
+
+@app.route("/stats/scraper")
+def scraper_metrics():
+    return jsonify(scraper_stats())
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({"error": "Endpoint not found"}), 404
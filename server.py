@@ -0,0 +1,260 @@
+"""
+Production serving mode: an ASGI app that runs the graph with graph.ainvoke under uvicorn workers.
+
+    python server.py --port 5001
+    BITBUD_CHROMA_URL=http://127.0.0.1:8000 python server.py --workers 4 --port 5001
+    BITBUD_CHROMA_URL=http://127.0.0.1:8000 uvicorn server:app --workers 4 --port 5001
+
+More than one worker needs a Chroma server: the embedded client in BITBUD_MEMORY_DIR is not safe to
+share between processes.
+
+main.py (Flask development server) is still the simplest way to run BitBud locally.
+"""
+import os
+import json
+import asyncio
+import logging
+import argparse
+import traceback
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+
+from agent.langGraphRouter import build_graph
+from agent.memo import RequestMemo
+from agent.fastPath import fast_path_stats
+from agent.llmBackend import backend, call_stats
+from agent.batcher import batcher_stats
+from agent.llm import summary_cache_stats
+from agent.embeddingCache import embedding_cache_stats
+from agent.memoryWriter import writer_stats, flush_writers
+from agent.scheduler import job_stats
+from agent.memoryService import memory_service, MEMORY_WARMUP, CHROMA_URL
+from agent.chromaMemory import dedup_stats
+from agent.tools.scraper import scraper_stats
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler('bitbud.log'),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger(__name__)
+
+# Threads available to blocking node bodies (LLM, Chroma, subprocess) per worker process
+GRAPH_THREADS = int(os.getenv("BITBUD_GRAPH_THREADS", "32"))
+NOT_READY = "BitBud is not ready. Please restart the service. If the issue persists, check the logs or contact support."
+
+graph = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global graph
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=GRAPH_THREADS, thread_name_prefix="bitbud-node"))
+    try:
+        graph = build_graph()
+        logger.info(f"BitBud graph initialized successfully (worker pid {os.getpid()})")
+    except Exception as e:
+        logger.error(f"Failed to initialize graph: {e}")
+        graph = None
+    # Embedder and Chroma load in the background; fast-path and tool requests are served meanwhile
+    if MEMORY_WARMUP:
+        memory_service.warm_up_in_background()
+    yield
+    # Let queued memory writes land before the worker exits (anything left stays in the spool)
+    await asyncio.to_thread(flush_writers, 30.0)
+    await backend.aclose()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+async def _read_message(request: Request):
+    """Return (message, None) or (None, error response), mirroring the checks in main.py."""
+    try:
+        body = await request.json()
+    except Exception:
+        logger.warning("Received non-JSON request")
+        return None, JSONResponse({"error": "Request must be JSON"}, status_code=400)
+
+    user_input = str(body.get("message", "")).strip() if isinstance(body, dict) else ""
+    if not user_input:
+        logger.warning("Received empty message")
+        return None, JSONResponse({"error": "Message cannot be empty"}, status_code=400)
+
+    if graph is None:
+        logger.error("Graph not initialized, cannot process request")
+        return None, JSONResponse({"error": NOT_READY}, status_code=503)
+
+    return user_input, None
+
+
+@app.get("/")
+async def home():
+    return PlainTextResponse("BitBud backend is running!")
+
+
+@app.post("/ask")
+async def ask(request: Request):
+    user_input, error = await _read_message(request)
+    if error:
+        return error
+
+    try:
+        logger.info(f"Processing user input: {user_input}...")
+        memo = RequestMemo()
+        result = await graph.ainvoke({"input": user_input, "memo": memo})
+        reply = result.get("output", "I'm having trouble processing that right now.")
+        logger.info(f"Request memo: {memo.saved_calls()} calls saved, {memo.stats()}")
+        logger.info(f"Generated reply: {reply[:50]}...")
+        return JSONResponse({"reply": reply})
+
+    except Exception as e:
+        logger.error(f"Error processing request: {e}")
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        return JSONResponse({
+            "error": "Something went wrong processing your request.",
+            "reply": "I'm experiencing technical difficulties. Please try again."
+        }, status_code=500)
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/ask/stream")
+async def ask_stream(request: Request):
+    """Server-sent events: node transitions, tool outputs and RAG answer tokens as they are produced."""
+    user_input, error = await _read_message(request)
+    if error:
+        return error
+
+    loop = asyncio.get_running_loop()
+    tokens: asyncio.Queue = asyncio.Queue()
+
+    def on_token(token: str):
+        # Called from the worker thread running the fallback node
+        loop.call_soon_threadsafe(tokens.put_nowait, token)
+
+    async def generate():
+        yield _sse("start", {"message": user_input})
+        memo = RequestMemo()
+        reply = None
+        updates = graph.astream({"input": user_input, "memo": memo, "on_token": on_token}, stream_mode="updates").__aiter__()
+        next_update = asyncio.ensure_future(updates.__anext__())
+        try:
+            while True:
+                next_token = asyncio.ensure_future(tokens.get())
+                done, _ = await asyncio.wait({next_update, next_token}, return_when=asyncio.FIRST_COMPLETED)
+
+                if next_token in done:
+                    yield _sse("token", {"text": next_token.result()})
+                else:
+                    next_token.cancel()
+
+                if next_update in done:
+                    try:
+                        update = next_update.result()
+                    except StopAsyncIteration:
+                        break
+                    for node, values in update.items():
+                        values = values or {}
+                        yield _sse("node", {"node": node})
+                        if node in ("execute_single_tool", "process_tool_chain") and "output" in values:
+                            yield _sse("tool", {"function": values.get("function") or node, "output": values["output"]})
+                        if values.get("output"):
+                            reply = values["output"]
+                    next_update = asyncio.ensure_future(updates.__anext__())
+
+            while not tokens.empty():
+                yield _sse("token", {"text": tokens.get_nowait()})
+            logger.info(f"Request memo: {memo.saved_calls()} calls saved, {memo.stats()}")
+            yield _sse("done", {"reply": reply or "I'm having trouble processing that right now."})
+
+        except Exception as e:
+            logger.error(f"Error streaming request: {e}")
+            logger.error(f"Traceback: {traceback.format_exc()}")
+            yield _sse("error", {
+                "error": "Something went wrong processing your request.",
+                "reply": "I'm experiencing technical difficulties. Please try again."
+            })
+        finally:
+            next_update.cancel()
+
+    return StreamingResponse(generate(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.get("/stats/fast_path")
+async def fast_path_metrics():
+    return fast_path_stats()
+
+
+@app.get("/stats/llm")
+async def llm_metrics():
+    return call_stats()
+
+
+@app.get("/stats/batching")
+async def batching_metrics():
+    return batcher_stats()
+
+
+@app.get("/stats/memory_writer")
+async def memory_writer_metrics():
+    return writer_stats()
+
+
+@app.get("/stats/summary_cache")
+async def summary_cache_metrics():
+    return summary_cache_stats()
+
+
+@app.get("/stats/embedding_cache")
+async def embedding_cache_metrics():
+    return embedding_cache_stats()
+
+
+@app.get("/stats/memory")
+async def memory_metrics():
+    return memory_service.status()
+
+
+@app.get("/stats/jobs")
+async def job_metrics():
+    return job_stats()
+
+
+@app.get("/stats/dedup")
+async def dedup_metrics():
+    return dedup_stats()
+
+
+@app.get("/stats/scraper")
+async def scraper_metrics():
+    return scraper_stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run BitBud behind uvicorn with multiple workers.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5001)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("BITBUD_WORKERS", "1")))
+    args = parser.parse_args()
+    if args.workers > 1 and not CHROMA_URL:
+        # Each worker would open its own embedded Chroma on the same directory and persist over the others' writes
+        parser.error("more than one worker needs BITBUD_CHROMA_URL (a Chroma server shared by the workers); "
+                     "the embedded client in BITBUD_MEMORY_DIR is single-process")
+
+    logger.info(f"Starting BitBud ASGI server on {args.host}:{args.port} with {args.workers} workers")
+    uvicorn.run("server:app", host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()